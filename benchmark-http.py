@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP服务器吞吐量测试
+对比每个请求新建连接（HTTP/1.0方式）与复用长连接（HTTP/1.1 keep-alive）的每秒请求数，
+支持Unix域套接字的系统上再测一组Unix域套接字长连接
+用法: python benchmark-http.py [请求数] [URL路径]
+"""
+
+import os
+import sys
+import time
+import socket
+import tempfile
+import threading
+import http.client
+from http.server import ThreadingHTTPServer
+
+from server import PCMPlayerHandler, create_listen_socket, serve_on_socket
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """通过Unix域套接字发送HTTP请求"""
+    
+    def __init__(self, path):
+        super().__init__('localhost')
+        self.unix_path = path
+    
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.unix_path)
+
+
+def run_requests(connect, path, count, keep_alive):
+    """发送count个请求，返回耗时（秒）"""
+    start = time.perf_counter()
+    conn = None
+    for _ in range(count):
+        if conn is None:
+            conn = connect()
+        headers = {} if keep_alive else {'Connection': 'close'}
+        conn.request('GET', path, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        if not keep_alive or response.will_close:
+            conn.close()
+            conn = None
+    if conn is not None:
+        conn.close()
+    return time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    path = sys.argv[2] if len(sys.argv) > 2 else '/api/files'
+    
+    # 请求日志会严重影响结果，测试时关闭
+    PCMPlayerHandler.log_message = lambda self, format, *args: None
+    server = ThreadingHTTPServer(('localhost', 0), PCMPlayerHandler)
+    port = server.server_address[1]
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    
+    print("=" * 50)
+    print(f"HTTP吞吐量测试: {count}个请求 GET {path}")
+    print("=" * 50)
+    
+    tcp = lambda: http.client.HTTPConnection('localhost', port)
+    cases = [("每请求新建连接", tcp, False), ("长连接复用", tcp, True)]
+    
+    unix_server = None
+    if hasattr(socket, 'AF_UNIX'):
+        unix_path = os.path.join(tempfile.mkdtemp(), 'pcm-player.sock')
+        unix_server = serve_on_socket(create_listen_socket(unix_path=unix_path), PCMPlayerHandler)
+        threading.Thread(target=unix_server.serve_forever, daemon=True).start()
+        cases.append(("Unix域套接字长连接", lambda: UnixHTTPConnection(unix_path), True))
+    
+    results = {}
+    for name, connect, keep_alive in cases:
+        run_requests(connect, path, min(100, count), keep_alive)  # 预热
+        elapsed = run_requests(connect, path, count, keep_alive)
+        results[name] = count / elapsed
+        print(f"{name}: {results[name]:.0f} 请求/秒 ({elapsed:.2f}秒)")
+    
+    speedup = results["长连接复用"] / results["每请求新建连接"]
+    print(f"长连接提升: {speedup:.2f}倍")
+    server.shutdown()
+    if unix_server is not None:
+        unix_server.shutdown()
+        os.unlink(unix_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+桌面播放器波形视口的渲染耗时测试
+生成一段长音频（默认3小时，16kHz单声道），建立波形金字塔后从整个文件逐级缩放到样本级，
+再在几个缩放级别上连续平移，统计每帧的计算耗时。
+画布用空实现代替，测的是Python端的降采样和坐标计算，不含Tk绘制折线的时间。
+用法: python benchmark-waveform.py [时长（小时）]
+"""
+
+import os
+import sys
+import time
+import importlib.util
+from array import array
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FRAME_BUDGET_MS = 1000 / 60
+
+
+class NullCanvas:
+    """只接受波形视口会调用的画布方法，不做任何绘制"""
+    
+    def delete(self, *args):
+        pass
+    
+    def move(self, *args):
+        pass
+    
+    def create_line(self, coords, **kwargs):
+        return 1
+
+
+def load_player_module():
+    spec = importlib.util.spec_from_file_location(
+        'desktop_pcm_player_gui', os.path.join(BASE_DIR, 'desktop-pcm-player-gui.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_samples(total):
+    """用自带的示例音频重复拼接出total个样本"""
+    with open(os.path.join(BASE_DIR, 'qlx_13sec.pcm'), 'rb') as f:
+        data = f.read()
+    chunk = array('h')
+    chunk.frombytes(data[:len(data) // 2 * 2])
+    if sys.byteorder == 'big':
+        chunk.byteswap()
+    samples = array('h')
+    while len(samples) < total:
+        samples.extend(chunk[:total - len(samples)])
+    return samples
+
+
+def summary(times):
+    times = sorted(times)
+    return (f"中位数 {times[len(times) // 2]:.2f}ms, 最慢 {times[-1]:.2f}ms, "
+            f"超过一帧({FRAME_BUDGET_MS:.1f}ms) {sum(t > FRAME_BUDGET_MS for t in times)}次")
+
+
+def main():
+    hours = float(sys.argv[1]) if len(sys.argv) > 1 else 3
+    player = load_player_module()
+    width = 800
+    total = int(hours * 3600 * 16000)
+    
+    print("=" * 50)
+    print(f"波形视口测试: {hours:g}小时, {total}个样本, 视口宽度{width}像素")
+    print("=" * 50)
+    
+    samples = make_samples(total)
+    start = time.perf_counter()
+    pyramid = player.PeakPyramid()
+    pyramid.add_samples(samples)
+    pyramid.finish(samples)
+    print(f"建立波形金字塔: {time.perf_counter() - start:.1f}秒, "
+          f"{pyramid.memory_bytes() / 1048576:.1f} MB（加载时随解码增量完成）")
+    
+    viewport = player.WaveformViewport(NullCanvas(), width, 200)
+    viewport.set_source(samples, pyramid)
+    
+    # 以文件中点为中心，每次按 2^(1/4) 缩放，直到每像素不到0.05个样本
+    center = total / 2
+    spp = total / width
+    times = []
+    while spp > 0.05:
+        begin = time.perf_counter()
+        viewport.render(max(0, center - spp * width / 2), spp)
+        times.append((time.perf_counter() - begin) * 1000)
+        spp /= 2 ** 0.25
+    print(f"缩放 {len(times)}步（图块缓存为空）: {summary(times)}")
+    
+    for spp in (total / width, 1000, 10, 0.25):
+        viewport.set_source(samples, pyramid)
+        viewport.render(center, spp)
+        times = []
+        for step in range(60):
+            begin = time.perf_counter()
+            viewport.render(center + step * spp * 20, spp)
+            times.append((time.perf_counter() - begin) * 1000)
+        print(f"平移 每像素{spp:g}个样本, 每帧20像素: {summary(times)}")
+
+
+if __name__ == '__main__':
+    main()
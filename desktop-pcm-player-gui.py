@@ -11,20 +11,1107 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import threading
 import time
-import struct
 import math
+import wave
+import shutil
+import argparse
+import subprocess
+import queue
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import Canvas, Frame, Button, Label, Scale
 import tkinter.font as tkFont
 
+from directory_scan import list_directory
+
+# 可选依赖：sounddevice 用于直接输出到声卡
+try:
+    import sounddevice
+except ImportError:
+    sounddevice = None
+
+
+class UIRefreshScheduler:
+    """UI刷新调度器
+
+    把来自播放线程和鼠标事件的刷新请求合并成一帧，在Tk主线程中统一执行。
+    每帧的耗时与帧预算比较，超预算时自动降低刷新频率，空闲时再逐步恢复。
+    """
+
+    def __init__(self, root, callback, frame_budget_ms=16, max_interval_ms=200):
+        self.root = root
+        self.callback = callback
+        self.frame_budget_ms = frame_budget_ms
+        self.min_interval_ms = frame_budget_ms
+        self.max_interval_ms = max_interval_ms
+        self.interval_ms = frame_budget_ms
+
+        self._lock = threading.Lock()
+        self._pending = False
+        self._due_time = 0
+        self._last_frame_time = 0
+
+        # 统计计数
+        self.requests = 0
+        self.frames = 0
+        self.coalesced = 0          # 合并进已有待执行帧的请求数（正常现象，不是丢帧）
+        self.late_frames = 0
+        self.over_budget_frames = 0
+        self.last_frame_ms = 0.0
+
+    def request(self):
+        """请求刷新一帧，可在任意线程调用，已有待执行的帧时直接合并"""
+        with self._lock:
+            self.requests += 1
+            if self._pending:
+                self.coalesced += 1
+                return
+            self._pending = True
+            now = time.perf_counter()
+            # 距离上一帧不足一个刷新间隔时，推迟到间隔结束
+            elapsed_ms = (now - self._last_frame_time) * 1000
+            delay = max(0, int(self.interval_ms - elapsed_ms))
+            self._due_time = now + delay / 1000
+        self.root.after(delay, self._run_frame)
+
+    def _run_frame(self):
+        """在主线程中执行一帧刷新"""
+        start = time.perf_counter()
+        with self._lock:
+            self._pending = False
+            if (start - self._due_time) * 1000 > self.frame_budget_ms:
+                self.late_frames += 1
+
+        try:
+            self.callback()
+        finally:
+            end = time.perf_counter()
+            self._last_frame_time = end
+            self.frames += 1
+            self.last_frame_ms = (end - start) * 1000
+            self._adapt_interval()
+
+    def _adapt_interval(self):
+        """根据本帧耗时调整刷新间隔"""
+        if self.last_frame_ms > self.frame_budget_ms:
+            self.over_budget_frames += 1
+            self.interval_ms = min(self.max_interval_ms, self.interval_ms * 2)
+        elif self.last_frame_ms < self.frame_budget_ms / 2:
+            self.interval_ms = max(self.min_interval_ms, self.interval_ms - 4)
+
+    def get_stats(self):
+        """获取调度统计信息"""
+        return {
+            'requests': self.requests,
+            'frames': self.frames,
+            'coalesced': self.coalesced,
+            'late_frames': self.late_frames,
+            'over_budget_frames': self.over_budget_frames,
+            'interval_ms': self.interval_ms,
+            'last_frame_ms': round(self.last_frame_ms, 3),
+        }
+
+
+class PCMRingBuffer:
+    """单生产者/单消费者无锁环形缓冲区
+
+    写指针只由解码线程修改，读指针只由输出线程修改，两个指针都是单调递增的
+    整数，依靠解释器对整数赋值的原子性保证线程安全，不需要加锁。
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.buffer = bytearray(capacity)
+        self.write_pos = 0
+        self.read_pos = 0
+
+    def available(self):
+        """可读取的字节数"""
+        return self.write_pos - self.read_pos
+
+    def free_space(self):
+        """可写入的字节数"""
+        return self.capacity - (self.write_pos - self.read_pos)
+
+    def write(self, data):
+        """写入数据，返回实际写入的字节数"""
+        size = min(len(data), self.free_space())
+        if size <= 0:
+            return 0
+        start = self.write_pos % self.capacity
+        first = min(size, self.capacity - start)
+        self.buffer[start:start + first] = data[:first]
+        if first < size:
+            self.buffer[0:size - first] = data[first:size]
+        self.write_pos += size
+        return size
+
+    def read(self, size):
+        """读取最多size字节的数据"""
+        size = min(size, self.available())
+        if size <= 0:
+            return b''
+        start = self.read_pos % self.capacity
+        first = min(size, self.capacity - start)
+        data = bytes(self.buffer[start:start + first])
+        if first < size:
+            data += bytes(self.buffer[0:size - first])
+        self.read_pos += size
+        return data
+
+
+class AudioSink:
+    """音频输出端基类
+
+    write() 以阻塞方式消费一个周期的数据；frames_consumed 表示已经真正
+    "播放"出去的样本数，GUI的播放位置以它为准。
+    realtime 为False的输出端没有播放时限，等待数据不算欠载。
+    """
+
+    name = 'base'
+    realtime = True
+
+    def __init__(self):
+        self.sample_rate = 16000
+        self.channels = 1
+        self.frames_written = 0
+
+    def open(self, sample_rate, channels):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.frames_written = 0
+
+    def write(self, data):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def latency_frames(self):
+        """输出端内部尚未播放的样本数"""
+        return 0
+
+    @property
+    def frames_consumed(self):
+        return max(0, self.frames_written - self.latency_frames())
+
+
+class NullSink(AudioSink):
+    """空输出端，丢弃数据
+
+    realtime=True 时按采样率节奏消费数据，可在没有声卡的环境下模拟播放；
+    realtime=False 时立即消费，结果完全确定，适合无界面测试。
+    """
+
+    name = 'null'
+
+    def __init__(self, realtime=True):
+        super().__init__()
+        self.realtime = realtime
+        self._clock_start = None
+
+    def open(self, sample_rate, channels):
+        super().open(sample_rate, channels)
+        self._clock_start = None
+
+    def write(self, data):
+        frames = len(data) // (2 * self.channels)
+        if self.realtime:
+            if self._clock_start is None:
+                self._clock_start = time.perf_counter()
+            # 等到墙上时钟追上已写入的样本数
+            target = self._clock_start + (self.frames_written + frames) / self.sample_rate
+            delay = target - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        self.frames_written += frames
+
+
+class WavFileSink(NullSink):
+    """把输出写入WAV文件的输出端，用于离线核对播放结果"""
+
+    name = 'wav'
+
+    def __init__(self, path, realtime=False):
+        super().__init__(realtime=realtime)
+        self.path = path
+        self._wav = None
+
+    def open(self, sample_rate, channels):
+        super().open(sample_rate, channels)
+        self._wav = wave.open(self.path, 'wb')
+        self._wav.setnchannels(channels)
+        self._wav.setsampwidth(2)
+        self._wav.setframerate(sample_rate)
+
+    def write(self, data):
+        self._wav.writeframes(data)
+        super().write(data)
+
+    def close(self):
+        if self._wav is not None:
+            self._wav.close()
+            self._wav = None
+
+
+class DeviceSink(AudioSink):
+    """系统声卡输出端
+
+    优先使用 sounddevice；没有安装时在Linux上退回到 aplay 管道。
+    """
+
+    name = 'device'
+
+    def __init__(self, latency='low'):
+        super().__init__()
+        self.latency = latency
+        self._stream = None
+        self._process = None
+        self._clock_start = None
+
+    @staticmethod
+    def is_available():
+        return sounddevice is not None or shutil.which('aplay') is not None
+
+    def open(self, sample_rate, channels):
+        super().open(sample_rate, channels)
+        self._clock_start = None
+        if sounddevice is not None:
+            self._stream = sounddevice.RawOutputStream(
+                samplerate=sample_rate, channels=channels,
+                dtype='int16', latency=self.latency)
+            self._stream.start()
+        elif shutil.which('aplay'):
+            self._process = subprocess.Popen(
+                ['aplay', '-q', '-t', 'raw', '-f', 'S16_LE',
+                 '-r', str(sample_rate), '-c', str(channels), '--buffer-time=50000'],
+                stdin=subprocess.PIPE)
+        else:
+            raise RuntimeError("没有可用的音频输出设备")
+
+    def write(self, data):
+        frames = len(data) // (2 * self.channels)
+        if self._stream is not None:
+            self._stream.write(data)
+        else:
+            if self._clock_start is None:
+                self._clock_start = time.perf_counter()
+            self._process.stdin.write(data)
+            self._process.stdin.flush()
+        self.frames_written += frames
+
+    def latency_frames(self):
+        if self._stream is not None:
+            return int(self._stream.latency * self.sample_rate)
+        if self._clock_start is None:
+            return 0
+        # 管道模式无法查询设备延迟，用墙上时钟估算已播放的样本数
+        played = (time.perf_counter() - self._clock_start) * self.sample_rate
+        return max(0, int(self.frames_written - played))
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+        if self._process is not None:
+            try:
+                self._process.stdin.close()
+            except OSError:
+                pass
+            self._process.terminate()
+            self._process = None
+
+
+def create_sink(spec='auto'):
+    """根据名称创建输出端：auto / device / null / wav:<路径>"""
+    if spec.startswith('wav:'):
+        return WavFileSink(spec[4:])
+    if spec == 'null':
+        return NullSink(realtime=True)
+    if spec == 'device':
+        return DeviceSink()
+    if DeviceSink.is_available():
+        return DeviceSink()
+    print("未找到音频输出设备，使用空输出端模拟播放")
+    return NullSink(realtime=True)
+
+
+class AudioOutput:
+    """音频输出管线
+
+    解码线程按固定周期把PCM数据填入环形缓冲区，输出线程从缓冲区取出
+    同样大小的周期交给输出端。播放位置由输出端已消费的样本数推算。
+    """
+
+    def __init__(self, pcm_bytes, sink, sample_rate=16000, channels=1,
+                 start_frame=0, period_frames=512, buffer_periods=4):
+        self.pcm_bytes = pcm_bytes
+        self.sink = sink
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.frame_bytes = 2 * channels
+        self.period_bytes = period_frames * self.frame_bytes
+        self.period_frames = period_frames
+        self.start_frame = start_frame
+        self.total_frames = len(pcm_bytes) // self.frame_bytes
+        self.ring = PCMRingBuffer(self.period_bytes * buffer_periods)
+
+        self._read_offset = start_frame * self.frame_bytes
+        self._eof = False
+        self._running = False
+        # 只用于唤醒等待的线程，缓冲区读写本身不加锁
+        self._data_ready = threading.Event()
+        self._space_ready = threading.Event()
+        self._decoder_thread = None
+        self._output_thread = None
+        self.finished = False
+        self.error = None
+
+        # 统计信息
+        self.underruns = 0
+        self.periods_played = 0
+        self.latency_ms = 0.0
+        self.max_latency_ms = 0.0
+
+    def start(self):
+        """启动解码线程和输出线程"""
+        self.sink.open(self.sample_rate, self.channels)
+        # 启动前先预填充缓冲区，避免开头出现欠载
+        end = self.total_frames * self.frame_bytes
+        while self._read_offset < end and self.ring.free_space() >= self.period_bytes:
+            chunk = self.pcm_bytes[self._read_offset:min(end, self._read_offset + self.period_bytes)]
+            self._read_offset += self.ring.write(chunk)
+        self._running = True
+        self._decoder_thread = threading.Thread(target=self._decode_loop, daemon=True)
+        self._output_thread = threading.Thread(target=self._output_loop, daemon=True)
+        self._decoder_thread.start()
+        self._output_thread.start()
+
+    def stop(self):
+        """停止播放并释放输出端"""
+        self._running = False
+        self._data_ready.set()
+        self._space_ready.set()
+        for thread in (self._decoder_thread, self._output_thread):
+            if thread is not None and thread is not threading.current_thread():
+                thread.join(timeout=1)
+
+    def wait(self, timeout=None):
+        """等待播放结束（用于无界面测试）"""
+        if self._output_thread is not None:
+            self._output_thread.join(timeout)
+
+    def _decode_loop(self):
+        period_time = self.period_frames / self.sample_rate
+        end = self.total_frames * self.frame_bytes
+        while self._running and self._read_offset < end:
+            if self.ring.free_space() < self.period_bytes:
+                self._space_ready.clear()
+                if self.ring.free_space() < self.period_bytes:
+                    self._space_ready.wait(period_time)
+                continue
+            chunk = self.pcm_bytes[self._read_offset:min(end, self._read_offset + self.period_bytes)]
+            self._read_offset += self.ring.write(chunk)
+            self._data_ready.set()
+        self._eof = True
+        self._data_ready.set()
+
+    def _output_loop(self):
+        period_time = self.period_frames / self.sample_rate
+        starve_deadline = None
+        starved = False
+        try:
+            while self._running:
+                if self.ring.available() < self.period_bytes and not self._eof:
+                    self._data_ready.clear()
+                    if self.ring.available() < self.period_bytes and not self._eof:
+                        # 开始播放后，实时输出端内部的数据播完了还没等到下一个周期才算欠载，
+                        # 一次连续的等待只记一次
+                        if self.periods_played and self.sink.realtime:
+                            now = time.perf_counter()
+                            if starve_deadline is None:
+                                starve_deadline = now + self.sink.latency_frames() / self.sample_rate
+                            if not starved and now >= starve_deadline:
+                                self.underruns += 1
+                                starved = True
+                        self._data_ready.wait(period_time)
+                    continue
+                starve_deadline = None
+                starved = False
+                data = self.ring.read(self.period_bytes)
+                self._space_ready.set()
+                if not data:
+                    break
+                self.sink.write(data)
+                self.periods_played += 1
+                self._update_latency()
+            self.finished = self._running
+        except Exception as e:
+            self.error = e
+        finally:
+            self._running = False
+            self.sink.close()
+
+    def _update_latency(self):
+        """端到端延迟 = 环形缓冲区中的数据 + 输出端内部缓冲"""
+        pending = self.ring.available() // self.frame_bytes + self.sink.latency_frames()
+        self.latency_ms = pending * 1000 / self.sample_rate
+        self.max_latency_ms = max(self.max_latency_ms, self.latency_ms)
+
+    @property
+    def is_active(self):
+        return self._running
+
+    def position_frames(self):
+        """当前播放位置（样本数）"""
+        return min(self.total_frames, self.start_frame + self.sink.frames_consumed)
+
+    def get_stats(self):
+        """获取输出统计信息"""
+        return {
+            'sink': self.sink.name,
+            'underruns': self.underruns,
+            'periods_played': self.periods_played,
+            'latency_ms': round(self.latency_ms, 2),
+            'max_latency_ms': round(self.max_latency_ms, 2),
+        }
+
+
+def decode_pcm_chunk(data):
+    """把16位小端序PCM字节解码为整数样本数组"""
+    samples = array('h')
+    samples.frombytes(data[:len(data) // 2 * 2])
+    if sys.byteorder == 'big':
+        samples.byteswap()
+    return samples
+
+
+def compute_peaks(samples, start, end, step):
+    """计算[start, end)范围内每step个样本的峰值，结果归一化到[-1, 1]"""
+    peaks = []
+    for i in range(start, end, step):
+        chunk = samples[i:min(end, i + step)]
+        if chunk:
+            peaks.append((max(chunk) / 32768.0, min(chunk) / 32768.0))
+    return peaks
+
+
+class PeakPyramid:
+    """多级最大/最小值降采样（波形金字塔）
+
+    第0级每 base_block 个样本保存一对最大/最小值，之后每一级把上一级相邻
+    两块合并。绘制时按每像素样本数选择合适的级别，任意缩放比例下每列只需
+    读取一两个块。
+    """
+
+    def __init__(self, base_block=64):
+        self.base_block = base_block
+        self.levels = []
+        self._base_max = array('h')
+        self._base_min = array('h')
+        self._base_end = 0
+
+    def add_samples(self, samples):
+        """在加载过程中增量计算第0级，只处理已完整的块"""
+        block = self.base_block
+        end = len(samples) // block * block
+        for i in range(self._base_end, end, block):
+            chunk = samples[i:i + block]
+            self._base_max.append(max(chunk))
+            self._base_min.append(min(chunk))
+        self._base_end = end
+
+    def finish(self, samples):
+        """处理最后不完整的块并生成更高的级别"""
+        self.add_samples(samples)
+        if self._base_end < len(samples):
+            chunk = samples[self._base_end:]
+            self._base_max.append(max(chunk))
+            self._base_min.append(min(chunk))
+            self._base_end = len(samples)
+
+        block = self.base_block
+        maxs, mins = self._base_max, self._base_min
+        self.levels = [(block, maxs, mins)]
+        while len(maxs) > 1:
+            if len(maxs) % 2:
+                maxs = maxs + maxs[-1:]
+                mins = mins + mins[-1:]
+            maxs = array('h', map(max, maxs[0::2], maxs[1::2]))
+            mins = array('h', map(min, mins[0::2], mins[1::2]))
+            block *= 2
+            self.levels.append((block, maxs, mins))
+
+    def memory_bytes(self):
+        return sum(len(maxs) * 4 for _, maxs, _ in self.levels)
+
+    def peak(self, samples, start, end):
+        """返回[start, end)范围内样本的(最大值, 最小值)"""
+        span = end - start
+        level = None
+        for candidate in self.levels:
+            if candidate[0] > span:
+                break
+            level = candidate
+        if level is None:
+            chunk = samples[start:end]
+            return max(chunk), min(chunk)
+        block, maxs, mins = level
+        first = start // block
+        last = max(first + 1, -(-end // block))
+        return max(maxs[first:last]), min(mins[first:last])
+
+
+class WaveformViewport:
+    """可缩放、可平移的波形视口
+
+    视口按固定宽度的图块绘制，每个图块是画布上的一条折线。图块坐标按
+    (每像素样本数, 图块序号) 缓存；同一缩放级别下平移时，已有的图块只用
+    canvas.move 整体移动，只有新露出的图块需要计算和创建。
+    """
+
+    TILE_WIDTH = 256
+
+    def __init__(self, canvas, width, height, tile_cache_size=2048):
+        self.canvas = canvas
+        self.width = width
+        self.height = height
+        self.tile_cache_size = tile_cache_size
+        self.samples = None
+        self.pyramid = None
+        self.spp = None
+        self.px_offset = 0.0
+        self.tile_items = {}
+        self._tile_cache = OrderedDict()
+
+        # 统计信息
+        self.tiles_computed = 0
+        self.tiles_reused = 0
+        self.last_render_ms = 0.0
+
+    def set_source(self, samples, pyramid):
+        """切换到新的音频数据"""
+        self.samples = samples
+        self.pyramid = pyramid
+        self._tile_cache.clear()
+        self.clear_items()
+
+    def clear_items(self):
+        """删除画布上的所有波形图块"""
+        self.canvas.delete('wave')
+        self.tile_items = {}
+        self.spp = None
+
+    def render(self, start_sample, spp):
+        """绘制从start_sample开始、每像素spp个样本的视口"""
+        if self.samples is None or self.pyramid is None:
+            return
+        begin = time.perf_counter()
+        new_offset = start_sample / spp
+        if spp != self.spp:
+            self.clear_items()
+            self.spp = spp
+        elif new_offset != self.px_offset:
+            # 同一缩放级别的平移：直接移动已经绘制的图块
+            self.canvas.move('wave', self.px_offset - new_offset, 0)
+        self.px_offset = new_offset
+
+        tile_width = self.TILE_WIDTH
+        first = int(self.px_offset // tile_width)
+        last = int((self.px_offset + self.width) // tile_width)
+        for tile in list(self.tile_items):
+            if tile < first or tile > last:
+                self.canvas.delete(self.tile_items.pop(tile))
+
+        for tile in range(first, last + 1):
+            if tile in self.tile_items:
+                self.tiles_reused += 1
+                continue
+            coords = self.tile_coords(tile)
+            if len(coords) < 4:
+                continue
+            shift = tile * tile_width - self.px_offset
+            shifted = [value + shift if i % 2 == 0 else value for i, value in enumerate(coords)]
+            self.tile_items[tile] = self.canvas.create_line(
+                shifted, fill='#2196F3', width=1, tags='wave')
+        self.last_render_ms = (time.perf_counter() - begin) * 1000
+
+    def tile_coords(self, tile):
+        """计算（或从缓存取出）一个图块的折线坐标，x相对于图块左边缘"""
+        key = (self.spp, tile)
+        coords = self._tile_cache.get(key)
+        if coords is not None:
+            self._tile_cache.move_to_end(key)
+            return coords
+
+        self.tiles_computed += 1
+        samples = self.samples
+        total = len(samples)
+        spp = self.spp
+        x0 = tile * self.TILE_WIDTH
+        center_y = self.height / 2
+        scale = center_y * 0.8 / 32768.0
+        coords = []
+        if spp < 1:
+            # 样本级缩放：直接连接各个样本点
+            first = max(0, int(x0 * spp))
+            last = min(total - 1, int((x0 + self.TILE_WIDTH) * spp) + 1)
+            for i in range(first, last + 1):
+                coords.append(i / spp - x0)
+                coords.append(center_y - samples[i] * scale)
+        else:
+            for column in range(self.TILE_WIDTH):
+                start = int((x0 + column) * spp)
+                if start >= total:
+                    break
+                end = min(total, max(start + 1, int((x0 + column + 1) * spp)))
+                max_val, min_val = self.pyramid.peak(samples, start, end)
+                coords.extend((column, center_y - max_val * scale,
+                               column, center_y - min_val * scale))
+
+        self._tile_cache[key] = coords
+        if len(self._tile_cache) > self.tile_cache_size:
+            self._tile_cache.popitem(last=False)
+        return coords
+
+
+def read_pcm_file(file_path, columns, chunk_bytes=1024 * 1024,
+                  cancel_event=None, on_progress=None):
+    """分块读取并解码PCM文件，同时计算波形峰值
+
+    on_progress(progress, peaks) 在每块数据解码后调用，peaks 只包含新完成的列。
+    被取消时返回 None，否则返回 (samples, peaks, pyramid)。
+    """
+    total_bytes = os.path.getsize(file_path)
+    step = max(1, (total_bytes // 2) // columns)
+    samples = array('h')
+    pyramid = PeakPyramid()
+    all_peaks = []
+    carry = b''
+    read_bytes = 0
+    peak_end = 0
+    with open(file_path, 'rb') as f:
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+            chunk = f.read(chunk_bytes)
+            if not chunk:
+                break
+            read_bytes += len(chunk)
+            chunk = carry + chunk
+            usable = len(chunk) // 2 * 2
+            carry = chunk[usable:]
+            samples.extend(decode_pcm_chunk(chunk[:usable]))
+            pyramid.add_samples(samples)
+
+            # 只发布已经完整的波形列
+            complete_end = len(samples) // step * step
+            peaks = compute_peaks(samples, peak_end, complete_end, step)
+            peak_end = complete_end
+            all_peaks.extend(peaks)
+            if on_progress is not None:
+                on_progress(read_bytes / total_bytes if total_bytes else 1.0, peaks)
+
+    all_peaks.extend(compute_peaks(samples, peak_end, len(samples), step))
+    pyramid.finish(samples)
+    return samples, all_peaks, pyramid
+
+
+def file_cache_key(file_path, columns):
+    """缓存键：路径 + 文件大小 + 修改时间 + 波形列数，文件变化后自动失效"""
+    stat = os.stat(file_path)
+    return (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns, columns)
+
+
+class DecodedAudioCache:
+    """已解码音频及峰值的LRU缓存，按占用内存限制容量"""
+
+    def __init__(self, max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def entry_size(samples, peaks, pyramid=None):
+        # 峰值每列是两个浮点数组成的元组，按约72字节估算
+        size = samples.itemsize * len(samples) + len(peaks) * 72
+        if pyramid is not None:
+            size += pyramid.memory_bytes()
+        return size
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def contains(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key, samples, peaks, pyramid=None):
+        """放入缓存，超过总容量的单个文件不缓存，返回是否已缓存"""
+        size = self.entry_size(samples, peaks, pyramid)
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            if key in self._entries:
+                self.memory_bytes -= self.entry_size(*self._entries.pop(key))
+            self._entries[key] = (samples, peaks, pyramid)
+            self.memory_bytes += size
+            while self.memory_bytes > self.max_bytes:
+                _, entry = self._entries.popitem(last=False)
+                self.memory_bytes -= self.entry_size(*entry)
+                self.evictions += 1
+        return True
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'memory_bytes': self.memory_bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+
+class PCMFileLoader:
+    """后台PCM文件加载器
+
+    在工作线程中分块读取并解码文件，通过队列把进度、增量峰值和最终结果
+    交给Tk主线程。每次 load() 都会取消上一次尚未完成的加载。
+    命中缓存时直接返回缓存中的结果。
+    """
+
+    def __init__(self, cache=None, chunk_bytes=1024 * 1024):
+        self.cache = cache
+        self.chunk_bytes = chunk_bytes
+        self.results = queue.Queue()
+        self.generation = 0
+        self._cancel_event = None
+
+    def load(self, file_path, columns):
+        """开始加载文件，返回本次加载的编号"""
+        self.cancel()
+        self.generation += 1
+        self._cancel_event = threading.Event()
+        worker = threading.Thread(target=self._worker,
+                                  args=(self.generation, file_path, columns, self._cancel_event),
+                                  daemon=True)
+        worker.start()
+        return self.generation
+
+    def cancel(self):
+        """取消当前的加载任务"""
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+            self._cancel_event = None
+
+    def _worker(self, generation, file_path, columns, cancel_event):
+        try:
+            key = file_cache_key(file_path, columns)
+            cached = self.cache.get(key) if self.cache is not None else None
+            if cached is not None:
+                self.results.put(('done', generation, file_path) + cached)
+                return
+
+            def on_progress(progress, peaks):
+                self.results.put(('progress', generation, progress, peaks))
+
+            result = read_pcm_file(file_path, columns, self.chunk_bytes,
+                                   cancel_event, on_progress)
+            if result is None or cancel_event.is_set():
+                return
+            if self.cache is not None:
+                self.cache.put(key, *result)
+            self.results.put(('done', generation, file_path) + result)
+        except Exception as e:
+            if not cancel_event.is_set():
+                self.results.put(('error', generation, file_path, str(e)))
+
+
+class AudioPrefetcher:
+    """预取器：在后台按列表顺序提前解码后续文件并放入缓存"""
+
+    def __init__(self, cache, columns, count=3):
+        self.cache = cache
+        self.columns = columns
+        self.count = count
+        self.prefetched = 0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._cancel_event = threading.Event()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def schedule(self, file_paths):
+        """替换待预取的文件列表（只保留前count个）"""
+        with self._lock:
+            self._pending = list(file_paths[:self.count])
+            # 让正在进行但已不需要的预取尽快结束
+            self._cancel_event.set()
+            self._cancel_event = threading.Event()
+        self._wakeup.set()
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _next(self):
+        with self._lock:
+            if not self._pending:
+                return None, None
+            return self._pending.pop(0), self._cancel_event
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            while True:
+                file_path, cancel_event = self._next()
+                if file_path is None:
+                    break
+                try:
+                    key = file_cache_key(file_path, self.columns)
+                    if self.cache.contains(key):
+                        continue
+                    result = read_pcm_file(file_path, self.columns, cancel_event=cancel_event)
+                    if result is not None and self.cache.put(key, *result):
+                        self.prefetched += 1
+                except Exception as e:
+                    # 任何异常都不能让预取线程退出，否则之后整个会话都不再预取
+                    print(f"预取文件失败: {file_path}, {e}")
+
+
+class DirectoryScanner:
+    """后台目录扫描器
+
+    在工作线程中递归扫描data目录树里的PCM文件，按层把目录分给线程池用 os.scandir 并行扫描，
+    每扫完一层就把结果按批次通过队列交给主线程，启动时不会阻塞窗口显示。
+    每个目录的结果按目录修改时间缓存，再次扫描时没有变化的目录直接复用上次的结果。
+    """
+
+    def __init__(self, batch_size=2000, workers=None):
+        self.batch_size = batch_size
+        self.workers = workers or min(32, (os.cpu_count() or 1) * 4)
+        self.results = queue.Queue()
+        # 目录路径 -> (list_directory的结果, [文件信息], [子目录路径])
+        self.cache = {}
+        self.cache_lock = threading.Lock()
+
+    def scan(self, data_dir):
+        """开始扫描目录"""
+        worker = threading.Thread(target=self._worker, args=(data_dir,), daemon=True)
+        worker.start()
+
+    def _scan_dir(self, data_dir, path):
+        """扫描一个目录，返回 (缓存条目, 是否重新扫描)；目录已不存在时条目为None
+
+        列表里保存的是转换好的文件信息，目录没有变化时连转换也不用重做。
+        """
+        with self.cache_lock:
+            cached = self.cache.get(path)
+        try:
+            listing, reused = list_directory(path, cached[0] if cached else None, suffix='.pcm')
+        except (FileNotFoundError, NotADirectoryError):
+            return None, False
+        if reused:
+            return cached, False
+        _, names, subdirs = listing
+        files = []
+        for name, size, mtime in names:
+            file_path = os.path.join(path, name)
+            files.append({
+                # 子目录中的文件显示相对data目录的路径
+                'name': os.path.relpath(file_path, data_dir).replace(os.sep, '/'),
+                'path': file_path,
+                'size': size,
+                'mtime': mtime
+            })
+        result = (listing, files, [os.path.join(path, name) for name in subdirs])
+        with self.cache_lock:
+            self.cache[path] = result
+        return result, True
+
+    def _worker(self, data_dir):
+        start = time.perf_counter()
+        batch = []
+        count = 0
+        dirs = 0
+        rescanned = 0
+        try:
+            frontier = [data_dir]
+            with ThreadPoolExecutor(self.workers) as pool:
+                while frontier:
+                    results = pool.map(lambda path: self._scan_dir(data_dir, path), frontier)
+                    frontier = []
+                    for entry, scanned in results:
+                        if entry is None:
+                            continue
+                        dirs += 1
+                        rescanned += scanned
+                        frontier.extend(entry[2])
+                        batch.extend(entry[1])
+                        if len(batch) >= self.batch_size:
+                            count += len(batch)
+                            self.results.put(('batch', batch))
+                            batch = []
+            count += len(batch)
+            if batch:
+                self.results.put(('batch', batch))
+            self.results.put(('done', count, time.perf_counter() - start, dirs, rescanned))
+        except Exception as e:
+            self.results.put(('error', str(e)))
+
+
+class VirtualFileList(Frame):
+    """虚拟化文件列表
+
+    只为当前可见的几行创建画布对象，显示文本也只在绘制时由 formatter 生成，
+    文件数量再多也不会拖慢界面。
+    接口上尽量与 tk.Listbox 保持一致（curselection / see / size）。
+    """
+
+    def __init__(self, master, height=6, row_height=20, font=('Arial', 10),
+                 command=None, formatter=str, **kwargs):
+        super().__init__(master, **kwargs)
+        self.row_height = row_height
+        self.font = font
+        self.command = command
+        self.formatter = formatter
+        self.file_data = []
+        self.selected = None
+        self.offset = 0
+
+        self.canvas = Canvas(self, height=height * row_height, bg='white',
+                             highlightthickness=1, highlightbackground='#ccc')
+        self.scrollbar = ttk.Scrollbar(self, orient='vertical', command=self.yview)
+        self.scrollbar.pack(side='right', fill='y')
+        self.canvas.pack(side='left', fill='both', expand=True)
+
+        self.canvas.bind('<Configure>', lambda e: self.redraw())
+        self.canvas.bind('<Button-1>', self.on_click)
+        self.canvas.bind('<MouseWheel>', self.on_mousewheel)
+        self.canvas.bind('<Button-4>', lambda e: self.yview('scroll', -1, 'units'))
+        self.canvas.bind('<Button-5>', lambda e: self.yview('scroll', 1, 'units'))
+        self.canvas.bind('<Up>', lambda e: self.move_selection(-1))
+        self.canvas.bind('<Down>', lambda e: self.move_selection(1))
+
+    def set_items(self, file_data):
+        """设置文件数据（列表直接引用，不复制）"""
+        self.file_data = file_data
+        if self.selected is not None and self.selected >= len(file_data):
+            self.selected = None
+        self.offset = min(self.offset, self.max_offset())
+        self.redraw()
+
+    def size(self):
+        return len(self.file_data)
+
+    def curselection(self):
+        return (self.selected,) if self.selected is not None else ()
+
+    def viewport_height(self):
+        return max(1, self.canvas.winfo_height())
+
+    def max_offset(self):
+        return max(0, len(self.file_data) * self.row_height - self.viewport_height())
+
+    def yview(self, *args):
+        """滚动条回调"""
+        if not args:
+            return
+        if args[0] == 'moveto':
+            total = len(self.file_data) * self.row_height
+            self.offset = float(args[1]) * total
+        elif args[0] == 'scroll':
+            amount = int(args[1])
+            if args[2] == 'pages':
+                self.offset += amount * self.viewport_height()
+            else:
+                self.offset += amount * self.row_height
+        self.offset = max(0, min(self.offset, self.max_offset()))
+        self.redraw()
+
+    def see(self, index):
+        """滚动使第index行可见"""
+        top = index * self.row_height
+        bottom = top + self.row_height
+        if top < self.offset:
+            self.offset = top
+        elif bottom > self.offset + self.viewport_height():
+            self.offset = bottom - self.viewport_height()
+        self.redraw()
+
+    def redraw(self):
+        """只绘制可见行"""
+        self.canvas.delete('all')
+        height = self.viewport_height()
+        width = self.canvas.winfo_width()
+        first = int(self.offset // self.row_height)
+        last = min(len(self.file_data), int((self.offset + height) // self.row_height) + 1)
+        for index in range(first, last):
+            y = index * self.row_height - self.offset
+            if index == self.selected:
+                self.canvas.create_rectangle(0, y, width, y + self.row_height,
+                                             fill='#2196F3', outline='')
+                color = 'white'
+            else:
+                color = '#333'
+            self.canvas.create_text(4, y + self.row_height / 2, text=self.formatter(self.file_data[index]),
+                                    anchor='w', font=self.font, fill=color)
+
+        total = len(self.file_data) * self.row_height
+        if total > 0:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + height) / total))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def select(self, index):
+        """选中第index行并触发回调"""
+        if not 0 <= index < len(self.file_data):
+            return
+        self.selected = index
+        self.see(index)
+        if self.command:
+            self.command(index)
+
+    def move_selection(self, delta):
+        current = self.selected if self.selected is not None else -1
+        self.select(current + delta)
+
+    def on_click(self, event):
+        self.canvas.focus_set()
+        self.select(int((event.y + self.offset) // self.row_height))
+
+    def on_mousewheel(self, event):
+        self.yview('scroll', -1 if event.delta > 0 else 1, 'units')
+
+
 class PCMPlayerGUI:
-    def __init__(self, root):
+    def __init__(self, root, sink_spec='auto', startup_time=None):
         self.root = root
+        self.startup_time = startup_time if startup_time is not None else time.perf_counter()
         self.root.title("PCM播放器")
         self.root.geometry("900x700")
         self.root.configure(bg='#f5f5f5')
         
         # 音频相关
         self.audio_data = None
+        self.pcm_bytes = b''
         self.sample_rate = 16000
         self.duration = 0
         self.current_time = 0
@@ -33,16 +1120,45 @@ class PCMPlayerGUI:
         self.start_time = 0
         self.paused_time = 0
         
+        # 音频输出
+        self.sink_spec = sink_spec
+        self.audio_output = None
+        
         # 波形数据
         self.waveform_data = []
         self.canvas_width = 800
         self.canvas_height = 200
+        self.playhead_id = None
+        
+        # 视口：view_start 为视口左边缘的样本位置，zoom_level 每级放大 2^(1/4) 倍
+        self.pyramid = None
+        self.view_start = 0.0
+        self.zoom_level = 0
+        self.viewport_dirty = False
         
         # 文件数据
         self.current_file_path = None
+        self.loading_file_path = None
+        self.audio_cache = DecodedAudioCache()
+        self.file_loader = PCMFileLoader(self.audio_cache)
+        self.prefetcher = AudioPrefetcher(self.audio_cache, self.canvas_width)
+        self.load_generation = 0
+        self.is_polling_loader = False
+        self.dir_scanner = DirectoryScanner()
+        self.scanned_files = []
         
         self.setup_ui()
-        self.load_data_directory()
+        # 所有周期性的界面刷新都经过调度器合并
+        self.ui_scheduler = UIRefreshScheduler(self.root, self.refresh_ui)
+        
+        # 窗口显示后再扫描目录
+        self.root.after_idle(self.on_window_shown)
+        self.root.after(10, self.load_data_directory)
+    
+    def on_window_shown(self):
+        """记录窗口显示耗时"""
+        elapsed = (time.perf_counter() - self.startup_time) * 1000
+        print(f"窗口已显示, 启动耗时: {elapsed:.0f}ms")
     
     def setup_ui(self):
         """设置用户界面"""
@@ -81,17 +1197,18 @@ class PCMPlayerGUI:
         list_frame = Frame(main_frame, bg='#f5f5f5')
         list_frame.pack(fill='both', expand=True, pady=(0, 20))
         
-        list_label = Label(list_frame, text="data目录中的PCM文件：", 
-                          font=('Arial', 12, 'bold'), 
-                          bg='#f5f5f5', fg='#333')
-        list_label.pack(anchor='w', pady=(0, 10))
+        self.list_label = Label(list_frame, text="data目录中的PCM文件：", 
+                               font=('Arial', 12, 'bold'), 
+                               bg='#f5f5f5', fg='#333')
+        self.list_label.pack(anchor='w', pady=(0, 10))
         
-        # 文件列表
-        self.file_listbox = tk.Listbox(list_frame, height=6, 
-                                      font=('Arial', 10),
-                                      selectmode='single')
+        # 文件列表（虚拟化，只渲染可见行）
+        self.file_listbox = VirtualFileList(list_frame, height=6,
+                                            font=('Arial', 10),
+                                            command=self.on_file_select,
+                                            formatter=self.format_file_item,
+                                            bg='#f5f5f5')
         self.file_listbox.pack(fill='both', expand=True)
-        self.file_listbox.bind('<<ListboxSelect>>', self.on_file_select)
         
         # 波形显示框架
         waveform_frame = Frame(main_frame, bg='#f5f5f5')
@@ -110,6 +1227,24 @@ class PCMPlayerGUI:
         self.canvas.bind('<Button-1>', self.on_canvas_click)
         self.canvas.bind('<B1-Motion>', self.on_canvas_drag)
         self.canvas.bind('<ButtonRelease-1>', self.on_canvas_release)
+        self.canvas.bind('<MouseWheel>', self.on_canvas_wheel)
+        self.canvas.bind('<Button-4>', lambda e: self.zoom_at(e.x, 1))
+        self.canvas.bind('<Button-5>', lambda e: self.zoom_at(e.x, -1))
+        self.canvas.bind('<Shift-Button-4>', lambda e: self.pan_pixels(-self.canvas_width / 8))
+        self.canvas.bind('<Shift-Button-5>', lambda e: self.pan_pixels(self.canvas_width / 8))
+        self.viewport = WaveformViewport(self.canvas, self.canvas_width, self.canvas_height)
+        
+        # 视口滚动条和缩放按钮
+        self.view_scrollbar = ttk.Scrollbar(waveform_frame, orient='horizontal',
+                                            command=self.on_view_scroll)
+        self.view_scrollbar.pack(fill='x')
+        zoom_frame = Frame(waveform_frame, bg='#f5f5f5')
+        zoom_frame.pack(anchor='e', pady=(5, 0))
+        for text, command in (("放大", lambda: self.zoom_at(self.canvas_width / 2, 4)),
+                              ("缩小", lambda: self.zoom_at(self.canvas_width / 2, -4)),
+                              ("全景", self.reset_view)):
+            Button(zoom_frame, text=text, command=command,
+                   font=('Arial', 9), padx=8).pack(side='left', padx=(5, 0))
         
         # 控制框架
         control_frame = Frame(main_frame, bg='#f5f5f5')
@@ -151,11 +1286,18 @@ class PCMPlayerGUI:
                                    length=400, resolution=0.1)
         self.progress_scale.pack(fill='x', pady=10)
         
+        # 调试信息面板
+        self.debug_label = Label(main_frame, text="", 
+                                font=('Arial', 9), 
+                                bg='#f5f5f5', fg='#999', anchor='w')
+        self.debug_label.pack(fill='x')
+        self.root.after(1000, self.update_debug_panel)
+        
         # 拖拽状态
         self.is_dragging = False
     
     def load_data_directory(self):
-        """加载data目录中的文件"""
+        """在后台扫描data目录中的文件"""
         # 获取data目录路径
         if getattr(sys, 'frozen', False):
             base_dir = os.path.dirname(sys.executable)
@@ -168,40 +1310,68 @@ class PCMPlayerGUI:
             print(f"已创建data目录: {data_dir}")
         
         # 清空列表
-        self.file_listbox.delete(0, tk.END)
+        self.scanned_files = []
+        self.file_listbox.set_items(self.scanned_files)
+        self.list_label.config(text="data目录中的PCM文件：（正在扫描...）")
         
-        # 扫描PCM文件
-        pcm_files = []
+        self.dir_scanner.scan(data_dir)
+        self.root.after(30, self.poll_dir_scanner)
+    
+    def poll_dir_scanner(self):
+        """在主线程中接收扫描结果并刷新列表"""
+        finished = False
+        updated = False
         try:
-            for filename in os.listdir(data_dir):
-                if filename.lower().endswith('.pcm'):
-                    filepath = os.path.join(data_dir, filename)
-                    stat = os.stat(filepath)
-                    pcm_files.append({
-                        'name': filename,
-                        'path': filepath,
-                        'size': stat.st_size,
-                        'mtime': stat.st_mtime
-                    })
-        except Exception as e:
-            print(f"扫描data目录失败: {e}")
-            return
+            while True:
+                message = self.dir_scanner.results.get_nowait()
+                if message[0] == 'batch':
+                    self.scanned_files.extend(message[1])
+                    updated = True
+                elif message[0] == 'done':
+                    finished = True
+                    count, elapsed, dirs, rescanned = message[1:5]
+                    total = (time.perf_counter() - self.startup_time) * 1000
+                    print(f"目录扫描完成: {count}个文件, {dirs}个目录（重新扫描{rescanned}个）, "
+                          f"扫描耗时: {elapsed * 1000:.0f}ms, 启动至列表就绪: {total:.0f}ms")
+                    self.list_label.config(
+                        text=f"data目录中的PCM文件：（{count}个, 扫描耗时 {elapsed * 1000:.0f}ms）")
+                elif message[0] == 'error':
+                    finished = True
+                    print(f"扫描data目录失败: {message[1]}")
+                    self.list_label.config(text="data目录中的PCM文件：（扫描失败）")
+        except queue.Empty:
+            pass
         
-        # 按修改时间排序
-        pcm_files.sort(key=lambda x: x['mtime'], reverse=True)
+        if updated or finished:
+            self.update_file_list(finished)
         
-        # 添加到列表
-        for file_info in pcm_files:
-            size_mb = file_info['size'] / (1024 * 1024)
-            display_text = f"{file_info['name']} ({size_mb:.1f} MB)"
-            self.file_listbox.insert(tk.END, display_text)
-        
-        # 存储文件数据
-        self.file_listbox.file_data = pcm_files
+        if not finished:
+            self.root.after(30, self.poll_dir_scanner)
+        elif self.scanned_files and self.current_file_path is None and self.loading_file_path is None:
+            # 如果有文件，空闲时自动加载第一个
+            first = self.scanned_files[0]['path']
+            self.root.after_idle(lambda: self.load_pcm_file(first))
+    
+    def update_file_list(self, finished=False):
+        """刷新虚拟列表
         
-        # 如果有文件，自动加载第一个
-        if pcm_files:
-            self.load_pcm_file(pcm_files[0]['path'])
+        扫描过程中新的一批文件直接追加在末尾，列表中已有的行和选中项都不变；
+        扫描结束后按修改时间排序一次，避免每来一批就把整个列表重新排序。
+        """
+        pcm_files = self.scanned_files
+        if finished:
+            selection = self.file_listbox.curselection()
+            selected = pcm_files[selection[0]] if selection else None
+            pcm_files.sort(key=lambda x: x['mtime'], reverse=True)
+            # 排序后保持原来选中的文件
+            if selected is not None:
+                self.file_listbox.selected = pcm_files.index(selected)
+        self.file_listbox.set_items(pcm_files)
+    
+    @staticmethod
+    def format_file_item(file_info):
+        """文件列表中一行的显示文本"""
+        return f"{file_info['name']} ({file_info['size'] / (1024 * 1024):.1f} MB)"
     
     def select_file(self):
         """选择PCM文件"""
@@ -212,52 +1382,142 @@ class PCMPlayerGUI:
         if file_path:
             self.load_pcm_file(file_path)
     
-    def on_file_select(self, event):
+    def on_file_select(self, index):
         """文件列表选择事件"""
-        selection = self.file_listbox.curselection()
-        if selection and hasattr(self.file_listbox, 'file_data'):
-            file_info = self.file_listbox.file_data[selection[0]]
+        if 0 <= index < len(self.file_listbox.file_data):
+            file_info = self.file_listbox.file_data[index]
             self.load_pcm_file(file_info['path'])
     
     def load_pcm_file(self, file_path):
-        """加载PCM文件"""
+        """加载PCM文件（在后台线程中读取和解码）"""
+        self.stop()
+        self.audio_data = None
+        self.pcm_bytes = b''
+        self.duration = 0
+        self.current_time = 0
+        self.paused_time = 0
+        self.waveform_data = []
+        self.pyramid = None
+        self.viewport.set_source(None, None)
+        self.view_start = 0.0
+        self.zoom_level = 0
+        self.loading_file_path = file_path
+        self.play_btn.config(state='disabled')
+        self.stop_btn.config(state='disabled')
+        
+        # 清空画布，波形随数据到达从左向右逐步绘制
+        self.canvas.delete("all")
+        self.playhead_id = None
+        self.draw_grid()
+        
+        filename = os.path.basename(file_path)
+        self.file_label.config(text=f"正在加载: {filename}")
+        self.load_generation = self.file_loader.load(file_path, self.canvas_width)
+        
+        if not self.is_polling_loader:
+            self.is_polling_loader = True
+            self.root.after(30, self.poll_file_loader)
+    
+    def poll_file_loader(self):
+        """在主线程中处理后台加载器发来的消息"""
+        busy = self.loading_file_path is not None
         try:
-            with open(file_path, 'rb') as f:
-                data = f.read()
-            
-            # 解析PCM数据
-            self.audio_data = self.parse_pcm_data(data)
-            self.duration = len(self.audio_data) / self.sample_rate
-            self.current_time = 0
-            self.current_file_path = file_path
-            
-            # 生成波形数据
-            self.generate_waveform()
-            
-            # 更新UI
-            filename = os.path.basename(file_path)
-            self.file_label.config(text=f"当前文件: {filename}")
-            self.play_btn.config(state='normal')
-            self.stop_btn.config(state='normal')
-            
-            # 绘制波形
-            self.draw_waveform()
-            self.update_time_display()
-            
-            print(f"已加载文件: {filename}, 时长: {self.duration:.2f}秒")
-            
-        except Exception as e:
-            messagebox.showerror("错误", f"加载文件失败: {str(e)}")
+            while True:
+                message = self.file_loader.results.get_nowait()
+                kind, generation = message[0], message[1]
+                if generation != self.load_generation:
+                    # 已被取消的旧任务
+                    continue
+                if kind == 'progress':
+                    self.on_load_progress(message[2], message[3])
+                elif kind == 'done':
+                    self.on_load_done(message[2], message[3], message[4], message[5])
+                    busy = False
+                elif kind == 'error':
+                    self.loading_file_path = None
+                    busy = False
+                    self.file_label.config(text="未选择文件")
+                    messagebox.showerror("错误", f"加载文件失败: {message[3]}")
+        except queue.Empty:
+            pass
+        
+        if busy:
+            self.root.after(30, self.poll_file_loader)
+        else:
+            self.is_polling_loader = False
+    
+    def on_load_progress(self, progress, peaks):
+        """加载进度更新：追加新的波形列"""
+        start = len(self.waveform_data)
+        self.waveform_data.extend(peaks)
+        self.draw_waveform_columns(start, peaks)
+        filename = os.path.basename(self.loading_file_path)
+        self.file_label.config(text=f"正在加载: {filename} ({progress * 100:.0f}%)")
+    
+    def on_load_done(self, file_path, samples, peaks, pyramid):
+        """加载完成"""
+        self.waveform_data = peaks
+        self.pyramid = pyramid
+        self.viewport.set_source(samples, pyramid)
+        
+        self.audio_data = samples
+        if sys.byteorder == 'little':
+            # 直接共享样本数组的内存，不再复制一份原始字节
+            self.pcm_bytes = memoryview(samples).cast('B')
+        else:
+            swapped = array('h', samples)
+            swapped.byteswap()
+            self.pcm_bytes = swapped.tobytes()
+        self.duration = len(samples) / self.sample_rate
+        self.current_time = 0
+        self.current_file_path = file_path
+        self.loading_file_path = None
+        
+        # 更新UI
+        filename = os.path.basename(file_path)
+        self.file_label.config(text=f"当前文件: {filename}")
+        self.play_btn.config(state='normal')
+        self.stop_btn.config(state='normal')
+        self.draw_waveform()
+        self.refresh_ui()
+        
+        print(f"已加载文件: {filename}, 时长: {self.duration:.2f}秒")
+        
+        # 预取列表中接下来的几个文件
+        self.prefetch_next(file_path)
+        self.update_debug_panel(reschedule=False)
+    
+    def prefetch_next(self, file_path):
+        """按列表顺序预取当前文件之后的文件"""
+        file_data = self.file_listbox.file_data
+        paths = [info['path'] for info in file_data]
+        try:
+            index = paths.index(file_path)
+        except ValueError:
+            return
+        self.prefetcher.schedule(paths[index + 1:index + 1 + self.prefetcher.count])
+    
+    def update_debug_panel(self, reschedule=True):
+        """刷新调试面板：缓存命中率、内存占用、预取状态和界面刷新调度"""
+        stats = self.audio_cache.get_stats()
+        memory_mb = stats['memory_bytes'] / (1024 * 1024)
+        max_mb = stats['max_bytes'] / (1024 * 1024)
+        ui = self.ui_scheduler.get_stats()
+        self.debug_label.config(
+            text=f"缓存: 命中 {stats['hits']} / 未命中 {stats['misses']}, "
+                 f"{stats['entries']}个文件, 内存 {memory_mb:.1f} / {max_mb:.0f} MB, "
+                 f"淘汰 {stats['evictions']}, 已预取 {self.prefetcher.prefetched}, "
+                 f"待预取 {self.prefetcher.pending_count()}\n"
+                 f"刷新: {ui['frames']}帧 / {ui['requests']}次请求（合并 {ui['coalesced']}）, "
+                 f"间隔 {ui['interval_ms']} ms, 上一帧 {ui['last_frame_ms']:.1f} ms, "
+                 f"超预算 {ui['over_budget_frames']}, 延迟 {ui['late_frames']}")
+        if reschedule:
+            self.root.after(1000, self.update_debug_panel)
     
     def parse_pcm_data(self, data):
         """解析PCM数据"""
-        # 16位小端序PCM数据
-        samples = []
-        for i in range(0, len(data), 2):
-            if i + 1 < len(data):
-                sample = struct.unpack('<h', data[i:i+2])[0]  # 16位小端序
-                samples.append(sample / 32768.0)  # 归一化到[-1, 1]
-        return samples
+        # 16位小端序PCM数据，样本保持为int16，绘制时再归一化
+        return decode_pcm_chunk(data)
     
     def generate_waveform(self):
         """生成波形数据"""
@@ -266,14 +1526,7 @@ class PCMPlayerGUI:
         
         # 降采样到画布宽度
         step = max(1, len(self.audio_data) // self.canvas_width)
-        self.waveform_data = []
-        
-        for i in range(0, len(self.audio_data), step):
-            chunk = self.audio_data[i:i+step]
-            if chunk:
-                max_val = max(chunk)
-                min_val = min(chunk)
-                self.waveform_data.append((max_val, min_val))
+        self.waveform_data = compute_peaks(self.audio_data, 0, len(self.audio_data), step)
     
     def draw_waveform(self):
         """绘制波形"""
@@ -281,23 +1534,123 @@ class PCMPlayerGUI:
             return
         
         self.canvas.delete("all")
+        self.playhead_id = None
+        self.viewport.clear_items()
         
         # 绘制网格
         self.draw_grid()
         
-        # 绘制波形
+        # 绘制波形：有波形金字塔时按视口绘制，否则绘制整体概览
+        if self.pyramid is not None:
+            self.render_viewport()
+        else:
+            self.draw_waveform_columns(0, self.waveform_data)
+        
+        # 绘制播放指示线
+        self.draw_playhead()
+    
+    def full_spp(self):
+        """整个文件铺满画布时的每像素样本数"""
+        return max(1, len(self.audio_data)) / self.canvas_width
+    
+    def view_spp(self):
+        """当前缩放级别的每像素样本数"""
+        if self.audio_data is None:
+            return 1.0
+        return self.full_spp() / (2 ** (self.zoom_level / 4))
+    
+    def clamp_view(self):
+        """把视口限制在文件范围内"""
+        total = len(self.audio_data) if self.audio_data is not None else 0
+        max_start = max(0.0, total - self.view_spp() * self.canvas_width)
+        self.view_start = max(0.0, min(self.view_start, max_start))
+    
+    def time_at_x(self, x):
+        """画布横坐标对应的播放时间"""
+        sample = self.view_start + x * self.view_spp()
+        return max(0, min(self.duration, sample / self.sample_rate))
+    
+    def render_viewport(self):
+        """绘制当前视口并更新滚动条"""
+        self.viewport_dirty = False
+        if self.pyramid is None:
+            return
+        self.clamp_view()
+        spp = self.view_spp()
+        self.viewport.render(self.view_start, spp)
+        if self.playhead_id is not None:
+            self.canvas.tag_raise(self.playhead_id)
+        
+        total = len(self.audio_data)
+        if total > 0:
+            first = self.view_start / total
+            last = min(1.0, (self.view_start + spp * self.canvas_width) / total)
+            self.view_scrollbar.set(first, last)
+    
+    def zoom_at(self, x, steps):
+        """以画布横坐标x为中心缩放，steps为正时放大"""
+        if self.pyramid is None:
+            return
+        anchor = self.view_start + x * self.view_spp()
+        # 最大放大到每个样本约32像素
+        max_level = max(0, int(4 * math.log2(self.full_spp() * 32)))
+        self.zoom_level = max(0, min(max_level, self.zoom_level + steps))
+        self.view_start = anchor - x * self.view_spp()
+        self.request_viewport_render()
+    
+    def pan_pixels(self, dx):
+        """按像素平移视口"""
+        if self.pyramid is None:
+            return
+        self.view_start += dx * self.view_spp()
+        self.request_viewport_render()
+    
+    def reset_view(self):
+        """恢复到显示整个文件"""
+        self.zoom_level = 0
+        self.view_start = 0.0
+        self.request_viewport_render()
+    
+    def request_viewport_render(self):
+        """标记视口需要重绘，由UI调度器合并到下一帧"""
+        self.viewport_dirty = True
+        self.ui_scheduler.request()
+    
+    def on_canvas_wheel(self, event):
+        """鼠标滚轮缩放，按住Shift时平移"""
+        direction = 1 if event.delta > 0 else -1
+        if event.state & 0x0001:
+            self.pan_pixels(-direction * self.canvas_width / 8)
+        else:
+            self.zoom_at(event.x, direction)
+    
+    def on_view_scroll(self, *args):
+        """视口滚动条回调"""
+        if self.pyramid is None:
+            return
+        total = len(self.audio_data)
+        if args[0] == 'moveto':
+            self.view_start = float(args[1]) * total
+        elif args[0] == 'scroll':
+            amount = int(args[1])
+            page = self.canvas_width if args[2] == 'pages' else self.canvas_width / 8
+            self.view_start += amount * page * self.view_spp()
+        self.request_viewport_render()
+    
+    def draw_waveform_columns(self, start, peaks):
+        """从第start列开始绘制一段波形"""
         center_y = self.canvas_height // 2
         scale = center_y * 0.8
         
-        for i, (max_val, min_val) in enumerate(self.waveform_data):
+        for i, (max_val, min_val) in enumerate(peaks, start):
             x = i
             y1 = center_y - max_val * scale
             y2 = center_y - min_val * scale
             
             self.canvas.create_line(x, y1, x, y2, fill='#2196F3', width=1)
         
-        # 绘制播放指示线
-        self.draw_playhead()
+        if self.playhead_id is not None:
+            self.canvas.tag_raise(self.playhead_id)
     
     def draw_grid(self):
         """绘制网格"""
@@ -314,31 +1667,47 @@ class PCMPlayerGUI:
         self.canvas.create_line(0, center_y, self.canvas_width, center_y, fill='#ddd', width=1)
     
     def draw_playhead(self):
-        """绘制播放指示线"""
-        if self.duration > 0:
+        """绘制播放指示线（复用同一个画布对象，只移动坐标）"""
+        if self.duration <= 0:
+            return
+        if self.pyramid is not None:
+            x = (self.current_time * self.sample_rate - self.view_start) / self.view_spp()
+        else:
             x = (self.current_time / self.duration) * self.canvas_width
-            self.canvas.create_line(x, 0, x, self.canvas_height, fill='#1976D2', width=2)
+        if self.playhead_id is None:
+            self.playhead_id = self.canvas.create_line(x, 0, x, self.canvas_height,
+                                                       fill='#1976D2', width=2)
+        else:
+            self.canvas.coords(self.playhead_id, x, 0, x, self.canvas_height)
+    
+    def refresh_ui(self):
+        """刷新时间、进度条、视口和播放指示线（由UI调度器在主线程调用）"""
+        if self.is_playing and self.zoom_level > 0 and self.pyramid is not None:
+            # 放大时让视口跟随播放位置翻页
+            x = (self.current_time * self.sample_rate - self.view_start) / self.view_spp()
+            if x < 0 or x > self.canvas_width:
+                self.view_start = self.current_time * self.sample_rate
+                self.viewport_dirty = True
+        if self.viewport_dirty:
+            self.render_viewport()
+        self.update_time_display()
+        self.update_progress()
+        self.draw_playhead()
     
     def on_canvas_click(self, event):
         """画布点击事件"""
         if self.duration > 0:
-            x = event.x
-            self.current_time = (x / self.canvas_width) * self.duration
+            self.current_time = self.time_at_x(event.x)
             self.paused_time = self.current_time
-            self.update_time_display()
-            self.update_progress()
-            self.draw_playhead()
+            self.ui_scheduler.request()
     
     def on_canvas_drag(self, event):
         """画布拖拽事件"""
         if self.duration > 0:
             self.is_dragging = True
-            x = event.x
-            self.current_time = max(0, min(self.duration, (x / self.canvas_width) * self.duration))
+            self.current_time = self.time_at_x(event.x)
             self.paused_time = self.current_time
-            self.update_time_display()
-            self.update_progress()
-            self.draw_playhead()
+            self.ui_scheduler.request()
     
     def on_canvas_release(self, event):
         """画布释放事件"""
@@ -349,8 +1718,7 @@ class PCMPlayerGUI:
         if self.duration > 0:
             self.current_time = (float(value) / 100) * self.duration
             self.paused_time = self.current_time
-            self.update_time_display()
-            self.draw_playhead()
+            self.ui_scheduler.request()
     
     def toggle_play(self):
         """切换播放状态"""
@@ -367,49 +1735,68 @@ class PCMPlayerGUI:
         self.is_playing = True
         self.play_btn.config(text="暂停")
         
-        # 记录开始时间
-        self.start_time = time.time() - self.current_time
+        # 从当前位置启动输出管线
+        start_frame = int(self.current_time * self.sample_rate)
+        try:
+            sink = create_sink(self.sink_spec)
+            self.audio_output = AudioOutput(self.pcm_bytes, sink,
+                                            sample_rate=self.sample_rate,
+                                            start_frame=start_frame)
+            self.audio_output.start()
+        except Exception as e:
+            self.is_playing = False
+            self.play_btn.config(text="播放")
+            messagebox.showerror("错误", f"打开音频输出失败: {str(e)}")
+            return
         
-        # 在新线程中播放
+        # 在新线程中跟踪播放位置
         self.play_thread = threading.Thread(target=self.play_audio)
         self.play_thread.daemon = True
         self.play_thread.start()
     
+    def stop_output(self):
+        """停止音频输出管线"""
+        if self.audio_output is not None:
+            self.audio_output.stop()
+            print(f"音频输出统计: {self.audio_output.get_stats()}")
+            self.audio_output = None
+    
     def pause(self):
         """暂停播放"""
         self.is_playing = False
+        if self.audio_output is not None:
+            self.current_time = self.audio_output.position_frames() / self.sample_rate
+        self.stop_output()
         self.paused_time = self.current_time
         self.play_btn.config(text="播放")
     
     def stop(self):
         """停止播放"""
         self.is_playing = False
+        self.stop_output()
         self.current_time = 0
         self.paused_time = 0
         self.play_btn.config(text="播放")
-        self.update_time_display()
-        self.update_progress()
-        self.draw_playhead()
+        self.refresh_ui()
     
     def play_audio(self):
-        """播放音频（模拟）"""
-        while self.is_playing and self.current_time < self.duration:
-            self.current_time = time.time() - self.start_time
+        """跟踪播放位置，位置以输出端已消费的样本数为准"""
+        output = self.audio_output
+        while self.is_playing and output is self.audio_output:
+            self.current_time = output.position_frames() / self.sample_rate
             
-            # 限制在有效范围内
-            if self.current_time >= self.duration:
-                self.current_time = self.duration
+            if not output.is_active:
+                if output.error is not None:
+                    print(f"音频输出错误: {output.error}")
                 break
             
-            # 更新UI（在主线程中）
-            self.root.after(0, self.update_time_display)
-            self.root.after(0, self.update_progress)
-            self.root.after(0, self.draw_playhead)
+            # 请求刷新UI，由调度器合并后在主线程中执行
+            self.ui_scheduler.request()
             
-            time.sleep(0.1)
+            time.sleep(0.01)
         
         # 播放结束
-        if self.is_playing:
+        if self.is_playing and output is self.audio_output:
             self.root.after(0, self.stop)
     
     def update_time_display(self):
@@ -432,6 +1819,12 @@ class PCMPlayerGUI:
 
 def main():
     """主函数"""
+    startup_time = time.perf_counter()
+    parser = argparse.ArgumentParser(description="PCM播放器")
+    parser.add_argument('--sink', default='auto',
+                        help="音频输出端: auto / device / null / wav:<路径>")
+    args, _ = parser.parse_known_args()
+    
     # 获取可执行文件所在目录
     if getattr(sys, 'frozen', False):
         base_dir = os.path.dirname(sys.executable)
@@ -446,7 +1839,7 @@ def main():
     
     # 创建GUI应用
     root = tk.Tk()
-    app = PCMPlayerGUI(root)
+    app = PCMPlayerGUI(root, sink_spec=args.sink, startup_time=startup_time)
     
     try:
         root.mainloop()
@@ -10,12 +10,16 @@ import sys
 import webbrowser
 import threading
 import time
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
 from urllib.parse import urlparse
 import json
+import stat
 import socket
+import argparse
 
-class DesktopPCMPlayerHandler(SimpleHTTPRequestHandler):
+from http_keepalive import KeepAliveMixin, content_disposition
+
+class DesktopPCMPlayerHandler(KeepAliveMixin, SimpleHTTPRequestHandler):
     def __init__(self, *args, **kwargs):
         # 获取可执行文件所在目录
         if getattr(sys, 'frozen', False):
@@ -52,28 +56,28 @@ class DesktopPCMPlayerHandler(SimpleHTTPRequestHandler):
     
     def serve_html(self):
         """返回HTML页面"""
-        html_content = self.get_html_content()
-        
-        self.send_response(200)
-        self.send_header('Content-Type', 'text/html; charset=utf-8')
-        self.end_headers()
-        self.wfile.write(html_content.encode('utf-8'))
+        self.send_text(self.get_html_content(), 'text/html; charset=utf-8')
     
     def serve_static_file(self, path):
         """返回静态文件"""
         if path == '/style.css':
-            self.send_response(200)
-            self.send_header('Content-Type', 'text/css')
-            self.end_headers()
-            self.wfile.write(self.get_css_content().encode('utf-8'))
+            self.send_text(self.get_css_content(), 'text/css')
         elif path == '/script.js':
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/javascript')
-            self.end_headers()
-            self.wfile.write(self.get_js_content().encode('utf-8'))
+            self.send_text(self.get_js_content(), 'application/javascript')
+        elif path == '/worker.js':
+            self.send_text(self.get_worker_js_content(), 'application/javascript')
         else:
             self.send_error(404, "文件未找到")
     
+    def send_text(self, content, content_type):
+        """发送文本内容，带Content-Length以便复用连接"""
+        body = content.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
     def handle_file_list(self):
         """处理文件列表请求"""
         try:
@@ -89,19 +93,22 @@ class DesktopPCMPlayerHandler(SimpleHTTPRequestHandler):
                         files.append({
                             'name': filename,
                             'size': stat.st_size,
-                            'mtime': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(stat.st_mtime))
+                            'mtime': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(stat.st_mtime)),
+                            'etag': self.make_etag(stat)
                         })
             
             # 按修改时间降序排序
             files.sort(key=lambda x: x['mtime'], reverse=True)
             
+            response = json.dumps(files, ensure_ascii=False).encode('utf-8')
+            
             self.send_response(200)
             self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(response)))
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
             
-            response = json.dumps(files, ensure_ascii=False)
-            self.wfile.write(response.encode('utf-8'))
+            self.wfile.write(response)
             
         except Exception as e:
             self.send_error(500, f"获取文件列表失败: {str(e)}")
@@ -120,20 +127,40 @@ class DesktopPCMPlayerHandler(SimpleHTTPRequestHandler):
                 self.send_error(404, "文件不存在")
                 return
             
+            # 客户端缓存的版本仍然有效时只返回304
+            stat = os.stat(filepath)
+            etag = self.make_etag(stat)
+            if etag in self.headers.get('If-None-Match', ''):
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.end_headers()
+                return
+            
             # 设置PCM文件的MIME类型
             self.send_response(200)
             self.send_header('Content-Type', 'application/octet-stream')
-            self.send_header('Content-Disposition', f'inline; filename="{filename}"')
+            self.send_header('Content-Disposition', content_disposition(filename))
+            self.send_header('Content-Length', str(stat.st_size))
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', self.date_time_string(stat.st_mtime))
             self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Access-Control-Expose-Headers', 'ETag, Content-Length')
             self.end_headers()
             
-            # 读取并发送文件内容
+            # 由内核直接从文件拷贝到socket，不把整个文件读进内存
             with open(filepath, 'rb') as f:
-                self.wfile.write(f.read())
+                self.send_file_body(f, 0, stat.st_size)
                 
         except Exception as e:
             self.send_error(500, f"读取文件失败: {str(e)}")
     
+    @staticmethod
+    def make_etag(stat):
+        """根据文件大小和修改时间生成ETag，文件内容变化后随之改变"""
+        return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    
     def get_html_content(self):
         """获取HTML内容"""
         return '''<!DOCTYPE html>
@@ -174,6 +201,7 @@ class DesktopPCMPlayerHandler(SimpleHTTPRequestHandler):
         
         <div class="waveform">
             <canvas id="waveformCanvas"></canvas>
+            <canvas id="overlayCanvas"></canvas>
         </div>
         
         <div class="controls">
@@ -329,10 +357,17 @@ class DesktopPCMPlayerHandler(SimpleHTTPRequestHandler):
 }
 
 .waveform canvas {
+    position: absolute;
+    top: 0;
+    left: 0;
     width: 100%;
     height: 100%;
 }
 
+#overlayCanvas {
+    pointer-events: none;
+}
+
 .controls {
     padding: 20px;
     background: #f8f9fa;
@@ -406,9 +441,349 @@ class DesktopPCMPlayerHandler(SimpleHTTPRequestHandler):
     text-align: center;
 }'''
     
+    def get_shared_js_content(self):
+        """获取主页面与Worker共用的JavaScript内容"""
+        return '''// 主页面与Worker共用的解码和绘制函数
+const PEAK_BUCKETS = 8192;
+
+function isLittleEndian() {
+    return new Uint8Array(new Uint16Array([1]).buffer)[0] === 1;
+}
+
+function pcmToFloat32(arrayBuffer, out) {
+    // 16位小端序PCM：在原始数据上建立Int16Array视图，一次性转换
+    const totalSamples = out.length;
+    if (isLittleEndian()) {
+        const samples = new Int16Array(arrayBuffer, 0, totalSamples);
+        const scale = 1 / 32768;
+        for (let i = 0; i < totalSamples; i++) {
+            out[i] = samples[i] * scale;
+        }
+    } else {
+        // 大端序平台上Int16Array按本机字节序解释，只能退回DataView
+        const view = new DataView(arrayBuffer);
+        for (let i = 0; i < totalSamples; i++) {
+            out[i] = view.getInt16(i * 2, true) / 32768.0;
+        }
+    }
+    return out;
+}
+
+function computeBasePeaks(data) {
+    // 固定数量的峰值桶，任意画布宽度都从这里归并，不必保留样本
+    const buckets = Math.min(PEAK_BUCKETS, data.length);
+    const peaks = new Float32Array(buckets);
+    for (let i = 0; i < buckets; i++) {
+        const start = Math.floor(i * data.length / buckets);
+        const end = Math.floor((i + 1) * data.length / buckets);
+        let maxAbs = 0;
+        for (let j = start; j < end; j++) {
+            const v = data[j] < 0 ? -data[j] : data[j];
+            if (v > maxAbs) maxAbs = v;
+        }
+        peaks[i] = maxAbs;
+    }
+    return peaks;
+}
+
+function reducePeaks(basePeaks, width) {
+    // 把峰值桶归并到画布宽度
+    const peaks = new Float32Array(width);
+    if (!basePeaks || !basePeaks.length) return peaks;
+    const step = basePeaks.length / width;
+    for (let i = 0; i < width; i++) {
+        const start = Math.floor(i * step);
+        const end = Math.max(start + 1, Math.floor((i + 1) * step));
+        let maxAbs = 0;
+        for (let j = start; j < end && j < basePeaks.length; j++) {
+            if (basePeaks[j] > maxAbs) maxAbs = basePeaks[j];
+        }
+        peaks[i] = maxAbs;
+    }
+    return peaks;
+}
+
+function drawGrid(ctx, width, height) {
+    ctx.save();
+    ctx.strokeStyle = '#eee';
+    ctx.lineWidth = 1;
+    
+    // 垂直网格
+    for (let x = 0; x <= width; x += 50) {
+        ctx.beginPath();
+        ctx.moveTo(x + 0.5, 0);
+        ctx.lineTo(x + 0.5, height);
+        ctx.stroke();
+    }
+    
+    // 水平网格
+    for (let y = 0; y <= height; y += 20) {
+        ctx.beginPath();
+        ctx.moveTo(0, y + 0.5);
+        ctx.lineTo(width, y + 0.5);
+        ctx.stroke();
+    }
+    
+    // 中心线
+    ctx.strokeStyle = '#ddd';
+    ctx.beginPath();
+    ctx.moveTo(0, height / 2 + 0.5);
+    ctx.lineTo(width, height / 2 + 0.5);
+    ctx.stroke();
+    
+    ctx.restore();
+}
+
+function drawPeaks(ctx, width, height, peaks) {
+    const centerY = height / 2;
+    ctx.strokeStyle = '#2196F3';
+    ctx.lineWidth = 1;
+    ctx.beginPath();
+    
+    for (let i = 0; i < width; i++) {
+        const amp = peaks[i] * centerY * 0.8;
+        const x = i;
+        const y1 = centerY - amp;
+        const y2 = centerY + amp;
+        
+        if (i === 0) {
+            ctx.moveTo(x, y1);
+        } else {
+            ctx.lineTo(x, y1);
+        }
+        ctx.moveTo(x, y2);
+    }
+    
+    ctx.stroke();
+}
+'''
+    
+    def get_worker_js_content(self):
+        """获取Worker的JavaScript内容"""
+        return self.get_shared_js_content() + '''
+// ---- Worker：下载、解码、计算峰值并在OffscreenCanvas上绘制波形 ----
+let canvas = null;
+let ctx = null;
+let basePeaks = null;
+let currentLoad = null;
+
+// ---- IndexedDB音频缓存：按文件名+ETag保存原始PCM和峰值，按配额做LRU淘汰 ----
+const CACHE_DB = 'pcm-player-cache';
+let cacheDb = null;
+
+function openCache() {
+    if (cacheDb) return Promise.resolve(cacheDb);
+    if (!self.indexedDB) return Promise.resolve(null);
+    return new Promise((resolve) => {
+        const request = indexedDB.open(CACHE_DB, 1);
+        request.onupgradeneeded = () => {
+            const db = request.result;
+            // meta只存小记录，淘汰时不必读出音频数据
+            db.createObjectStore('meta', { keyPath: 'name' });
+            db.createObjectStore('data', { keyPath: 'name' });
+        };
+        request.onsuccess = () => {
+            cacheDb = request.result;
+            resolve(cacheDb);
+        };
+        request.onerror = () => resolve(null);
+    });
+}
+
+function idbRequest(request) {
+    return new Promise((resolve, reject) => {
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+async function cacheGetMeta(name) {
+    const db = await openCache();
+    if (!db) return null;
+    return idbRequest(db.transaction('meta').objectStore('meta').get(name));
+}
+
+async function cacheGetData(meta) {
+    const db = await openCache();
+    const tx = db.transaction(['meta', 'data'], 'readwrite');
+    const record = await idbRequest(tx.objectStore('data').get(meta.name));
+    if (record) {
+        meta.lastAccess = Date.now();
+        tx.objectStore('meta').put(meta);
+    }
+    return record;
+}
+
+async function cachePut(name, etag, pcm, peaks, quota) {
+    const db = await openCache();
+    if (!db || pcm.byteLength > quota) return;
+    const bytes = pcm.byteLength + peaks.byteLength;
+    
+    // 按最近访问时间淘汰，直到放得下新文件
+    const metas = await idbRequest(db.transaction('meta').objectStore('meta').getAll());
+    let used = metas.reduce((sum, m) => sum + (m.name === name ? 0 : m.bytes), 0);
+    metas.sort((a, b) => a.lastAccess - b.lastAccess);
+    const tx = db.transaction(['meta', 'data'], 'readwrite');
+    for (const m of metas) {
+        if (used + bytes <= quota) break;
+        if (m.name === name) continue;
+        tx.objectStore('meta').delete(m.name);
+        tx.objectStore('data').delete(m.name);
+        used -= m.bytes;
+    }
+    tx.objectStore('data').put({ name, pcm, peaks });
+    tx.objectStore('meta').put({ name, etag, bytes, lastAccess: Date.now() });
+    return new Promise((resolve) => {
+        tx.oncomplete = () => resolve();
+        tx.onerror = () => resolve();
+        tx.onabort = () => resolve();
+    });
+}
+
+function finishLoad(id, pcm, cachedPeaks) {
+    const samples = pcmToFloat32(pcm, new Float32Array(Math.floor(pcm.byteLength / 2)));
+    basePeaks = cachedPeaks || computeBasePeaks(samples);
+    draw();
+    
+    // 样本和峰值都以可转移对象发送，不经过结构化克隆复制
+    const peaks = basePeaks.slice();
+    self.postMessage({ type: 'done', id, samples: samples.buffer, peaks: peaks.buffer },
+                     [samples.buffer, peaks.buffer]);
+}
+
+function draw() {
+    if (!ctx) return;
+    ctx.clearRect(0, 0, canvas.width, canvas.height);
+    drawGrid(ctx, canvas.width, canvas.height);
+    if (basePeaks && basePeaks.length) {
+        drawPeaks(ctx, canvas.width, canvas.height, reducePeaks(basePeaks, canvas.width));
+    }
+}
+
+async function load(id, url, name, quota) {
+    const controller = new AbortController();
+    const job = { id, controller, cancelled: false };
+    currentLoad = job;
+    try {
+        // 有缓存时用If-None-Match向服务器确认，未变化时服务器只返回304
+        let meta = null;
+        try {
+            meta = await cacheGetMeta(name);
+        } catch (e) {
+            meta = null;
+        }
+        if (job.cancelled) return;
+        const headers = meta ? { 'If-None-Match': meta.etag } : {};
+        const response = await fetch(url, { signal: controller.signal, headers, cache: 'no-store' });
+        if (response.status === 304 && meta) {
+            const record = await cacheGetData(meta);
+            if (job.cancelled) return;
+            if (record) {
+                self.postMessage({ type: 'progress', id, loaded: meta.bytes, total: meta.bytes, cached: true });
+                finishLoad(id, record.pcm, new Float32Array(record.peaks));
+                return;
+            }
+            // 元数据还在但数据已丢失，删除后重新完整下载
+            const db = await openCache();
+            await idbRequest(db.transaction('meta', 'readwrite').objectStore('meta').delete(name));
+            if (currentLoad === job) currentLoad = null;
+            return load(id, url, name, quota);
+        }
+        if (!response.ok) {
+            throw new Error('无法加载文件');
+        }
+        
+        // 已知长度时直接写入预分配的缓冲区，避免再拼接一次
+        const total = parseInt(response.headers.get('Content-Length') || '0', 10);
+        const reader = response.body.getReader();
+        let bytes = total ? new Uint8Array(total) : null;
+        const chunks = [];
+        let loaded = 0;
+        let lastReport = 0;
+        for (;;) {
+            const { done, value } = await reader.read();
+            if (job.cancelled) return;
+            if (done) break;
+            if (bytes && loaded + value.length <= total) {
+                bytes.set(value, loaded);
+            } else {
+                chunks.push(value);
+            }
+            loaded += value.length;
+            const now = Date.now();
+            if (now - lastReport > 100) {
+                lastReport = now;
+                self.postMessage({ type: 'progress', id, loaded, total });
+            }
+        }
+        if (!bytes || chunks.length) {
+            const merged = new Uint8Array(loaded);
+            let offset = 0;
+            if (bytes) {
+                merged.set(bytes.subarray(0, total), 0);
+                offset = total;
+            }
+            for (const chunk of chunks) {
+                merged.set(chunk, offset);
+                offset += chunk.length;
+            }
+            bytes = merged;
+        } else if (loaded < total) {
+            bytes = bytes.slice(0, loaded);
+        }
+        self.postMessage({ type: 'progress', id, loaded, total: loaded });
+        if (job.cancelled) return;
+        
+        const pcm = bytes.buffer;
+        finishLoad(id, pcm, null);
+        
+        // 连同峰值一起写入缓存，下次命中时可以立即重绘
+        const etag = response.headers.get('ETag');
+        if (etag) {
+            cachePut(name, etag, pcm, basePeaks.slice().buffer, quota).catch(() => {});
+        }
+    } catch (error) {
+        if (!job.cancelled) {
+            self.postMessage({ type: 'error', id, message: error.message });
+        }
+    } finally {
+        if (currentLoad === job) currentLoad = null;
+    }
+}
+
+self.onmessage = (e) => {
+    const msg = e.data;
+    if (msg.type === 'canvas') {
+        canvas = msg.canvas;
+        ctx = canvas.getContext('2d');
+    } else if (msg.type === 'resize') {
+        if (canvas) {
+            canvas.width = msg.width;
+            canvas.height = msg.height;
+            draw();
+        }
+    } else if (msg.type === 'draw') {
+        draw();
+    } else if (msg.type === 'load') {
+        if (currentLoad) {
+            currentLoad.cancelled = true;
+            currentLoad.controller.abort();
+        }
+        basePeaks = null;
+        draw();
+        load(msg.id, msg.url, msg.name, msg.quota);
+    } else if (msg.type === 'cancel') {
+        if (currentLoad && currentLoad.id === msg.id) {
+            currentLoad.cancelled = true;
+            currentLoad.controller.abort();
+        }
+    }
+};'''
+    
     def get_js_content(self):
         """获取JavaScript内容"""
-        return '''class DesktopPCMPlayer {
+        return self.get_shared_js_content() + '''
+class DesktopPCMPlayer {
     constructor() {
         this.audioContext = null;
         this.audioBuffer = null;
@@ -419,7 +794,18 @@ class DesktopPCMPlayerHandler(SimpleHTTPRequestHandler):
         this.currentFile = null;
         this.canvas = null;
         this.ctx = null;
-        this.wavePoints = [];
+        this.channelData = null;
+        this.basePeaks = null;
+        this.worker = null;
+        this.offscreen = false;
+        this.loadId = 0;
+        this.pendingLoad = null;
+        // 本地音频缓存配额（MB），可通过 localStorage.pcmCacheQuotaMB 配置
+        this.cacheQuota = (parseInt(localStorage.getItem('pcmCacheQuotaMB'), 10) || 512) * 1024 * 1024;
+        this.overlay = null;
+        this.overlayCtx = null;
+        this.peaksCache = null;
+        this.lastPlayheadX = null;
         this.isSeeking = false;
         this.seekWasPlaying = false;
         
@@ -433,7 +819,23 @@ class DesktopPCMPlayerHandler(SimpleHTTPRequestHandler):
             
             // 初始化画布
             this.canvas = document.getElementById('waveformCanvas');
-            this.ctx = this.canvas.getContext('2d');
+            
+            // 解码和波形绘制放到Worker中，支持时把波形画布交给Worker
+            if (window.Worker) {
+                this.worker = new Worker('/worker.js');
+                this.worker.onmessage = (e) => this.onWorkerMessage(e.data);
+                if (this.canvas.transferControlToOffscreen) {
+                    const offscreen = this.canvas.transferControlToOffscreen();
+                    this.worker.postMessage({ type: 'canvas', canvas: offscreen }, [offscreen]);
+                    this.offscreen = true;
+                }
+            }
+            if (!this.offscreen) {
+                this.ctx = this.canvas.getContext('2d');
+            }
+            // 播放指示线单独画在上层画布，波形层只在尺寸或文件变化时重绘
+            this.overlay = document.getElementById('overlayCanvas');
+            this.overlayCtx = this.overlay.getContext('2d');
             this.resizeCanvas();
             
             // 绑定事件
@@ -452,8 +854,16 @@ class DesktopPCMPlayerHandler(SimpleHTTPRequestHandler):
     
     resizeCanvas() {
         const rect = this.canvas.getBoundingClientRect();
-        this.canvas.width = rect.width;
-        this.canvas.height = rect.height;
+        if (this.offscreen) {
+            // 画布控制权已交给Worker，只能通过消息调整尺寸
+            this.worker.postMessage({ type: 'resize', width: Math.floor(rect.width), height: Math.floor(rect.height) });
+        } else {
+            this.canvas.width = rect.width;
+            this.canvas.height = rect.height;
+        }
+        this.overlay.width = rect.width;
+        this.overlay.height = rect.height;
+        this.lastPlayheadX = null;
         this.drawWaveform();
     }
     
@@ -537,35 +947,47 @@ class DesktopPCMPlayerHandler(SimpleHTTPRequestHandler):
                     <div class="file-time">${file.mtime}</div>
                 `;
                 
-                fileItem.addEventListener('click', () => this.loadFile(file));
+                fileItem.addEventListener('click', () => this.loadFile(file, fileItem));
                 fileItems.appendChild(fileItem);
             });
         }
     }
     
-    async loadFile(file) {
+    async loadFile(file, fileItem) {
         try {
             this.stop();
             this.currentFile = file;
             
             // 更新当前文件显示
-            document.getElementById('currentFile').textContent = `当前文件: ${file.name}`;
+            document.getElementById('currentFile').textContent = `当前文件: ${file.name} (加载中...)`;
             document.getElementById('currentFile').style.display = 'block';
             
             // 更新文件项样式
             document.querySelectorAll('.file-item').forEach(item => {
                 item.classList.remove('playing');
             });
-            event.currentTarget.classList.add('playing');
+            if (fileItem) fileItem.classList.add('playing');
             
-            // 加载PCM文件
-            const response = await fetch(`/api/play/${encodeURIComponent(file.name)}`);
-            if (!response.ok) {
-                throw new Error('无法加载文件');
+            // 加载期间禁用播放
+            document.getElementById('playButton').disabled = true;
+            document.getElementById('stopButton').disabled = true;
+            
+            const url = `/api/play/${encodeURIComponent(file.name)}`;
+            if (this.worker) {
+                // 在Worker中下载、解码并计算峰值，新的加载会取消旧的
+                const result = await this.loadInWorker(url);
+                if (!result) return;
+                this.applyDecoded(result.samples, result.peaks);
+            } else {
+                const response = await fetch(url);
+                if (!response.ok) {
+                    throw new Error('无法加载文件');
+                }
+                const arrayBuffer = await response.arrayBuffer();
+                await this.decodePCM(arrayBuffer);
             }
             
-            const arrayBuffer = await response.arrayBuffer();
-            await this.decodePCM(arrayBuffer);
+            document.getElementById('currentFile').textContent = `当前文件: ${file.name}`;
             
             // 绘制波形
             this.drawWaveform();
@@ -579,6 +1001,50 @@ class DesktopPCMPlayerHandler(SimpleHTTPRequestHandler):
         }
     }
     
+    loadInWorker(url) {
+        // 取消上一次还未完成的加载
+        if (this.pendingLoad) {
+            this.worker.postMessage({ type: 'cancel', id: this.pendingLoad.id });
+            this.pendingLoad.resolve(null);
+        }
+        const id = ++this.loadId;
+        return new Promise((resolve, reject) => {
+            this.pendingLoad = { id, resolve, reject };
+            this.worker.postMessage({ type: 'load', id, url, name: this.currentFile.name, quota: this.cacheQuota });
+        });
+    }
+    
+    onWorkerMessage(msg) {
+        const pending = this.pendingLoad;
+        if (!pending || msg.id !== pending.id) return;
+        
+        if (msg.type === 'progress') {
+            if (msg.cached) return;
+            const percent = msg.total ? Math.floor(msg.loaded / msg.total * 100) + '%' : this.formatFileSize(msg.loaded);
+            const name = this.currentFile ? this.currentFile.name : '';
+            document.getElementById('currentFile').textContent = `当前文件: ${name} (加载中 ${percent})`;
+        } else if (msg.type === 'done') {
+            this.pendingLoad = null;
+            pending.resolve({ samples: new Float32Array(msg.samples), peaks: new Float32Array(msg.peaks) });
+        } else if (msg.type === 'error') {
+            this.pendingLoad = null;
+            pending.reject(new Error(msg.message));
+        }
+    }
+    
+    applyDecoded(samples, basePeaks) {
+        // PCM参数：16kHz, 单声道
+        this.audioBuffer = this.audioContext.createBuffer(1, Math.max(1, samples.length), 16000);
+        this.audioBuffer.copyToChannel(samples, 0);
+        this.channelData = this.audioBuffer.getChannelData(0);
+        this.basePeaks = basePeaks;
+        this.peaksCache = null;
+        
+        this.duration = this.audioBuffer.duration;
+        this.currentTime = 0;
+        this.updateTimeDisplay();
+    }
+    
     async decodePCM(arrayBuffer) {
         // PCM参数：16kHz, 16bit, 单声道, 小端序
         const sampleRate = 16000;
@@ -591,105 +1057,45 @@ class DesktopPCMPlayerHandler(SimpleHTTPRequestHandler):
         
         // 创建AudioBuffer
         this.audioBuffer = this.audioContext.createBuffer(channels, totalSamples, sampleRate);
-        
-        // 解析PCM数据
-        const view = new DataView(arrayBuffer);
         const channelData = this.audioBuffer.getChannelData(0);
         
-        for (let i = 0; i < totalSamples; i++) {
-            const offset = i * bytesPerSample;
-            // 16位小端序
-            const sample = view.getInt16(offset, true) / 32768.0;
-            channelData[i] = sample;
-        }
+        // 解析PCM数据：一次性转换到AudioBuffer，不保留第二份样本拷贝
+        pcmToFloat32(arrayBuffer, channelData);
         
         this.duration = this.audioBuffer.duration;
         this.currentTime = 0;
         this.updateTimeDisplay();
         
-        // 存储波形数据用于绘制
-        this.wavePoints = Array.from(channelData);
+        // 绘制时直接读取AudioBuffer的声道数据
+        this.channelData = channelData;
+        this.basePeaks = computeBasePeaks(channelData);
+        this.peaksCache = null;
     }
     
-    drawWaveform() {
-        if (!this.wavePoints.length) return;
-        
-        const width = this.canvas.width;
-        const height = this.canvas.height;
-        const centerY = height / 2;
-        
-        this.ctx.clearRect(0, 0, width, height);
-        
-        // 绘制网格
-        this.drawGrid();
-        
-        // 绘制波形
-        const step = Math.ceil(this.wavePoints.length / width);
-        this.ctx.strokeStyle = '#2196F3';
-        this.ctx.lineWidth = 1;
-        this.ctx.beginPath();
-        
-        for (let i = 0; i < width; i++) {
-            const start = i * step;
-            let maxAbs = 0;
-            
-            // 计算峰值
-            for (let j = 0; j < step && start + j < this.wavePoints.length; j++) {
-                const v = Math.abs(this.wavePoints[start + j]);
-                if (v > maxAbs) maxAbs = v;
-            }
-            
-            const amp = maxAbs * centerY * 0.8;
-            const x = i;
-            const y1 = centerY - amp;
-            const y2 = centerY + amp;
-            
-            if (i === 0) {
-                this.ctx.moveTo(x, y1);
-            } else {
-                this.ctx.lineTo(x, y1);
-            }
-            this.ctx.moveTo(x, y2);
+    getPeaks(width) {
+        // 峰值按画布宽度缓存，只有换文件或改变窗口大小时才重新计算
+        if (!this.peaksCache || this.peaksCache.width !== width) {
+            this.peaksCache = { width, peaks: reducePeaks(this.basePeaks, width) };
         }
-        
-        this.ctx.stroke();
-
-        // 绘制播放指示线
-        this.drawPlayhead();
+        return this.peaksCache.peaks;
     }
     
-    drawGrid() {
-        const width = this.canvas.width;
-        const height = this.canvas.height;
-        
-        this.ctx.save();
-        this.ctx.strokeStyle = '#eee';
-        this.ctx.lineWidth = 1;
-        
-        // 垂直网格
-        for (let x = 0; x <= width; x += 50) {
-            this.ctx.beginPath();
-            this.ctx.moveTo(x + 0.5, 0);
-            this.ctx.lineTo(x + 0.5, height);
-            this.ctx.stroke();
-        }
+    drawWaveform() {
+        if (!this.basePeaks || !this.basePeaks.length) return;
         
-        // 水平网格
-        for (let y = 0; y <= height; y += 20) {
-            this.ctx.beginPath();
-            this.ctx.moveTo(0, y + 0.5);
-            this.ctx.lineTo(width, y + 0.5);
-            this.ctx.stroke();
+        if (this.offscreen) {
+            // 波形层由Worker在OffscreenCanvas上绘制
+            this.worker.postMessage({ type: 'draw' });
+        } else {
+            const width = this.canvas.width;
+            const height = this.canvas.height;
+            this.ctx.clearRect(0, 0, width, height);
+            drawGrid(this.ctx, width, height);
+            drawPeaks(this.ctx, width, height, this.getPeaks(width));
         }
-        
-        // 中心线
-        this.ctx.strokeStyle = '#ddd';
-        this.ctx.beginPath();
-        this.ctx.moveTo(0, height / 2 + 0.5);
-        this.ctx.lineTo(width, height / 2 + 0.5);
-        this.ctx.stroke();
-        
-        this.ctx.restore();
+
+        // 绘制播放指示线（上层画布）
+        this.drawPlayhead();
     }
     
     togglePlay() {
@@ -752,6 +1158,7 @@ class DesktopPCMPlayerHandler(SimpleHTTPRequestHandler):
         document.getElementById('playButton').textContent = '播放';
         this.updateTimeDisplay();
         this.updateProgress();
+        this.drawPlayhead();
     }
     
     startTimeUpdate() {
@@ -779,18 +1186,26 @@ class DesktopPCMPlayerHandler(SimpleHTTPRequestHandler):
     }
     
     drawPlayhead() {
-        if (!this.duration || !this.canvas) return;
-        const width = this.canvas.width;
-        const height = this.canvas.height;
+        if (!this.overlay) return;
+        const width = this.overlay.width;
+        const height = this.overlay.height;
+        const ctx = this.overlayCtx;
+        
+        // 只擦除上一次指示线所在的窄条，开销与文件长度无关
+        if (this.lastPlayheadX !== null) {
+            ctx.clearRect(this.lastPlayheadX - 2, 0, 4, height);
+            this.lastPlayheadX = null;
+        }
+        if (!this.duration) return;
+        
         const x = Math.max(0, Math.min(width, (this.currentTime / this.duration) * width));
-        this.ctx.save();
-        this.ctx.beginPath();
-        this.ctx.strokeStyle = '#1976D2';
-        this.ctx.lineWidth = 2;
-        this.ctx.moveTo(x, 0);
-        this.ctx.lineTo(x, height);
-        this.ctx.stroke();
-        this.ctx.restore();
+        ctx.beginPath();
+        ctx.strokeStyle = '#1976D2';
+        ctx.lineWidth = 2;
+        ctx.moveTo(x, 0);
+        ctx.lineTo(x, height);
+        ctx.stroke();
+        this.lastPlayheadX = x;
     }
 
     seekToTime(t) {
@@ -799,7 +1214,7 @@ class DesktopPCMPlayerHandler(SimpleHTTPRequestHandler):
         this.currentTime = clamped;
         this.updateTimeDisplay();
         this.updateProgress();
-        this.drawWaveform();
+        this.drawPlayhead();
     }
 
     updateProgress() {
@@ -840,30 +1255,77 @@ window.addEventListener('load', () => {
         timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
         print(f"[{timestamp}] {format % args}")
 
-def find_free_port(start_port=8000, max_port=8100):
-    """查找可用端口"""
-    for port in range(start_port, max_port):
+DEFAULT_PORT = 8000
+
+
+def create_listen_socket(port=None, unix_path=None, listen_fd=None):
+    """创建监听套接字，绑定后直接交给服务器使用，不再先探测再重新绑定
+    
+    - listen_fd: 启动器已经绑定好的套接字文件描述符
+    - unix_path: Unix域套接字路径，供同一台机器上的前端和工具使用
+    - port: TCP端口，0表示由系统分配；不指定时优先使用8000，被占用则由系统分配
+    """
+    if listen_fd is not None:
+        sock = socket.socket(fileno=listen_fd)
+        sock.listen(128)
+        return sock
+    
+    if unix_path is not None:
+        if not hasattr(socket, 'AF_UNIX'):
+            raise OSError("当前系统不支持Unix域套接字")
+        if os.path.exists(unix_path) and stat.S_ISSOCK(os.stat(unix_path).st_mode):
+            # 清理上次没有正常退出时留下的套接字文件
+            os.unlink(unix_path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(unix_path)
+        sock.listen(128)
+        return sock
+    
+    if port is None:
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.bind(('localhost', port))
-                return port
+            return socket.create_server(('localhost', DEFAULT_PORT), backlog=128)
         except OSError:
-            continue
-    return None
+            port = 0
+    return socket.create_server(('localhost', port), backlog=128)
+
+
+def listen_address(sock):
+    """返回监听套接字的访问地址"""
+    if sock.family in (socket.AF_INET, socket.AF_INET6):
+        return f"http://localhost:{sock.getsockname()[1]}"
+    return f"unix:{sock.getsockname()}"
+
+
+def serve_on_socket(sock, handler_class):
+    """在已经绑定好的监听套接字上创建服务器（TCP或Unix域套接字）"""
+    server = ThreadingHTTPServer(('localhost', 0), handler_class, bind_and_activate=False)
+    server.socket.close()
+    server.socket = sock
+    server.address_family = sock.family
+    server.server_address = sock.getsockname()
+    if sock.family in (socket.AF_INET, socket.AF_INET6):
+        server.server_name, server.server_port = sock.getsockname()[:2]
+    else:
+        server.server_name, server.server_port = 'localhost', 0
+    return server
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="桌面PCM播放器")
+    parser.add_argument('--port', type=int,
+                        help=f"监听端口，0表示由系统分配（默认优先使用{DEFAULT_PORT}）")
+    parser.add_argument('--unix', metavar='PATH',
+                        help="改为监听Unix域套接字，供本机前端和工具使用")
+    parser.add_argument('--listen-fd', type=int, metavar='FD',
+                        help="使用启动器已经绑定好的监听套接字文件描述符")
+    parser.add_argument('--no-browser', action='store_true',
+                        help="启动后不自动打开浏览器")
+    args, _ = parser.parse_known_args()
+    
     print("=" * 50)
     print("桌面PCM播放器")
     print("=" * 50)
     
-    # 查找可用端口
-    port = find_free_port()
-    if port is None:
-        print("错误: 无法找到可用端口")
-        input("按回车键退出...")
-        return
-    
     # 创建data目录
     if getattr(sys, 'frozen', False):
         base_dir = os.path.dirname(sys.executable)
@@ -878,9 +1340,12 @@ def main():
     
     # 启动服务器
     try:
-        server = HTTPServer(('localhost', port), DesktopPCMPlayerHandler)
+        listen_sock = create_listen_socket(args.port, args.unix, args.listen_fd)
+        address = listen_address(listen_sock)
+        server = serve_on_socket(listen_sock, DesktopPCMPlayerHandler)
         print(f"服务器启动成功!")
-        print(f"访问地址: http://localhost:{port}")
+        # 启动器（使用端口0时）从这一行读取实际监听的地址
+        print(f"访问地址: {address}", flush=True)
         print(f"PCM文件目录: {data_dir}")
         print("\n按 Ctrl+C 停止服务器")
         
@@ -888,15 +1353,16 @@ def main():
         def open_browser():
             time.sleep(1)  # 等待服务器启动
             try:
-                webbrowser.open(f'http://localhost:{port}')
+                webbrowser.open(address)
                 print("已自动打开浏览器")
             except:
                 print("无法自动打开浏览器，请手动访问上述地址")
         
         # 在新线程中打开浏览器
-        browser_thread = threading.Thread(target=open_browser)
-        browser_thread.daemon = True
-        browser_thread.start()
+        if not args.no_browser and address.startswith('http'):
+            browser_thread = threading.Thread(target=open_browser)
+            browser_thread.daemon = True
+            browser_thread.start()
         
         print("\n" + "=" * 50)
         server.serve_forever()
@@ -906,6 +1372,9 @@ def main():
     except Exception as e:
         print(f"服务器启动失败: {e}")
         input("按回车键退出...")
+    finally:
+        if args.unix and args.listen_fd is None and os.path.exists(args.unix):
+            os.unlink(args.unix)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按目录修改时间增量列出目录，server.py 的目录树和 desktop-pcm-player-gui.py 的后台扫描共用
+"""
+
+import os
+
+
+def list_directory(path, cached=None, suffix=None):
+    """列出一个目录，返回 (条目, 是否复用了cached)
+
+    条目为 (目录修改时间, [(文件名, 大小, 修改时间)], [子目录名])；cached 是上次的条目，
+    目录修改时间没变（没有增删改名）时直接返回它，不再列出其中的文件。
+    以点开头的名称（索引、缓存目录、上传中的临时文件等）不列出；给出suffix时只列出
+    这个扩展名（不区分大小写）的文件，其余文件不必stat。
+    目录不存在时抛出 FileNotFoundError 或 NotADirectoryError。
+    """
+    # 先取修改时间再列目录：列的过程中目录有变化时，下次会因为时间不同而重新列出
+    mtime = os.stat(path).st_mtime_ns
+    if cached is not None and cached[0] == mtime:
+        return cached, True
+    files = []
+    dirs = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                dirs.append(entry.name)
+            elif (suffix is None or entry.name.lower().endswith(suffix)) and entry.is_file():
+                st = entry.stat()
+                files.append((entry.name, st.st_size, st.st_mtime))
+    return (mtime, files, dirs), False
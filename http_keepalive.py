@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP/1.1 长连接处理，server.py、desktop-pcm-player.py、test-desktop-player.py 共用
+"""
+
+import html
+import socket
+from urllib.parse import quote
+
+
+def content_disposition(filename):
+    """生成Content-Disposition头，非ASCII文件名按RFC 5987编码（响应头只能是latin-1）"""
+    ascii_name = filename.encode('ascii', 'replace').decode('ascii').replace('"', '_')
+    return f"inline; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(filename)}"
+
+
+class KeepAliveMixin:
+    """放在 SimpleHTTPRequestHandler 之前继承，让处理器在一个连接上处理多个请求
+    
+    每个响应都带Content-Length（错误响应也是），响应头附带Keep-Alive或Connection: close；
+    响应头已经发出后出错时只能关闭连接。
+    """
+    
+    # HTTP/1.1 长连接：空闲超时（秒）和单个连接最多处理的请求数
+    protocol_version = 'HTTP/1.1'
+    timeout = 30
+    max_keepalive_requests = 100
+    # 响应头和响应体分开写出，关闭Nagle算法避免长连接上的延迟确认等待
+    disable_nagle_algorithm = True
+    
+    def setup(self):
+        """Unix域套接字没有TCP选项，不需要关闭Nagle算法"""
+        if self.request.family != socket.AF_INET and self.request.family != socket.AF_INET6:
+            self.disable_nagle_algorithm = False
+        super().setup()
+    
+    def handle_one_request(self):
+        """处理一个请求，并统计本连接已处理的请求数"""
+        self.requests_handled = getattr(self, 'requests_handled', 0) + 1
+        self.headers_sent = False
+        super().handle_one_request()
+    
+    def end_headers(self):
+        """结束响应头，附带长连接相关的头部"""
+        if getattr(self, 'requests_handled', 0) >= self.max_keepalive_requests:
+            self.close_connection = True
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        else:
+            remaining = self.max_keepalive_requests - self.requests_handled
+            self.send_header('Keep-Alive', f'timeout={self.timeout}, max={remaining}')
+        self.headers_sent = True
+        super().end_headers()
+    
+    def send_error(self, code, message=None, explain=None):
+        """发送带Content-Length的错误响应，不再强制关闭连接
+
+        状态行只使用标准的英文原因短语（状态行只能是latin-1），中文错误信息放在响应体中。
+        """
+        if getattr(self, 'headers_sent', False):
+            # 响应头已经发出，无法再发送错误页，只能关闭连接
+            self.close_connection = True
+            return
+        try:
+            short, long = self.responses[code]
+        except KeyError:
+            short, long = '???', '???'
+        message = message or short
+        explain = explain or long
+        self.log_error("code %d, message %s", code, message)
+        self.send_response(code, short)
+        
+        body = b''
+        if code >= 200 and code not in (204, 304):
+            content = self.error_message_format % {
+                'code': code,
+                'message': html.escape(message, quote=False),
+                'explain': html.escape(explain, quote=False)
+            }
+            body = content.encode('UTF-8', 'replace')
+            self.send_header('Content-Type', self.error_content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD' and body:
+            self.wfile.write(body)
+    
+    def send_file_body(self, f, offset, length):
+        """用sendfile发送文件的一段作为响应体；文件中途变短时关闭连接，不让客户端等待缺少的字节"""
+        sent = self.connection.sendfile(f, offset, length) if length else 0
+        if sent < length:
+            self.close_connection = True
+        return sent
@@ -7,19 +7,1603 @@
 
 import os
 import sys
+import io
+import bz2
 import json
+import re
+import math
+import stat
 import time
+import errno
+import heapq
+import itertools
+import bisect
+import fnmatch
+import shutil
+import struct
+import tarfile
+import zipfile
+import zlib
+import hashlib
+import operator
+import tempfile
+import select
+import socket
+import signal
+import argparse
+import warnings
+import threading
+import subprocess
 import webbrowser
-from http.server import HTTPServer, SimpleHTTPRequestHandler
-from urllib.parse import urlparse, parse_qs
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, unquote, quote
 import mimetypes
 
-class PCMPlayerHandler(SimpleHTTPRequestHandler):
+from http_keepalive import KeepAliveMixin, content_disposition
+from directory_scan import list_directory
+
+# 可选依赖：audioop 用C实现峰值和均方根计算（Python 3.13起已移除，没有时用纯Python计算）
+try:
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', DeprecationWarning)
+        import audioop
+except ImportError:
+    audioop = None
+
+# 裸PCM文件的默认格式：16kHz, 16bit, 单声道, 小端序
+PCM_SAMPLE_RATE = 16000
+PCM_CHANNELS = 1
+PCM_SAMPLE_WIDTH = 2
+
+
+def get_audio_format(filepath):
+    """获取音频文件的格式和数据区位置
+
+    .wav 文件解析RIFF头找到 fmt 和 data 块，其他文件按默认格式的裸PCM处理。
+    返回 dict: sample_rate, channels, sample_width, data_offset, data_size
+    """
+    file_size = os.path.getsize(filepath)
+    audio_format = {
+        'sample_rate': PCM_SAMPLE_RATE,
+        'channels': PCM_CHANNELS,
+        'sample_width': PCM_SAMPLE_WIDTH,
+        'data_offset': 0,
+        'data_size': file_size,
+    }
+    if not filepath.lower().endswith('.wav'):
+        return audio_format
+
+    with open(filepath, 'rb') as f:
+        return read_wav_format(f, file_size, audio_format)
+
+
+def read_wav_format(f, file_size, audio_format):
+    """从文件对象开头解析WAV的RIFF头，把格式和data块位置填入audio_format"""
+    riff = f.read(12)
+    if len(riff) < 12 or riff[:4] != b'RIFF' or riff[8:12] != b'WAVE':
+        raise ValueError("无效的WAV文件")
+    while True:
+        chunk_header = f.read(8)
+        if len(chunk_header) < 8:
+            raise ValueError("WAV文件缺少data块")
+        chunk_id, chunk_size = struct.unpack('<4sI', chunk_header)
+        if chunk_id == b'fmt ':
+            fmt = f.read(chunk_size)
+            if len(fmt) < 16:
+                raise ValueError("WAV文件的fmt块不完整")
+            _, channels, sample_rate, _, _, bits = struct.unpack('<HHIIHH', fmt[:16])
+            if not channels or not sample_rate or bits % 8 or not bits:
+                raise ValueError("不支持的WAV格式")
+            audio_format['channels'] = channels
+            audio_format['sample_rate'] = sample_rate
+            audio_format['sample_width'] = bits // 8
+            if chunk_size % 2:
+                f.seek(1, 1)
+        elif chunk_id == b'data':
+            audio_format['data_offset'] = f.tell()
+            audio_format['data_size'] = min(chunk_size, file_size - f.tell())
+            return audio_format
+        else:
+            # 块大小为奇数时有一个填充字节
+            f.seek(chunk_size + (chunk_size % 2), 1)
+
+
+def compute_peaks(filepath, offset, length, buckets, sample_width=PCM_SAMPLE_WIDTH,
+                  block_size=1 << 20):
+    """计算文件中一段16位PCM数据的峰值
+
+    按block_size字节分块读取，每块折算进与之重叠的桶，内存占用与范围大小无关。
+    返回 bytes：buckets 对小端序 int16 (最大值, 最小值)
+    """
+    if sample_width != 2:
+        raise ValueError("峰值只支持16位PCM")
+    with open(filepath, 'rb') as f:
+        # 文件比请求的范围短时只统计实际存在的数据
+        total = max(0, min(length, os.fstat(f.fileno()).st_size - offset)) // 2
+        buckets = max(1, min(buckets, total)) if total else 0
+        maxs = [-32768] * buckets
+        mins = [32767] * buckets
+        f.seek(offset)
+        position = 0
+        bucket = 0
+        while position < total and bucket < buckets:
+            data = f.read(min(block_size, (total - position) * 2))
+            if len(data) < 2:
+                break
+            samples = array('h')
+            samples.frombytes(data[:len(data) // 2 * 2])
+            if sys.byteorder == 'big':
+                samples.byteswap()
+            block_end = position + len(samples)
+            while bucket < buckets:
+                bucket_start = bucket * total // buckets
+                bucket_end = (bucket + 1) * total // buckets
+                chunk = samples[max(bucket_start, position) - position:min(bucket_end, block_end) - position]
+                if chunk:
+                    maxs[bucket] = max(maxs[bucket], max(chunk))
+                    mins[bucket] = min(mins[bucket], min(chunk))
+                if bucket_end > block_end:
+                    break   # 这个桶延续到下一块
+                bucket += 1
+            position = block_end
+
+    peaks = array('h')
+    for high, low in zip(maxs, mins):
+        peaks.append(high)
+        peaks.append(low)
+    if sys.byteorder == 'big':
+        peaks.byteswap()
+    return peaks.tobytes()
+
+
+def make_wav_header(data_size, sample_rate, channels, sample_width):
+    """生成44字节的标准WAV文件头"""
+    byte_rate = sample_rate * channels * sample_width
+    block_align = channels * sample_width
+    return struct.pack('<4sI4s4sIHHIIHH4sI',
+                       b'RIFF', 36 + data_size, b'WAVE',
+                       b'fmt ', 16, 1, channels, sample_rate, byte_rate,
+                       block_align, sample_width * 8,
+                       b'data', data_size)
+
+
+# 传输编码：名称 -> 响应的Content-Type（也是Accept头中用来协商的媒体类型）
+# mulaw/alaw 是G.711有损压缩（每个16位样本变成1字节），delta-zlib 是无损的样本差分+zlib
+TRANSPORT_ENCODINGS = {
+    'mulaw': 'audio/pcmu',
+    'alaw': 'audio/pcma',
+    'delta-zlib': 'application/x-pcm-delta+zlib',
+}
+# delta-zlib 每块的样本数：块内先放所有差分的高字节再放低字节，zlib更容易压缩
+DELTA_BLOCK_SAMPLES = 65536
+
+_g711_tables = {}
+_g711_lock = threading.Lock()
+
+
+def _ulaw_encode(sample):
+    """把一个16位样本编码为μ-law字节（与Sun的g711.c一致，取高14位）"""
+    sample >>= 2
+    if sample < 0:
+        sample = -sample
+        mask = 0x7F
+    else:
+        mask = 0xFF
+    sample = min(sample, 8159) + 0x21
+    for seg, end in enumerate((0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF)):
+        if sample <= end:
+            return ((seg << 4) | ((sample >> (seg + 1)) & 0xF)) ^ mask
+    return 0x7F ^ mask
+
+
+def _alaw_encode(sample):
+    """把一个16位样本编码为A-law字节（与Sun的g711.c一致，取高13位）"""
+    sample >>= 3
+    if sample >= 0:
+        mask = 0xD5
+    else:
+        mask = 0x55
+        sample = -sample - 1
+    for seg, end in enumerate((0x1F, 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF)):
+        if sample <= end:
+            shift = 1 if seg < 2 else seg
+            return ((seg << 4) | ((sample >> shift) & 0xF)) ^ mask
+    return 0x7F ^ mask
+
+
+def g711_table(encoding):
+    """取得编码表：下标是按无符号读出的16位样本，值是编码后的字节；第一次使用时建立"""
+    table = _g711_tables.get(encoding)
+    if table is None:
+        encode = _ulaw_encode if encoding == 'mulaw' else _alaw_encode
+        with _g711_lock:
+            table = _g711_tables.get(encoding)
+            if table is None:
+                table = bytes(encode(u - 65536 if u >= 32768 else u) for u in range(65536))
+                _g711_tables[encoding] = table
+    return table
+
+
+class TransportEncoder:
+    """把小端序16位PCM数据分块编码为传输编码，块可以按任意的偶数字节边界传入
+    
+    没有audioop，编码用 map(表.__getitem__, 样本数组) 查表、用map组合operator做差分，
+    循环都在C里完成，每个样本不执行Python字节码。
+    """
+    
+    def __init__(self, encoding, channels):
+        self.encoding = encoding
+        self.channels = channels
+        if encoding == 'delta-zlib':
+            self.compressor = zlib.compressobj(6)
+            self.previous = array('h', bytes(2 * channels))
+            self.pending = array('H')
+        else:
+            self.table = g711_table(encoding)
+    
+    def encode(self, data):
+        samples = array('h')
+        samples.frombytes(data)
+        if sys.byteorder == 'big':
+            samples.byteswap()
+        if self.encoding != 'delta-zlib':
+            return bytes(map(self.table.__getitem__, array('H', samples.tobytes())))
+        
+        # 差分的对象是同一声道的上一个样本，跨块时用上一块末尾的样本
+        joined = self.previous + samples
+        previous = joined[:len(samples)]
+        self.previous = joined[-self.channels:]
+        self.pending.extend(map((0xFFFF).__and__, map(operator.sub, samples, previous)))
+        
+        output = []
+        while len(self.pending) >= DELTA_BLOCK_SAMPLES:
+            output.append(self._block(self.pending[:DELTA_BLOCK_SAMPLES]))
+            del self.pending[:DELTA_BLOCK_SAMPLES]
+        return b''.join(output)
+    
+    def _block(self, deltas):
+        data = deltas.tobytes()
+        if sys.byteorder == 'big':
+            high, low = data[0::2], data[1::2]
+        else:
+            high, low = data[1::2], data[0::2]
+        return self.compressor.compress(high) + self.compressor.compress(low)
+    
+    def finish(self, tail=b''):
+        """结束编码；tail是末尾不足一个样本的字节，delta-zlib原样保留，G.711丢弃"""
+        if self.encoding != 'delta-zlib':
+            return b''
+        output = self._block(self.pending) if self.pending else b''
+        return output + self.compressor.compress(tail) + self.compressor.flush()
+
+
+def negotiate_transport_encoding(query, accept):
+    """选择传输编码：查询参数encoding优先，其次是Accept头中q值最高的已知媒体类型
+    
+    返回 (编码名或None, 是否由查询参数明确指定)；编码名无效时抛出ValueError。
+    """
+    if 'encoding' in query:
+        encoding = query['encoding'][0].lower()
+        if encoding == 'identity':
+            return None, True
+        if encoding not in TRANSPORT_ENCODINGS:
+            raise ValueError(f"不支持的传输编码: {encoding}")
+        return encoding, True
+    
+    by_type = {media_type: name for name, media_type in TRANSPORT_ENCODINGS.items()}
+    best, best_q = None, 0.0
+    for item in (accept or '').split(','):
+        media_type, *params = [part.strip() for part in item.split(';')]
+        name = by_type.get(media_type.lower())
+        if name is None:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        # q相同时取Accept中先列出的
+        if q > best_q:
+            best, best_q = name, q
+    return best, False
+
+
+def iter_transport(f, audio_format, encoding, sha=None, chunk_size=1 << 20):
+    """逐块产生文件f中音频数据的传输编码
+    
+    给出sha时同一遍读取里把整个文件（包括文件头和数据之后的部分）也加入哈希，
+    不必为了按内容存放结果再单独读一遍。
+    """
+    encoder = TransportEncoder(encoding, audio_format['channels'])
+    f.seek(0 if sha is not None else audio_format['data_offset'])
+    if sha is not None:
+        sha.update(f.read(audio_format['data_offset']))
+    remaining = audio_format['data_size']
+    tail = b''
+    while remaining > 0:
+        data = f.read(min(chunk_size, remaining))
+        if not data:
+            break
+        if sha is not None:
+            sha.update(data)
+        remaining -= len(data)
+        data = tail + data
+        even = len(data) // 2 * 2
+        tail = data[even:]
+        yield encoder.encode(data[:even])
+    yield encoder.finish(tail)
+    if sha is not None:
+        for data in iter(lambda: f.read(chunk_size), b''):
+            sha.update(data)
+
+
+class PCMStats:
+    """边接收边统计16位PCM数据的峰值和均方根，数据可以按任意字节边界分块传入"""
+    
+    def __init__(self, sample_width):
+        self.sample_width = sample_width
+        self.samples = 0
+        self.peak = 0
+        self.sum_squares = 0.0
+        self.carry = b''
+    
+    def update(self, data):
+        if self.sample_width != 2:
+            return
+        if self.carry:
+            data = self.carry + bytes(data)
+        usable = len(data) // 2 * 2
+        self.carry = bytes(data[usable:])
+        data = data[:usable]
+        if not usable:
+            return
+        count = usable // 2
+        if audioop is not None:
+            if sys.byteorder == 'big':
+                data = audioop.byteswap(data, 2)
+            self.peak = max(self.peak, audioop.max(data, 2))
+            rms = audioop.rms(data, 2)
+            self.sum_squares += float(rms) * rms * count
+        else:
+            samples = array('h')
+            samples.frombytes(data)
+            if sys.byteorder == 'big':
+                samples.byteswap()
+            self.peak = max(self.peak, abs(max(samples)), abs(min(samples)))
+            self.sum_squares += sum(map(operator.mul, samples, samples))
+        self.samples += count
+    
+    def result(self):
+        """返回统计结果；非16位数据时只有样本数"""
+        if self.sample_width != 2:
+            return {'samples': None, 'peak': None, 'rms': None}
+        rms = math.sqrt(self.sum_squares / self.samples) if self.samples else 0.0
+        def dbfs(value):
+            return round(20 * math.log10(value / 32768), 2) if value else None
+        return {
+            'samples': self.samples,
+            'peak': self.peak,
+            'peak_dbfs': dbfs(self.peak),
+            'rms': round(rms, 2),
+            'rms_dbfs': dbfs(rms),
+        }
+
+
+class TokenBucket:
+    """令牌桶限速：每秒补充rate字节，最多积攒burst字节
+    
+    允许令牌暂时为负（先发后还），调用方按返回的时间休眠，
+    同一客户端的多个连接共享一个桶，总速率不会超过rate。
+    """
+    
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def reserve(self, amount):
+        """预订amount字节，返回发送前需要等待的秒数"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            self.tokens -= amount
+            return max(0.0, -self.tokens / self.rate)
+
+
+class TransferAborted(Exception):
+    """排队中的传输被放弃：客户端已经断开，或者等待超过了上限"""
+    
+    def __init__(self, message, timed_out=False):
+        super().__init__(message)
+        self.timed_out = timed_out
+
+
+class TransferScheduler:
+    """大响应体的传输调度
+    
+    - 全局限制同时进行的大文件传输数，超出的请求排队
+    - 排队时体积小的优先，短片段不会被几个GB的下载挡在后面
+    - 小于large_body的响应（文件列表、峰值、短片段）不排队也不限速
+    - 每个客户端一个令牌桶，限制其大文件传输的总速率
+    """
+    
+    LARGE_BODY = 1024 * 1024   # 达到这个大小的响应体才参与调度
+    CHUNK_SIZE = 256 * 1024    # 限速时每次sendfile的字节数
+    MAX_IDLE_BUCKETS = 1024    # 客户端令牌桶数量超过时清理已经回满的桶
+    WAIT_POLL = 1.0            # 排队时检查客户端是否断开的间隔（秒）
+    MAX_WAIT = 300.0           # 排队超过这个时间放弃，避免传输卡住时无限等待
+    
+    def __init__(self, max_streams=4, client_rate=0):
+        self.max_streams = max_streams
+        self.client_rate = client_rate
+        self.lock = threading.Lock()
+        self.active = 0
+        self.waiting = []       # 堆: (响应体大小, 序号, 事件)
+        self.sequence = 0
+        self.buckets = {}
+        # 统计
+        self.streams_total = 0
+        self.queued_total = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.recent_waits = deque(maxlen=1000)
+        self.throttle_total = 0.0
+        self.abandoned_total = 0
+        self.timed_out_total = 0
+    
+    def acquire(self, size, cancelled=None):
+        """占用一个传输名额，返回排队等待的秒数；小响应直接返回None
+        
+        排队期间每WAIT_POLL秒调用一次cancelled()，返回True（客户端已断开）
+        或等待超过MAX_WAIT时退出队列并抛出TransferAborted
+        """
+        if size < self.LARGE_BODY:
+            return None
+        start = time.monotonic()
+        with self.lock:
+            self.streams_total += 1
+            if self.active < self.max_streams and not self.waiting:
+                self.active += 1
+                self.recent_waits.append(0.0)
+                return 0.0
+            event = threading.Event()
+            self.sequence += 1
+            entry = (size, self.sequence, event)
+            heapq.heappush(self.waiting, entry)
+            self.queued_total += 1
+        # 名额由release直接转交，被唤醒时已经计入active
+        while not event.wait(self.WAIT_POLL):
+            timed_out = time.monotonic() - start >= self.MAX_WAIT
+            if not timed_out and (cancelled is None or not cancelled()):
+                continue
+            with self.lock:
+                # 检查和出队之间名额可能刚好转交过来，这时照常返回
+                if not event.is_set():
+                    self.waiting.remove(entry)
+                    heapq.heapify(self.waiting)
+                    if timed_out:
+                        self.timed_out_total += 1
+                    else:
+                        self.abandoned_total += 1
+                    raise TransferAborted("传输排队超时" if timed_out else "客户端在排队期间断开",
+                                          timed_out)
+        wait = time.monotonic() - start
+        with self.lock:
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            self.recent_waits.append(wait)
+        return wait
+    
+    def release(self):
+        """归还传输名额，交给排队中最小的响应"""
+        with self.lock:
+            if self.waiting:
+                _, _, event = heapq.heappop(self.waiting)
+                event.set()
+            else:
+                self.active -= 1
+    
+    def bucket(self, client):
+        """取得客户端的令牌桶，不限速时返回None"""
+        if not self.client_rate:
+            return None
+        with self.lock:
+            bucket = self.buckets.get(client)
+            if bucket is None:
+                if len(self.buckets) >= self.MAX_IDLE_BUCKETS:
+                    now = time.monotonic()
+                    self.buckets = {key: b for key, b in self.buckets.items()
+                                    if b.tokens + (now - b.last) * b.rate < b.burst}
+                # 允许突发1秒的流量
+                bucket = self.buckets[client] = TokenBucket(self.client_rate, self.client_rate)
+            return bucket
+    
+    def throttled(self, seconds):
+        with self.lock:
+            self.throttle_total += seconds
+    
+    def get_stats(self):
+        """返回调度统计，用于调整限制参数"""
+        with self.lock:
+            waits = sorted(self.recent_waits)
+            def percentile(p):
+                return round(waits[min(len(waits) - 1, int(len(waits) * p))] * 1000, 1) if waits else 0.0
+            return {
+                'max_streams': self.max_streams,
+                'client_rate': self.client_rate,
+                'active_streams': self.active,
+                'waiting_streams': len(self.waiting),
+                'abandoned_total': self.abandoned_total,
+                'timed_out_total': self.timed_out_total,
+                'streams_total': self.streams_total,
+                'queued_total': self.queued_total,
+                'wait_avg_ms': round(self.wait_total / self.streams_total * 1000, 1) if self.streams_total else 0.0,
+                'wait_p50_ms': percentile(0.5),
+                'wait_p95_ms': percentile(0.95),
+                'wait_max_ms': round(self.wait_max * 1000, 1),
+                'throttled_seconds': round(self.throttle_total, 3),
+                'clients': len(self.buckets),
+            }
+
+
+class SingleFlight:
+    """合并相同的并发计算：同一个键同时只执行一次，其余请求等待并拿到同一个结果
+    
+    键的第一项是操作名（如 'sha256'、'artifact'），其余是文件版本和参数。
+    计算抛出的异常会传给所有等待者；计算结束后键即被移除，之后的请求由各自的缓存决定是否重算。
+    """
+    
+    class Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+            self.waiters = 0
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.stats = {}     # 操作名 -> [执行次数, 合并的请求数, 失败次数, 最多同时等待数]
+    
+    def do(self, key, func):
+        """执行func()并返回结果；相同的key正在计算时等待那次计算"""
+        with self.lock:
+            stats = self.stats.setdefault(key[0], [0, 0, 0, 0])
+            call = self.calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                stats[1] += 1
+                stats[3] = max(stats[3], call.waiters)
+                leader = False
+            else:
+                call = self.calls[key] = self.Call()
+                stats[0] += 1
+                leader = True
+        
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            with self.lock:
+                stats[2] += 1
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+    
+    def get_stats(self):
+        with self.lock:
+            return {
+                'in_flight': len(self.calls),
+                'operations': {
+                    name: {'executed': executed, 'coalesced': coalesced,
+                           'failed': failed, 'max_waiters': max_waiters}
+                    for name, (executed, coalesced, failed, max_waiters) in self.stats.items()
+                },
+                'executed': sum(item[0] for item in self.stats.values()),
+                'coalesced': sum(item[1] for item in self.stats.values()),
+            }
+
+
+# 进程内所有按文件计算的昂贵操作（哈希、派生结果、压缩包索引）共用
+computations = SingleFlight()
+
+
+class PeaksCache:
+    """峰值结果的内存缓存，按 (设备, inode, 大小, 修改时间, 范围, 桶数) 索引
+    
+    峰值只需要读请求的那一段，比给整个文件算哈希便宜得多，所以不按内容存放；
+    文件变化后大小或修改时间不同，旧结果不会再被用到，总大小超过上限时淘汰最久没用的。
+    """
+    
+    MAX_BYTES = 64 * 1024 * 1024
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.total = 0
+    
+    def get(self, filepath, offset, length, buckets, sample_width):
+        st = os.stat(filepath)
+        key = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, offset, length, buckets)
+        with self.lock:
+            peaks = self.entries.get(key)
+            if peaks is not None:
+                self.entries.move_to_end(key)
+                return peaks
+        
+        def create():
+            peaks = compute_peaks(filepath, offset, length, buckets, sample_width)
+            with self.lock:
+                if key not in self.entries:
+                    self.entries[key] = peaks
+                    self.total += len(peaks)
+                while self.total > self.MAX_BYTES:
+                    _, old = self.entries.popitem(last=False)
+                    self.total -= len(old)
+            return peaks
+        return computations.do(('peaks', *key), create)
+
+
+peaks_cache = PeaksCache()
+
+
+class LiveSource:
+    """实时音频源：从标准输入、FIFO或TCP生产者读取PCM，写入一个共享的环形缓冲区
+    
+    音频只读取一次，所有收听者从同一块缓冲区取数据，各自只保存一个读取位置。
+    位置用从开始到现在的总字节数表示，缓冲区只保留最近buffer_seconds秒。
+    生产者从不等待收听者：落后超过半个缓冲区的收听者直接跳到最新位置。
+    收听者在锁内复制新数据再发送，发送期间生产者写得再快也不会覆盖正在发送的字节。
+    
+    source 取值：
+        -                 标准输入，读到结尾后音频源结束
+        tcp:<主机>:<端口>  连接到TCP生产者，断开后自动重连
+        其他              FIFO路径，读到结尾后重新打开等待下一个写入者（普通文件读完即结束）
+    """
+    
+    READ_SIZE = 64 * 1024
+    RECONNECT_DELAY = 1.0
+    
+    def __init__(self, name, source, buffer_seconds=30,
+                 sample_rate=PCM_SAMPLE_RATE, channels=PCM_CHANNELS, sample_width=PCM_SAMPLE_WIDTH):
+        self.name = name
+        self.source = source
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_width = sample_width
+        self.frame_size = channels * sample_width
+        capacity = int(buffer_seconds * sample_rate) * self.frame_size
+        self.buffer = bytearray(capacity)
+        self.view = memoryview(self.buffer)
+        self.capacity = capacity
+        self.total = 0          # 已写入的总字节数
+        self.ended = False
+        self.connected = False
+        self.cond = threading.Condition()
+        # 统计
+        self.listeners = 0
+        self.listeners_total = 0
+        self.skipped = 0
+        self.dropped = 0
+        self.reconnects = 0
+    
+    def start(self):
+        thread = threading.Thread(target=self._run, name=f"live-{self.name}", daemon=True)
+        thread.start()
+    
+    def _open(self):
+        """打开生产者，返回支持readinto的流"""
+        if self.source == '-':
+            return sys.stdin.buffer.raw
+        if self.source.startswith('tcp:'):
+            host, port = self.source[4:].rsplit(':', 1)
+            sock = socket.create_connection((host, int(port)))
+            return sock.makefile('rb', buffering=0)
+        return open(self.source, 'rb', buffering=0)
+    
+    def _run(self):
+        """读取线程：生产者断开时按来源类型结束或重连"""
+        while True:
+            try:
+                stream = self._open()
+            except OSError as e:
+                print(f"实时音频源 {self.name} 打开失败: {e}，{self.RECONNECT_DELAY:.0f}秒后重试")
+                time.sleep(self.RECONNECT_DELAY)
+                continue
+            self.connected = True
+            try:
+                self._read_from(stream)
+            except OSError as e:
+                print(f"实时音频源 {self.name} 读取失败: {e}")
+            finally:
+                self.connected = False
+                if stream is not sys.stdin.buffer.raw:
+                    stream.close()
+            
+            if not self.reopen():
+                with self.cond:
+                    self.ended = True
+                    self.cond.notify_all()
+                print(f"实时音频源 {self.name} 已结束")
+                return
+            self.reconnects += 1
+            if self.source.startswith('tcp:'):
+                time.sleep(self.RECONNECT_DELAY)
+    
+    def reopen(self):
+        """生产者断开后是否等待下一个：TCP和FIFO会，标准输入和普通文件不会"""
+        if self.source.startswith('tcp:'):
+            return True
+        try:
+            return stat.S_ISFIFO(os.stat(self.source).st_mode)
+        except OSError:
+            return False
+    
+    def _read_from(self, stream):
+        """把生产者的数据直接读进环形缓冲区"""
+        with self.cond:
+            # 上一个生产者可能停在半帧处，补零对齐，保证收听者拿到的始终是完整帧
+            partial = self.total % self.frame_size
+            if partial:
+                self._write_zeros(self.frame_size - partial)
+        while True:
+            start = self.total % self.capacity
+            count = stream.readinto(self.view[start:min(self.capacity, start + self.READ_SIZE)])
+            if not count:
+                return
+            with self.cond:
+                self.total += count
+                self.cond.notify_all()
+    
+    def _write_zeros(self, count):
+        start = self.total % self.capacity
+        self.view[start:start + count] = bytes(count)
+        self.total += count
+    
+    def live_edge(self):
+        """最新的帧对齐位置"""
+        return self.total - self.total % self.frame_size
+    
+    def open_cursor(self, back_seconds=0):
+        """新收听者的起始位置：最新位置往前back_seconds秒（不超过缓冲区中保留的数据）"""
+        with self.cond:
+            self.listeners += 1
+            self.listeners_total += 1
+            back = int(back_seconds * self.sample_rate) * self.frame_size
+            back = min(back, self.capacity // 2, self.live_edge())
+            return self.live_edge() - back
+    
+    def close_cursor(self, dropped=False):
+        with self.cond:
+            self.listeners -= 1
+            if dropped:
+                self.dropped += 1
+    
+    def read(self, cursor, timeout):
+        """等待cursor之后的新数据
+        
+        返回 (新位置, 数据块列表)；数据在锁内从环形缓冲区复制出来，之后被覆盖也不受影响。
+        没有新数据时返回空列表；音频源已结束且数据已读完时返回 (cursor, None)。
+        """
+        with self.cond:
+            if self.total <= cursor and not self.ended:
+                self.cond.wait(timeout)
+            if self.total <= cursor:
+                return cursor, (None if self.ended else [])
+            # 生产者在锁外往total之后最多READ_SIZE字节里读数据，落后不到半个缓冲区的数据不会被它覆盖
+            if self.total - cursor > self.capacity // 2:
+                # 收听者太慢，跳到最新位置，避免读到正在被覆盖的数据
+                self.skipped += 1
+                cursor = self.live_edge()
+                if self.total <= cursor:
+                    return cursor, []
+            end = self.total
+            start = cursor % self.capacity
+            count = end - cursor
+            first = min(count, self.capacity - start)
+            chunks = [bytes(self.view[start:start + first])]
+            if count > first:
+                chunks.append(bytes(self.view[:count - first]))
+        return end, chunks
+    
+    def get_stats(self):
+        return {
+            'name': self.name,
+            'source': self.source,
+            'sample_rate': self.sample_rate,
+            'channels': self.channels,
+            'sample_width': self.sample_width,
+            'connected': self.connected,
+            'ended': self.ended,
+            'bytes_total': self.total,
+            'buffer_bytes': self.capacity,
+            'listeners': self.listeners,
+            'listeners_total': self.listeners_total,
+            'skipped': self.skipped,
+            'dropped': self.dropped,
+            'reconnects': self.reconnects,
+        }
+
+
+# 压缩包成员的名称格式：<压缩包文件名>!/<成员路径>
+ARCHIVE_SEPARATOR = '!/'
+ARCHIVE_EXTENSIONS = ('.zip', '.tar')
+# zip压缩方式：存储（不压缩）、deflate、bzip2
+ZIP_STORED, ZIP_DEFLATED, ZIP_BZIP2 = 0, 8, 12
+
+
+class ArchiveIndex:
+    """zip/tar压缩包的成员索引
+    
+    zip只读取末尾的中央目录，tar逐个读取512字节的成员头并跳过数据，都不需要读完整个文件。
+    索引按(文件大小, 修改时间)持久化到data目录下的 .archive-index 中，压缩包不变时直接加载。
+    成员记录: (偏移, 大小, 压缩方式, 压缩后大小, 修改时间, CRC32)；
+    zip的偏移是本地文件头的位置，数据位置在发送时读取本地文件头得到。
+    """
+    
+    VERSION = 1
+    
+    _cache = {}
+    _lock = threading.Lock()
+    
+    def __init__(self, path, key, kind, members):
+        self.path = path
+        self.key = key
+        self.kind = kind
+        self.members = members
+    
+    @classmethod
+    def get(cls, path, index_dir):
+        """取得压缩包的索引：内存中有且未过期时直接返回，否则从磁盘加载或重新建立"""
+        st = os.stat(path)
+        key = [st.st_size, st.st_mtime_ns]
+        with cls._lock:
+            index = cls._cache.get(path)
+        if index is not None and index.key == key:
+            return index
+        
+        # 不同压缩包的索引可以同时建立，同一个压缩包的并发请求共用一次
+        def load():
+            index = cls._load(path, index_dir, key) or cls._build(path, index_dir, key)
+            with cls._lock:
+                cls._cache[path] = index
+            return index
+        return computations.do(('archive_index', path, *key), load)
+    
+    @staticmethod
+    def _index_path(path, index_dir):
+        return os.path.join(index_dir, os.path.basename(path) + '.json')
+    
+    @classmethod
+    def _load(cls, path, index_dir, key):
+        try:
+            with open(cls._index_path(path, index_dir), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != cls.VERSION or data.get('key') != key:
+            return None
+        members = {name: tuple(entry) for name, *entry in data['members']}
+        return cls(path, key, data['kind'], members)
+    
+    @classmethod
+    def _build(cls, path, index_dir, key):
+        started = time.monotonic()
+        if path.lower().endswith('.zip'):
+            kind, members = 'zip', cls._scan_zip(path)
+        else:
+            kind, members = 'tar', cls._scan_tar(path)
+        index = cls(path, key, kind, members)
+        
+        os.makedirs(index_dir, exist_ok=True)
+        index_path = cls._index_path(path, index_dir)
+        data = {
+            'version': cls.VERSION,
+            'key': key,
+            'kind': kind,
+            'members': [[name, *entry] for name, entry in members.items()],
+        }
+        # 多个工作进程可能同时为同一个压缩包建索引，临时文件名必须各不相同
+        fd, temp_path = tempfile.mkstemp(dir=index_dir, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(temp_path, index_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        print(f"已建立压缩包索引: {os.path.basename(path)}，{len(members)}个成员，"
+              f"耗时{time.monotonic() - started:.2f}秒")
+        return index
+    
+    @staticmethod
+    def _scan_zip(path):
+        members = {}
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or info.flag_bits & 0x1:
+                    continue  # 跳过目录和加密的成员
+                mtime = time.mktime(info.date_time + (0, 0, -1))
+                members[info.filename] = (info.header_offset, info.file_size, info.compress_type,
+                                          info.compress_size, mtime, info.CRC)
+        return members
+    
+    @staticmethod
+    def _scan_tar(path):
+        members = {}
+        with tarfile.open(path, 'r:') as archive:
+            for info in archive:
+                if info.isfile():
+                    members[info.name] = (info.offset_data, info.size, ZIP_STORED,
+                                          info.size, info.mtime, None)
+        return members
+    
+    def data_offset(self, f, entry):
+        """返回成员数据在压缩包中的偏移"""
+        if self.kind != 'zip':
+            return entry[0]
+        f.seek(entry[0])
+        header = f.read(30)
+        if len(header) < 30 or header[:4] != b'PK\x03\x04':
+            raise ValueError("zip本地文件头无效")
+        name_length, extra_length = struct.unpack('<HH', header[26:30])
+        return entry[0] + 30 + name_length + extra_length
+
+
+def is_archive(filename):
+    return filename.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+class DirectoryTree:
+    """data目录树的并行扫描与缓存
+    
+    按层把目录分给线程池用 os.scandir 扫描。每个目录的扫描结果按目录的修改时间缓存，
+    目录修改时间不变（没有增删改名）时直接复用上次的结果，不再列出其中的文件；
+    子目录仍会逐个检查，深层的变化不会漏掉。
+    文件追加写入不会改变目录的修改时间，需要最新的文件大小时用 force 强制重新扫描。
+    缓存: 相对路径 -> (目录修改时间, [(文件名, 大小, 修改时间)], [子目录名])
+    """
+    
+    _trees = {}
+    _trees_lock = threading.Lock()
+    
+    def __init__(self, root, workers=None):
+        self.root = root
+        self.workers = workers or min(32, (os.cpu_count() or 1) * 4)
+        self.cache = {}
+        self.walk_lock = threading.Lock()
+        # 目录内容变化时的回调: on_change(相对路径, 旧文件列表, 新文件列表)
+        self.on_change = None
+    
+    @classmethod
+    def for_root(cls, root):
+        """每个data目录共用一个实例，缓存在请求之间保留"""
+        with cls._trees_lock:
+            tree = cls._trees.get(root)
+            if tree is None:
+                tree = cls._trees[root] = cls(root)
+            return tree
+    
+    @classmethod
+    def refresh_dir(cls, root, rel):
+        """目录内容有变化时（例如上传完成）立即重新扫描，已有的目录树和搜索索引随之更新"""
+        with cls._trees_lock:
+            tree = cls._trees.get(root)
+        if tree is not None:
+            tree.scan_dir(rel)
+    
+    def _path(self, rel):
+        return os.path.join(self.root, *rel.split('/')) if rel else self.root
+    
+    def scan_dir(self, rel, force=False):
+        """扫描一个目录，返回 (缓存条目, 是否复用了缓存)；目录不存在时条目为None"""
+        old = self.cache.get(rel)
+        try:
+            entry, reused = list_directory(self._path(rel), None if force else old)
+        except (FileNotFoundError, NotADirectoryError):
+            self._remove(rel)
+            return None, False
+        if reused:
+            return entry, True
+        self.cache[rel] = entry
+        if self.on_change is not None:
+            self.on_change(rel, old[1] if old else [], entry[1])
+        return entry, False
+    
+    def _remove(self, rel):
+        old = self.cache.pop(rel, None)
+        if old is not None and self.on_change is not None:
+            self.on_change(rel, old[1], [])
+    
+    def walk(self, rel='', force=False):
+        """并行扫描rel下的整个子树，返回 (目录数, 重新扫描的目录数)"""
+        with self.walk_lock:
+            seen = set()
+            rescanned = 0
+            frontier = [rel]
+            with ThreadPoolExecutor(self.workers) as pool:
+                while frontier:
+                    results = pool.map(lambda r: (r, self.scan_dir(r, force)), frontier)
+                    frontier = []
+                    for path, (entry, cached) in results:
+                        if entry is None:
+                            continue
+                        seen.add(path)
+                        rescanned += not cached
+                        frontier.extend(f"{path}/{name}" if path else name for name in entry[2])
+            
+            # 清理已经删除的目录
+            prefix = rel + '/' if rel else ''
+            for path in list(self.cache):
+                if (path == rel or path.startswith(prefix)) and path not in seen:
+                    self._remove(path)
+            return len(seen), rescanned
+    
+    def iter_files(self, rel=''):
+        """遍历缓存中rel子树下的文件: (相对路径, 大小, 修改时间)"""
+        prefix = rel + '/' if rel else ''
+        for path, (_, files, _) in list(self.cache.items()):
+            if path == rel or path.startswith(prefix):
+                base = path + '/' if path else ''
+                for name, size, mtime in files:
+                    yield base + name, size, mtime
+
+
+class FileSearchIndex:
+    """文件名搜索索引，由DirectoryTree的目录变化回调增量维护
+    
+    - 文件名（相对路径，小写）按三字母组建立倒排表，子串查询从最短的倒排表开始，
+      依次和长度相近的倒排表求交集；路径末尾补两个换行再取组，短于三个字符的子串
+      取以它开头的全部三字母组的并集
+    - 按大小、修改时间排好序的文件编号数组，范围查询用二分查找
+    - 增量变化：新文件追加编号，删除的文件留下空位，修改过的文件记入delta；
+      排序数组只在compact时重建，查询时delta中的文件逐个检查，所有候选都按当前值再核对一遍
+    """
+    
+    GRAM = 3
+    # 候选超过这个数量时改为按修改时间从新到旧逐个检查，凑够limit个就停止
+    SCAN_THRESHOLD = 20000
+    # 倒排表不超过候选数的这么多倍时才求交集，否则逐个核对候选更快
+    INTERSECT_FACTOR = 16
+    # 搜索到来时，距上次扫描超过这个时间（秒）就在后台重新扫描目录树
+    REFRESH_INTERVAL = 5
+    
+    _indexes = {}
+    _indexes_lock = threading.Lock()
+    
+    def __init__(self, tree=None):
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.tree = tree
+        self.refresh_lock = threading.Lock()
+        self.refreshing = False
+        self.refreshed = None       # 上次扫描完成的时间
+        self._reset()
+    
+    @classmethod
+    def for_root(cls, root):
+        """取得data目录的搜索索引；第一次调用时挂到目录树上"""
+        with cls._indexes_lock:
+            index = cls._indexes.get(root)
+            if index is None:
+                tree = DirectoryTree.for_root(root)
+                index = cls._indexes[root] = cls(tree)
+                tree.on_change = index.apply_change
+                # 目录树里已经扫描过的目录直接导入
+                for rel, entry in list(tree.cache.items()):
+                    index.apply_change(rel, [], entry[1])
+            return index
+    
+    def refresh(self):
+        """搜索前调用：索引过期时在后台重新扫描目录树，本次搜索先用现有的结果
+        
+        没有搜索时不扫描；多个工作进程也只在各自收到搜索时才扫描。
+        目录的变化通过DirectoryTree的回调同步到索引，修改时间没变的目录不会重新列出。
+        """
+        with self.refresh_lock:
+            if self.refreshing or (self.refreshed is not None and
+                                   time.monotonic() - self.refreshed < self.REFRESH_INTERVAL):
+                return
+            self.refreshing = True
+        threading.Thread(target=self._refresh, daemon=True).start()
+    
+    def _refresh(self):
+        try:
+            self.tree.walk()
+            if self.needs_compact():
+                self.compact()
+        except OSError as e:
+            print(f"搜索索引刷新失败: {e}")
+        finally:
+            with self.refresh_lock:
+                self.refreshing = False
+                self.refreshed = time.monotonic()
+            self.ready.set()
+    
+    def _reset(self):
+        self.names = []             # 编号 -> 相对路径，删除后为None
+        self.sizes = array('q')
+        self.mtimes = array('d')
+        self.ids = {}               # 相对路径 -> 编号
+        self.grams = {}             # 三字母组 -> array('I') 编号（递增）
+        self.gram_prefixes = {}     # 一、两个字符 -> 以它开头的三字母组列表
+        self.removed = 0
+        self.delta = set()          # 排序数组建立之后新增或修改的编号
+        self.by_size = array('I')
+        self.size_keys = array('q')
+        self.by_mtime = array('I')
+        self.mtime_keys = array('d')
+    
+    def apply_change(self, rel, old_files, new_files):
+        """DirectoryTree的回调：一个目录的文件列表从old_files变成new_files"""
+        base = rel + '/' if rel else ''
+        new = {name: (size, mtime) for name, size, mtime in new_files}
+        with self.lock:
+            for name, _, _ in old_files:
+                if name not in new:
+                    self._remove(base + name)
+            for name, (size, mtime) in new.items():
+                self._put(base + name, size, mtime)
+    
+    def _put(self, path, size, mtime):
+        file_id = self.ids.get(path)
+        if file_id is not None:
+            if self.sizes[file_id] != size or self.mtimes[file_id] != mtime:
+                self.sizes[file_id] = size
+                self.mtimes[file_id] = mtime
+                self.delta.add(file_id)
+            return
+        file_id = len(self.names)
+        self.ids[path] = file_id
+        self.names.append(path)
+        self.sizes.append(size)
+        self.mtimes.append(mtime)
+        self.delta.add(file_id)
+        # 补上换行，末尾的一两个字符也是某个三字母组的开头
+        lower = path.lower() + '\n' * (self.GRAM - 1)
+        for gram in {lower[i:i + self.GRAM] for i in range(len(lower) - self.GRAM + 1)}:
+            postings = self.grams.get(gram)
+            if postings is None:
+                postings = self.grams[gram] = array('I')
+                for prefix in (gram[:1], gram[:2]):
+                    self.gram_prefixes.setdefault(prefix, []).append(gram)
+            postings.append(file_id)
+    
+    def _remove(self, path):
+        file_id = self.ids.pop(path, None)
+        if file_id is not None:
+            self.names[file_id] = None
+            self.removed += 1
+            self.delta.discard(file_id)
+    
+    def needs_compact(self):
+        count = len(self.names)
+        return len(self.delta) > 1000 + count // 20 or self.removed > 1000 + count // 4
+    
+    def compact(self):
+        """重建排序数组；删除的文件较多时连同编号和倒排表一起重建"""
+        with self.lock:
+            if self.removed > len(self.names) // 4:
+                files = [(path, self.sizes[i], self.mtimes[i]) for i, path in enumerate(self.names) if path]
+                self._reset()
+                for path, size, mtime in files:
+                    self._put(path, size, mtime)
+            live = [i for i, path in enumerate(self.names) if path is not None]
+            live.sort(key=self.sizes.__getitem__)
+            self.by_size = array('I', live)
+            self.size_keys = array('q', (self.sizes[i] for i in live))
+            live.sort(key=self.mtimes.__getitem__)
+            self.by_mtime = array('I', live)
+            self.mtime_keys = array('d', (self.mtimes[i] for i in live))
+            self.delta = set()
+    
+    def count(self):
+        return len(self.ids)
+    
+    def search(self, substrings=(), pattern=None, min_size=None, max_size=None,
+               since=None, until=None, limit=100, glob=None):
+        """查询文件，按修改时间从新到旧返回最多limit个 (路径, 大小, 修改时间)，以及是否还有更多
+        
+        substrings中的每个子串（不区分大小写）都必须出现在路径中；pattern为编译好的正则，
+        在路径中任意位置匹配即可；glob为fnmatch.translate编译的通配符，必须匹配完整路径。
+        """
+        substrings = [sub.lower() for sub in substrings if sub]
+        names = self.names
+        sizes = self.sizes
+        mtimes = self.mtimes
+        
+        def matching(ids):
+            # 先做便宜的检查，正则放在最后
+            for file_id in ids:
+                name = names[file_id]
+                if name is None:
+                    continue
+                if substrings:
+                    lower = name.lower()
+                    if any(sub not in lower for sub in substrings):
+                        continue
+                size = sizes[file_id]
+                if (min_size is not None and size < min_size) or (max_size is not None and size > max_size):
+                    continue
+                mtime = mtimes[file_id]
+                if (since is not None and mtime < since) or (until is not None and mtime > until):
+                    continue
+                if glob is not None and glob.fullmatch(name) is None:
+                    continue
+                if pattern is not None and pattern.search(name) is None:
+                    continue
+                yield file_id
+        
+        with self.lock:
+            candidates = self._candidates(substrings, min_size, max_size, since, until)
+            if candidates is not None:
+                # 候选先按修改时间从新到旧排好，核对到第limit+1个命中即可停止
+                ordered = sorted(candidates, key=mtimes.__getitem__, reverse=True)
+                found = list(itertools.islice(matching(ordered), limit + 1))
+            else:
+                # 条件不够有选择性：按修改时间从新到旧检查，凑够limit个即停止
+                found = list(matching(self.delta))
+                newest = (i for i in reversed(self.by_mtime) if i not in self.delta)
+                found.extend(itertools.islice(matching(newest), limit + 1))
+            found.sort(key=mtimes.__getitem__, reverse=True)
+            return [(names[i], sizes[i], mtimes[i]) for i in found[:limit]], len(found) > limit
+    
+    def _candidates(self, substrings, min_size, max_size, since, until):
+        """从索引中取候选编号集合；没有足够有选择性的索引条件时返回None"""
+        # (大小, 倒排表)；短子串是待合并的一组倒排表，大小取总长度，用到时才合并
+        lists = []
+        count = max(len(self.names), 1)
+        # 按各子串相互独立估计的命中数，估计值很大时逐个检查很快就能凑够limit个
+        estimate = float(count)
+        for sub in substrings:
+            if len(sub) >= self.GRAM:
+                grams = [self.grams.get(sub[i:i + self.GRAM]) for i in range(len(sub) - self.GRAM + 1)]
+                if None in grams:
+                    return []
+                lists.extend((len(postings), postings) for postings in grams)
+                estimate *= min(map(len, grams)) / count
+            else:
+                # 短子串出现在以它开头的三字母组中
+                prefixed = self.gram_prefixes.get(sub)
+                if not prefixed:
+                    return []
+                grams = [self.grams[gram] for gram in prefixed]
+                total = sum(map(len, grams))
+                lists.append((total, grams))
+                estimate *= min(total, count) / count
+        
+        best = None
+        best_size = self.SCAN_THRESHOLD
+        lists.sort(key=operator.itemgetter(0))
+        if lists and (lists[0][0] <= best_size or
+                      (estimate <= best_size and lists[0][0] <= best_size * self.INTERSECT_FACTOR)):
+            # 从最短的倒排表开始，依次和长度相近的倒排表求交集
+            found = None
+            for size, postings in lists:
+                if found is not None and size > len(found) * self.INTERSECT_FACTOR:
+                    break
+                if isinstance(postings, list):
+                    if found is None:
+                        matched = set()
+                        for ids in postings:
+                            matched.update(ids)
+                    else:
+                        matched = set()
+                        for ids in postings:
+                            matched.update(found.intersection(ids))
+                    found = matched
+                elif found is None:
+                    found = set(postings)
+                else:
+                    found.intersection_update(postings)
+            # 倒排表包含建立排序数组之后新增的文件，不需要再加delta
+            if len(found) <= best_size:
+                best, best_size = found, len(found)
+        
+        ranges = []
+        if min_size is not None or max_size is not None:
+            low = 0 if min_size is None else bisect.bisect_left(self.size_keys, min_size)
+            high = len(self.size_keys) if max_size is None else bisect.bisect_right(self.size_keys, max_size)
+            ranges.append((self.by_size, low, high))
+        if since is not None or until is not None:
+            low = 0 if since is None else bisect.bisect_left(self.mtime_keys, since)
+            high = len(self.mtime_keys) if until is None else bisect.bisect_right(self.mtime_keys, until)
+            ranges.append((self.by_mtime, low, high))
+        for ids, low, high in ranges:
+            if high - low + len(self.delta) <= best_size:
+                best = set(ids[low:high])
+                best.update(self.delta)
+                best_size = len(best)
+        
+        return best
+
+
+class ContentHasher:
+    """文件内容的SHA-256，按(设备, inode, 大小, 修改时间)缓存
+    
+    文件按1 MiB分块读入复用的缓冲区计算哈希；多个文件用线程池并行计算
+    （hashlib在计算时释放GIL）。缓存持久化到data目录下的 .content-hash.json，
+    改名、移动不改变inode，不需要重新计算；内容改变后大小或修改时间不同，自然失效。
+    """
+    
+    VERSION = 1
+    CHUNK_SIZE = 1 << 20
+    # 新计算这么多个哈希后写一次缓存文件
+    SAVE_EVERY = 1000
+    
+    _hashers = {}
+    _hashers_lock = threading.Lock()
+    
+    def __init__(self, cache_path, workers=None):
+        self.cache_path = cache_path
+        self.workers = workers or min(16, (os.cpu_count() or 1) * 2)
+        self.lock = threading.Lock()
+        self.entries = {}   # (设备, inode) -> (大小, 修改时间, 哈希)
+        self.unsaved = 0
+        self._load()
+    
+    @classmethod
+    def for_root(cls, root):
+        """每个data目录共用一个实例"""
+        with cls._hashers_lock:
+            hasher = cls._hashers.get(root)
+            if hasher is None:
+                hasher = cls._hashers[root] = cls(os.path.join(root, '.content-hash.json'))
+            return hasher
+    
+    def _load(self):
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') != self.VERSION:
+            return
+        for dev, ino, size, mtime, digest in data.get('entries', []):
+            self.entries[(dev, ino)] = (size, mtime, digest)
+    
+    def save(self):
+        """把缓存写入文件（先写临时文件再改名）"""
+        with self.lock:
+            if not self.unsaved:
+                return
+            entries = [[dev, ino, *value] for (dev, ino), value in self.entries.items()]
+            self.unsaved = 0
+        directory = os.path.dirname(self.cache_path)
+        os.makedirs(directory, exist_ok=True)
+        # 多个工作进程会同时保存，临时文件名必须各不相同
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.content-hash-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'version': self.VERSION, 'entries': entries}, f, separators=(',', ':'))
+            os.replace(temp_path, self.cache_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+    
+    def cached(self, st):
+        value = self.entries.get((st.st_dev, st.st_ino))
+        if value is not None and value[0] == st.st_size and value[1] == st.st_mtime_ns:
+            return value[2]
+        return None
+    
+    def remember(self, path, digest, st=None):
+        """记录已知的哈希（例如上传时边接收边算出的）；st为计算开始时文件的状态"""
+        if st is None:
+            st = os.stat(path)
+        with self.lock:
+            self.entries[(st.st_dev, st.st_ino)] = (st.st_size, st.st_mtime_ns, digest)
+            self.unsaved += 1
+    
+    def digest(self, path):
+        """返回文件内容的SHA-256十六进制串"""
+        digest, computed = self._digest(path)
+        if computed and self.unsaved >= self.SAVE_EVERY:
+            self.save()
+        return digest
+    
+    def _digest(self, path):
+        """返回 (哈希, 是否由本次调用计算)；同一文件版本正在计算时等待那次计算"""
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            digest = self.cached(st)
+            if digest is not None:
+                return digest, False
+            computed = []
+            
+            def compute():
+                computed.append(True)
+                sha = hashlib.sha256()
+                buffer = bytearray(self.CHUNK_SIZE)
+                view = memoryview(buffer)
+                while True:
+                    count = f.readinto(buffer)
+                    if not count:
+                        break
+                    sha.update(view[:count])
+                digest = sha.hexdigest()
+                # 计算期间文件被修改时，以计算开始时的大小和修改时间记录，下次会重新计算
+                with self.lock:
+                    self.entries[(st.st_dev, st.st_ino)] = (st.st_size, st.st_mtime_ns, digest)
+                    self.unsaved += 1
+                return digest
+            
+            key = ('sha256', st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+            return computations.do(key, compute), bool(computed)
+    
+    def digest_many(self, paths):
+        """并行计算多个文件的哈希，返回 ({路径: 哈希}, 新计算的个数)；读取失败的文件不在结果中"""
+        def task(path):
+            try:
+                return path, *self._digest(path)
+            except OSError:
+                return path, None, False
+        
+        results = {}
+        computed = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for path, digest, fresh in executor.map(task, paths):
+                if digest is not None:
+                    results[path] = digest
+                    computed += fresh
+        if computed:
+            self.save()
+        return results, computed
+
+
+class ArtifactStore:
+    """按内容哈希存放较大的派生结果（传输编码）：<目录>/<哈希前两位>/<哈希>/<名称>
+    
+    内容相同的文件不论叫什么名字都共用同一份结果；源文件内容变化后哈希不同，旧结果不会再被用到，
+    由总大小上限按最近使用时间淘汰。
+    """
+    
+    MAX_BYTES = 1 << 30
+    
+    _stores = {}
+    _stores_lock = threading.Lock()
+    
+    def __init__(self, root):
+        self.root = root
+        self.lock = threading.Lock()
+        self.total = None   # 当前总大小，第一次写入时统计
+    
+    @classmethod
+    def for_root(cls, root):
+        """每个data目录共用一个实例，总大小在请求之间保留"""
+        with cls._stores_lock:
+            store = cls._stores.get(root)
+            if store is None:
+                store = cls._stores[root] = cls(os.path.join(root, '.artifacts'))
+            return store
+    
+    def path(self, digest, name):
+        return os.path.join(self.root, digest[:2], digest, name)
+    
+    def lookup(self, digest, name):
+        """返回已有结果文件的路径并记录使用时间，不存在时返回None"""
+        path = self.path(digest, name)
+        return path if self._touch(path) else None
+    
+    def create_temp(self):
+        """创建写结果用的临时文件，返回 (文件描述符, 路径)"""
+        os.makedirs(self.root, exist_ok=True)
+        return tempfile.mkstemp(dir=self.root, prefix='.tmp-')
+    
+    def commit(self, temp_path, digest, name):
+        """把写好的临时文件放到结果的位置，返回结果路径"""
+        path = self.path(digest, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+        self._added(os.path.getsize(path))
+        return path
+    
+    @staticmethod
+    def _touch(path):
+        """记录最近使用时间，文件不存在时返回False"""
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+    
+    def _scan(self):
+        """列出所有结果文件: [(最近使用时间, 大小, 路径)]"""
+        files = []
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                if name.startswith('.'):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((st.st_mtime, st.st_size, path))
+        return files
+    
+    def _added(self, size):
+        with self.lock:
+            if self.total is None:
+                self.total = sum(item[1] for item in self._scan())
+            else:
+                self.total += size
+            if self.total <= self.MAX_BYTES:
+                return
+            # 淘汰到上限的80%，不必每次写入都重新统计
+            files = sorted(self._scan())
+            self.total = sum(item[1] for item in files)
+            for _, file_size, path in files:
+                if self.total <= self.MAX_BYTES * 0.8:
+                    break
+                try:
+                    os.unlink(path)
+                    os.rmdir(os.path.dirname(path))
+                except OSError:
+                    pass    # 目录里还有其他结果
+                self.total -= file_size
+
+
+class PCMPlayerHandler(KeepAliveMixin, SimpleHTTPRequestHandler):
     def __init__(self, *args, **kwargs):
         # 设置data目录路径
         self.data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
         super().__init__(*args, **kwargs)
     
+    # 大响应体的传输调度，进程内所有连接共享
+    scheduler = TransferScheduler()
+    # 实时音频源：名称 -> LiveSource
+    live_sources = {}
+    # 实时收听者一次发送的最长阻塞时间（秒），超过则断开这个收听者
+    LIVE_SEND_TIMEOUT = 5
+    
+    def handle_one_request(self):
+        """处理一个请求；请求结束时通知服务器，平滑退出时据此等待"""
+        self.in_flight = False
+        self.transfer_wait = None
+        try:
+            super().handle_one_request()
+        finally:
+            if self.in_flight:
+                self.server.request_finished()
+    
+    def parse_request(self):
+        """解析请求头；解析成功后记为进行中的请求，平滑退出时要等它完成"""
+        if not super().parse_request():
+            return False
+        if hasattr(self.server, 'request_started'):
+            self.server.request_started()
+            self.in_flight = True
+        return True
+    
+    def end_headers(self):
+        """结束响应头，附带排队时间；工作进程正在退出时不再保持连接"""
+        if getattr(self.server, 'draining', False):
+            # 工作进程正在退出，不再接受这个连接上的后续请求
+            self.close_connection = True
+        if self.transfer_wait is not None:
+            self.send_header('Server-Timing', f'queue;dur={self.transfer_wait * 1000:.1f}')
+        super().end_headers()
+    
     def do_GET(self):
         """处理GET请求"""
         parsed_path = urlparse(self.path)
@@ -28,19 +1612,88 @@ class PCMPlayerHandler(SimpleHTTPRequestHandler):
         try:
             if path == '/api/files':
                 # 返回文件列表
-                self.handle_file_list()
+                self.handle_file_list(parse_qs(parsed_path.query))
+            elif path == '/api/search':
+                # 按文件名、大小、修改时间搜索
+                self.handle_search(parse_qs(parsed_path.query))
+            elif path == '/api/tree':
+                # 浏览目录或列出子树
+                self.handle_tree(parse_qs(parsed_path.query))
+            elif path == '/api/duplicates':
+                # 列出内容完全相同的文件
+                self.handle_duplicates(parse_qs(parsed_path.query))
+            elif path == '/api/stats':
+                # 返回传输调度统计
+                self.handle_stats()
             elif path.startswith('/api/play/'):
                 # 返回PCM文件内容
                 filename = path[10:]  # 移除 '/api/play/'
-                self.handle_play_file(filename)
+                self.handle_play_file(filename, parse_qs(parsed_path.query))
+            elif path == '/api/live':
+                # 返回实时音频源列表
+                self.handle_live_list()
+            elif path.startswith('/api/live/'):
+                # 收听实时音频源
+                self.handle_live(unquote(path[10:]), parse_qs(parsed_path.query))
+            elif path.startswith('/api/follow/'):
+                # 边写边播：持续发送文件新追加的数据
+                filename = path[12:]  # 移除 '/api/follow/'
+                self.handle_follow(filename, parse_qs(parsed_path.query))
+            elif path.startswith('/api/clip/'):
+                # 返回指定时间段的音频片段
+                filename = path[10:]  # 移除 '/api/clip/'
+                self.handle_clip(filename, parse_qs(parsed_path.query))
             else:
                 # 默认处理静态文件
                 super().do_GET()
         except Exception as e:
             self.send_error(500, f"服务器错误: {str(e)}")
     
-    def handle_file_list(self):
-        """处理文件列表请求"""
+    def do_POST(self):
+        """处理POST请求"""
+        parsed_path = urlparse(self.path)
+        path = parsed_path.path
+        
+        try:
+            if path == '/api/batch':
+                # 一次请求返回多个片段和/或峰值
+                self.handle_batch()
+            elif path.startswith('/api/upload/'):
+                # 上传文件到data目录
+                self.handle_upload(unquote(path[12:]), parse_qs(parsed_path.query))
+            else:
+                # 请求体没有被读取，不能继续复用这个连接
+                self.close_connection = True
+                self.send_error(404, "接口不存在")
+        except Exception as e:
+            self.send_error(500, f"服务器错误: {str(e)}")
+    
+    def do_PUT(self):
+        """处理PUT请求"""
+        parsed_path = urlparse(self.path)
+        path = parsed_path.path
+        
+        try:
+            if path.startswith('/api/upload/'):
+                self.handle_upload(unquote(path[12:]), parse_qs(parsed_path.query))
+            else:
+                self.close_connection = True
+                self.send_error(404, "接口不存在")
+        except Exception as e:
+            self.close_connection = True
+            self.send_error(500, f"服务器错误: {str(e)}")
+    
+    def handle_expect_100(self):
+        """直接写出100 Continue，不经过end_headers（否则会被当成已经发出了最终响应头）"""
+        if self.request_version != 'HTTP/0.9':
+            self.wfile.write(f"{self.protocol_version} 100 Continue\r\n\r\n".encode('latin-1'))
+        return True
+    
+    def handle_file_list(self, query):
+        """处理文件列表请求；recursive=1 时列出整个data目录树（见handle_tree）"""
+        if query.get('recursive', ['0'])[0] in ('1', 'true'):
+            self.handle_tree(dict(query, recursive=['1']), flat=True)
+            return
         try:
             if not os.path.exists(self.data_dir):
                 os.makedirs(self.data_dir)
@@ -48,6 +1701,8 @@ class PCMPlayerHandler(SimpleHTTPRequestHandler):
             else:
                 files = []
                 for filename in os.listdir(self.data_dir):
+                    if filename.startswith('.'):
+                        continue  # 隐藏文件：正在上传的临时文件、哈希缓存等
                     filepath = os.path.join(self.data_dir, filename)
                     if os.path.isfile(filepath):
                         stat = os.stat(filepath)
@@ -56,79 +1711,1460 @@ class PCMPlayerHandler(SimpleHTTPRequestHandler):
                             'size': stat.st_size,
                             'mtime': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(stat.st_mtime))
                         })
+                        if is_archive(filename):
+                            files.extend(self.archive_file_list(filepath, filename))
             
             # 按修改时间降序排序
             files.sort(key=lambda x: x['mtime'], reverse=True)
             
+            response = json.dumps(files, ensure_ascii=False).encode('utf-8')
+            
             self.send_response(200)
             self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(response)))
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
             
-            response = json.dumps(files, ensure_ascii=False)
-            self.wfile.write(response.encode('utf-8'))
+            self.wfile.write(response)
             
         except Exception as e:
             self.send_error(500, f"获取文件列表失败: {str(e)}")
     
-    def handle_play_file(self, filename):
-        """处理播放文件请求"""
+    # 子树列表默认/最多返回的文件数
+    TREE_DEFAULT_LIMIT = 1000
+    TREE_MAX_LIMIT = 100000
+    
+    def handle_tree(self, query, flat=False):
+        """处理目录树请求：/api/tree?path=<目录>&recursive=1&limit=<数量>&refresh=1
+        
+        不带recursive时只列出path下一层的子目录和文件；带recursive时并行扫描整个子树，
+        按修改时间从新到旧返回最多limit个文件，并给出总数。
+        文件名均为相对data目录、用 / 分隔的路径，可以直接用于 /api/play 等接口。
+        flat为True时只返回文件数组，与 /api/files 的格式一致。
+        """
+        rel = query.get('path', [''])[0].strip('/')
+        if rel and not self.valid_relative_path(rel):
+            self.send_error(400, "无效的目录")
+            return
+        try:
+            limit = int(query.get('limit', [self.TREE_DEFAULT_LIMIT])[0])
+        except ValueError:
+            self.send_error(400, "无效的limit")
+            return
+        limit = max(1, min(limit, self.TREE_MAX_LIMIT))
+        recursive = query.get('recursive', ['0'])[0] in ('1', 'true')
+        force = query.get('refresh', ['0'])[0] in ('1', 'true')
+        
+        os.makedirs(self.data_dir, exist_ok=True)
+        tree = DirectoryTree.for_root(self.data_dir)
+        def file_info(path, size, mtime):
+            return {
+                'name': path,
+                'size': size,
+                'mtime': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(mtime))
+            }
+        
+        started = time.monotonic()
+        if not recursive:
+            entry, _ = tree.scan_dir(rel, force)
+            if entry is None:
+                self.send_error(404, "目录不存在")
+                return
+            base = rel + '/' if rel else ''
+            files = sorted(entry[1], key=lambda f: f[2], reverse=True)
+            self.send_json({
+                'path': rel,
+                'dirs': [{'name': name, 'path': base + name} for name in sorted(entry[2])],
+                'files': [file_info(base + name, size, mtime) for name, size, mtime in files],
+            })
+            return
+        
+        dirs, rescanned = tree.walk(rel, force)
+        if not dirs:
+            self.send_error(404, "目录不存在")
+            return
+        total = 0
+        newest = []
+        for item in tree.iter_files(rel):
+            total += 1
+            # 只保留最新的limit个，不为几百万个文件排序
+            if len(newest) < limit:
+                heapq.heappush(newest, (item[2], item))
+            elif item[2] > newest[0][0]:
+                heapq.heapreplace(newest, (item[2], item))
+        files = [file_info(*item) for _, item in sorted(newest, reverse=True)]
+        if flat:
+            self.send_json(files)
+            return
+        self.send_json({
+            'path': rel,
+            'total': total,
+            'truncated': total > len(files),
+            'files': files,
+            'dirs_scanned': dirs,
+            'dirs_rescanned': rescanned,
+            'elapsed': round(time.monotonic() - started, 3),
+        })
+    
+    def handle_duplicates(self, query):
+        """处理查重请求：/api/duplicates?path=<目录>&min_size=<字节>&refresh=1
+        
+        只有大小相同的文件才可能内容相同，先按大小分组，再并行计算这些文件的SHA-256。
+        返回内容相同的文件组，按浪费的空间从多到少排列；默认忽略空文件。
+        """
+        rel = query.get('path', [''])[0].strip('/')
+        if rel and not self.valid_relative_path(rel):
+            self.send_error(400, "无效的目录")
+            return
+        try:
+            min_size = max(0, int(query.get('min_size', ['1'])[0]))
+        except ValueError:
+            self.send_error(400, "无效的min_size")
+            return
+        force = query.get('refresh', ['0'])[0] in ('1', 'true')
+        
+        os.makedirs(self.data_dir, exist_ok=True)
+        started = time.monotonic()
+        tree = DirectoryTree.for_root(self.data_dir)
+        dirs, _ = tree.walk(rel, force)
+        if not dirs:
+            self.send_error(404, "目录不存在")
+            return
+        
+        by_size = {}
+        total = 0
+        for path, size, _ in tree.iter_files(rel):
+            total += 1
+            if size >= min_size:
+                by_size.setdefault(size, []).append(path)
+        candidates = [path for paths in by_size.values() if len(paths) > 1 for path in paths]
+        
+        hasher = ContentHasher.for_root(self.data_dir)
+        filepaths = {os.path.join(self.data_dir, *path.split('/')): path for path in candidates}
+        digests, computed = hasher.digest_many(list(filepaths))
+        sizes = {path: size for size, paths in by_size.items() for path in paths}
+        groups = {}
+        for filepath, digest in digests.items():
+            groups.setdefault(digest, []).append(filepaths[filepath])
+        
+        result = []
+        for digest, paths in groups.items():
+            if len(paths) > 1:
+                size = sizes[paths[0]]
+                result.append({
+                    'sha256': digest,
+                    'size': size,
+                    'count': len(paths),
+                    'wasted': size * (len(paths) - 1),
+                    'files': sorted(paths),
+                })
+        result.sort(key=lambda group: (-group['wasted'], group['files'][0]))
+        self.send_json({
+            'path': rel,
+            'files': total,
+            'candidates': len(candidates),
+            'hashed': computed,
+            'groups': result,
+            'wasted': sum(group['wasted'] for group in result),
+            'elapsed': round(time.monotonic() - started, 3),
+        })
+    
+    # 搜索默认/最多返回的文件数
+    SEARCH_DEFAULT_LIMIT = 100
+    SEARCH_MAX_LIMIT = 10000
+    
+    def handle_search(self, query):
+        """处理搜索请求：/api/search?q=&glob=&regex=&min_size=&max_size=&since=&until=&limit=
+        
+        q 为不区分大小写的子串（可用空格分隔多个，需同时出现），glob 为通配符，
+        regex 为正则，都匹配相对data目录的完整路径；since/until 为时间戳或
+        "YYYY-MM-DD[ HH:MM:SS]"。结果按修改时间从新到旧排列。
+        查询使用后台维护的内存索引，不扫描目录。
+        """
+        def param(name):
+            return query.get(name, [''])[0].strip()
+        try:
+            substrings = param('q').split()
+            glob = pattern = None
+            if param('glob'):
+                glob = re.compile(fnmatch.translate(param('glob')), re.IGNORECASE)
+                # 通配符中的固定部分可以先用索引过滤
+                literal = re.sub(r'\[[^\]]*\]', '*', param('glob'))
+                substrings += [part for part in re.split(r'[*?]', literal) if part]
+            if param('regex'):
+                if glob is not None:
+                    raise ValueError("glob和regex只能指定一个")
+                pattern = re.compile(param('regex'))
+            min_size = int(param('min_size')) if param('min_size') else None
+            max_size = int(param('max_size')) if param('max_size') else None
+            since = self.parse_time(param('since')) if param('since') else None
+            until = self.parse_time(param('until')) if param('until') else None
+            limit = int(param('limit') or self.SEARCH_DEFAULT_LIMIT)
+        except (ValueError, re.error) as e:
+            self.send_error(400, f"无效的搜索参数: {e}")
+            return
+        limit = max(1, min(limit, self.SEARCH_MAX_LIMIT))
+        
+        os.makedirs(self.data_dir, exist_ok=True)
+        index = FileSearchIndex.for_root(self.data_dir)
+        index.refresh()
+        if not index.ready.wait(60):
+            self.send_error(503, "搜索索引正在建立，请稍后再试")
+            return
+        
+        started = time.perf_counter()
+        results, more = index.search(substrings, pattern, min_size, max_size, since, until, limit, glob)
+        elapsed = time.perf_counter() - started
+        self.send_json({
+            'files': [{
+                'name': path,
+                'size': size,
+                'mtime': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(mtime))
+            } for path, size, mtime in results],
+            'truncated': more,
+            'indexed': index.count(),
+            'elapsed_ms': round(elapsed * 1000, 2),
+        })
+    
+    @staticmethod
+    def parse_time(value):
+        """把时间戳或 YYYY-MM-DD[ HH:MM:SS] 格式的本地时间转换为时间戳"""
+        try:
+            return float(value)
+        except ValueError:
+            pass
+        for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d'):
+            try:
+                return time.mktime(time.strptime(value, fmt))
+            except ValueError:
+                continue
+        raise ValueError(f"无法识别的时间: {value}")
+    
+    def send_json(self, data):
+        """发送JSON响应"""
+        response = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(response)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(response)
+    
+    def handle_stats(self):
+        """处理统计请求：传输调度，以及并发计算的合并情况"""
+        stats = self.scheduler.get_stats()
+        stats['single_flight'] = computations.get_stats()
+        self.send_json(stats)
+    
+    def begin_transfer(self, size):
+        """大响应体先排队等待传输名额，小响应直接通过
+        
+        排队被放弃时抛出TransferAborted：客户端已断开则不再回应，
+        等待超时则回应503；两种情况都关闭连接（请求体可能还没读完）
+        """
+        try:
+            self.transfer_wait = self.scheduler.acquire(
+                size, lambda: self.client_disconnected(0))
+        except TransferAborted as e:
+            self.close_connection = True
+            if e.timed_out:
+                self.send_error(503, "传输排队超时，请稍后重试")
+            else:
+                # 之后调用方的send_error不再尝试写入已经断开的连接
+                self.headers_sent = True
+            raise
+    
+    def end_transfer(self):
+        """归还传输名额"""
+        if self.transfer_wait is not None:
+            self.scheduler.release()
+            self.transfer_wait = None
+    
+    def send_file_range(self, f, offset, length):
+        """用sendfile发送文件的一段；大响应按客户端的令牌桶分块限速"""
+        bucket = None
+        if self.transfer_wait is not None:
+            client = self.client_address[0] if self.client_address else 'unix'
+            bucket = self.scheduler.bucket(client)
+        if bucket is None:
+            self.send_file_body(f, offset, length)
+            return
+        end = offset + length
+        while offset < end:
+            count = min(self.scheduler.CHUNK_SIZE, end - offset)
+            delay = bucket.reserve(count)
+            if delay:
+                self.scheduler.throttled(delay)
+                time.sleep(delay)
+            if self.connection.sendfile(f, offset, count) < count:
+                # 文件中途变短，响应体不足Content-Length，不能再复用连接
+                self.close_connection = True
+                return
+            offset += count
+    
+    def archive_file_list(self, filepath, filename):
+        """列出压缩包中的成员，名称为 <压缩包>!/<成员路径>"""
+        try:
+            index = ArchiveIndex.get(filepath, os.path.join(self.data_dir, '.archive-index'))
+        except (OSError, ValueError, zipfile.BadZipFile, tarfile.TarError) as e:
+            self.log_error("无法读取压缩包 %s: %s", filename, e)
+            return []
+        return [{
+            'name': filename + ARCHIVE_SEPARATOR + name,
+            'size': entry[1],
+            'mtime': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry[4])),
+            'archive': filename,
+        } for name, entry in index.members.items()]
+    
+    def handle_archive_member(self, name):
+        """发送压缩包中的一个成员：存储的成员直接sendfile，压缩的成员边解压边发送"""
+        archive_name, _, member = name.partition(ARCHIVE_SEPARATOR)
+        filepath, code, message = self.data_file_path(archive_name)
+        if filepath is None or not is_archive(archive_name):
+            self.send_error(code or 404, message or "压缩包不存在")
+            return
+        try:
+            index = ArchiveIndex.get(filepath, os.path.join(self.data_dir, '.archive-index'))
+        except (ValueError, zipfile.BadZipFile, tarfile.TarError) as e:
+            self.send_error(415, f"无法读取压缩包: {e}")
+            return
+        entry = index.members.get(member)
+        if entry is None:
+            self.send_error(404, "压缩包中没有这个文件")
+            return
+        _, size, method, compressed_size, _, crc = entry
+        if method not in (ZIP_STORED, ZIP_DEFLATED, ZIP_BZIP2):
+            self.send_error(415, f"不支持的压缩方式: {method}")
+            return
+        
+        with open(filepath, 'rb') as f:
+            offset = index.data_offset(f, entry)
+            self.begin_transfer(size)
+            try:
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/octet-stream')
+                self.send_header('Content-Disposition', content_disposition(os.path.basename(member)))
+                self.send_header('Content-Length', str(size))
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.end_headers()
+                
+                if method == ZIP_STORED:
+                    self.send_file_range(f, offset, size)
+                else:
+                    self.send_decompressed(f, offset, compressed_size, method, size, crc)
+            finally:
+                self.end_transfer()
+    
+    # 解压时每次读取的压缩数据量和每次最多产生的解压数据量
+    DECOMPRESS_READ_SIZE = 256 * 1024
+    DECOMPRESS_OUTPUT_SIZE = 1024 * 1024
+    
+    def send_decompressed(self, f, offset, compressed_size, method, size, crc):
+        """边读边解压发送zip成员，解压后的长度或CRC不符时关闭连接"""
+        if method == ZIP_DEFLATED:
+            decompressor = zlib.decompressobj(-15)
+        else:
+            decompressor = bz2.BZ2Decompressor()
+        
+        def outputs(data):
+            # 限制每次的输出量，高压缩比的数据不会一次解压出几百MB
+            if method == ZIP_DEFLATED:
+                while data:
+                    yield decompressor.decompress(data, self.DECOMPRESS_OUTPUT_SIZE)
+                    data = decompressor.unconsumed_tail
+            else:
+                yield decompressor.decompress(data, self.DECOMPRESS_OUTPUT_SIZE)
+                while not decompressor.needs_input and not decompressor.eof:
+                    yield decompressor.decompress(b'', self.DECOMPRESS_OUTPUT_SIZE)
+        
+        f.seek(offset)
+        remaining = compressed_size
+        sent = 0
+        checksum = 0
+        while remaining:
+            data = f.read(min(remaining, self.DECOMPRESS_READ_SIZE))
+            if not data:
+                break
+            remaining -= len(data)
+            for chunk in outputs(data):
+                if chunk:
+                    checksum = zlib.crc32(chunk, checksum)
+                    sent += len(chunk)
+                    self.wfile.write(chunk)
+        if method == ZIP_DEFLATED:
+            tail = decompressor.flush()
+            if tail:
+                checksum = zlib.crc32(tail, checksum)
+                sent += len(tail)
+                self.wfile.write(tail)
+        
+        if sent != size or (crc is not None and checksum != crc):
+            # 响应头已经发出，只能断开连接让客户端知道数据不完整
+            self.log_error("压缩包成员解压结果不符: 长度 %d/%d", sent, size)
+            self.close_connection = True
+    
+    @staticmethod
+    def valid_relative_path(name):
+        """检查相对data目录、用 / 分隔的路径，防止路径遍历攻击"""
+        if not name or '..' in name or '\\' in name or (os.name == 'nt' and ':' in name):
+            return False
+        return all(part and part != '.' for part in name.split('/'))
+    
+    def data_file_path(self, filename):
+        """把文件名（可以是子目录中的相对路径）解析为data目录下的路径，返回 (路径, 错误码, 错误信息)"""
+        if not self.valid_relative_path(filename):
+            return None, 400, "无效的文件名"
+        
+        filepath = os.path.join(self.data_dir, *filename.split('/'))
+        
+        if not os.path.isfile(filepath):
+            return None, 404, "文件不存在"
+        return filepath, None, None
+    
+    def resolve_data_file(self, filename):
+        """把URL中的文件名解析为data目录下的路径，失败时发送错误并返回None"""
+        filepath, code, message = self.data_file_path(unquote(filename))
+        if filepath is None:
+            self.send_error(code, message)
+        return filepath
+    
+    def handle_play_file(self, filename, query):
+        """处理播放文件请求
+        
+        可以用 ?encoding=mulaw|alaw|delta-zlib 或Accept头要求压缩后传输，只支持16位PCM。
+        """
         try:
-            # 安全检查，防止路径遍历攻击
-            if '..' in filename or '/' in filename or '\\' in filename:
-                self.send_error(400, "无效的文件名")
+            try:
+                encoding, explicit = negotiate_transport_encoding(query, self.headers.get('Accept'))
+            except ValueError as e:
+                self.send_error(400, str(e))
                 return
+            if ARCHIVE_SEPARATOR in unquote(filename):
+                if explicit and encoding:
+                    self.send_error(415, "压缩包中的文件不支持传输编码")
+                    return
+                self.handle_archive_member(unquote(filename))
+                return
+            filepath = self.resolve_data_file(filename)
+            if filepath is None:
+                return
+            if encoding:
+                if self.send_encoded_file(filepath, encoding, explicit):
+                    return
+            filename = os.path.basename(filepath)
             
-            filepath = os.path.join(self.data_dir, filename)
+            with open(filepath, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                self.begin_transfer(size)
+                try:
+                    # 设置PCM文件的MIME类型
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'application/octet-stream')
+                    self.send_header('Content-Disposition', content_disposition(filename))
+                    self.send_header('Content-Length', str(size))
+                    self.send_header('Vary', 'Accept')
+                    self.send_header('Access-Control-Allow-Origin', '*')
+                    self.end_headers()
+                    
+                    # 由内核直接从文件拷贝到socket，不把整个文件读进内存
+                    self.send_file_range(f, 0, size)
+                finally:
+                    self.end_transfer()
+                
+        except Exception as e:
+            self.send_error(500, f"读取文件失败: {str(e)}")
+    
+    def send_encoded_file(self, filepath, encoding, explicit):
+        """发送编码后的文件；格式不支持时，明确要求的编码返回415，协商来的编码返回False改发原始数据"""
+        try:
+            audio_format = get_audio_format(filepath)
+        except ValueError as e:
+            audio_format = None
+            reason = str(e)
+        else:
+            reason = "传输编码只支持16位PCM"
+        if audio_format is None or audio_format['sample_width'] != 2:
+            if explicit:
+                self.send_error(415, reason)
+                return True
+            return False
+        
+        # 编码结果按内容存放，内容相同的文件共用；同样的字节按WAV或裸PCM解释时结果不同
+        container = 'wav' if filepath.lower().endswith('.wav') else 'pcm'
+        artifact = f'{container}.{encoding}'
+        store = ArtifactStore.for_root(self.data_dir)
+        with open(filepath, 'rb') as source:
+            st = os.fstat(source.fileno())
+            # 哈希已知时直接找结果；未知时编码的同时算哈希，不为查找结果先把整个文件读一遍
+            digest = ContentHasher.for_root(self.data_dir).cached(st)
+            encoded_path = store.lookup(digest, artifact) if digest else None
+            if encoded_path is None:
+                # 第一个请求边编码边发送；同时到达的相同请求等它编码完成后发送结果文件
+                streamed = []
+                
+                def create():
+                    streamed.append(True)
+                    return self.stream_encoding(source, st, filepath, audio_format, encoding, artifact)
+                
+                key = ('encode', st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, artifact)
+                encoded_path = computations.do(key, create)
+                if streamed:
+                    return True
+        
+        with open(encoded_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            self.begin_transfer(size)
+            try:
+                self.send_response(200)
+                self.send_encoding_headers(filepath, audio_format, encoding, size)
+                self.send_file_range(f, 0, size)
+            finally:
+                self.end_transfer()
+        return True
+    
+    def send_encoding_headers(self, filepath, audio_format, encoding, length):
+        """发送编码结果的响应头并结束头部；length为None时使用分块传输编码（HTTP/1.0客户端以关闭连接表示结束）"""
+        name = os.path.splitext(os.path.basename(filepath))[0]
+        container = 'wav' if filepath.lower().endswith('.wav') else 'pcm'
+        self.send_header('Content-Type', TRANSPORT_ENCODINGS[encoding])
+        self.send_header('Content-Disposition', content_disposition(f'{name}.{encoding}'))
+        if length is not None:
+            self.send_header('Content-Length', str(length))
+        elif self.request_version == 'HTTP/1.1':
+            self.send_header('Transfer-Encoding', 'chunked')
+        else:
+            self.close_connection = True
+        self.send_header('Vary', 'Accept')
+        # 客户端解码需要的信息；解码结果是小端序16位PCM，容器是wav时客户端自己补WAV头
+        self.send_header('X-PCM-Encoding', encoding)
+        self.send_header('X-PCM-Sample-Rate', str(audio_format['sample_rate']))
+        self.send_header('X-PCM-Channels', str(audio_format['channels']))
+        self.send_header('X-PCM-Length', str(audio_format['data_size']))
+        self.send_header('X-PCM-Container', container)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Expose-Headers',
+                         'X-PCM-Encoding, X-PCM-Sample-Rate, X-PCM-Channels, X-PCM-Length, X-PCM-Container')
+        self.end_headers()
+    
+    def stream_encoding(self, source, st, filepath, audio_format, encoding, artifact):
+        """边编码边发送，同时写入临时文件，编码完成后存入ArtifactStore，返回结果路径
+        
+        首字节不必等整个文件编码完。客户端中途断开时停止发送但继续编码，结果照样保存。
+        """
+        started = time.monotonic()
+        # G.711每个样本一个字节，长度事先知道；delta-zlib压缩后的长度要编码完才知道
+        length = None if encoding == 'delta-zlib' else audio_format['data_size'] // 2
+        chunked = length is None and self.request_version == 'HTTP/1.1'
+        store = ArtifactStore.for_root(self.data_dir)
+        sha = hashlib.sha256()
+        self.begin_transfer(audio_format['data_size'] if length is None else length)
+        try:
+            fd, temp_path = store.create_temp()
+            try:
+                sending = True
+                with os.fdopen(fd, 'wb') as out:
+                    self.send_response(200)
+                    self.send_encoding_headers(filepath, audio_format, encoding, length)
+                    for data in iter_transport(source, audio_format, encoding, sha):
+                        out.write(data)
+                        if not (sending and data):
+                            continue
+                        try:
+                            if chunked:
+                                self.write_vectored([f'{len(data):X}\r\n'.encode('ascii'), data, b'\r\n'])
+                            else:
+                                self.wfile.write(data)
+                        except OSError:
+                            # 客户端已经断开，之后的错误也不能再回应
+                            sending = False
+                            self.close_connection = True
+                    size = out.tell()
+                if sending and chunked:
+                    try:
+                        self.wfile.write(b'0\r\n\r\n')
+                    except OSError:
+                        self.close_connection = True
+                elif length is not None and size != length:
+                    # 编码期间文件变短，响应体不足Content-Length
+                    self.close_connection = True
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        finally:
+            self.end_transfer()
+        ContentHasher.for_root(self.data_dir).remember(filepath, sha.hexdigest(), st)
+        print(f"已编码 {os.path.basename(filepath)} -> {encoding}: {audio_format['data_size']} -> "
+              f"{size} 字节，耗时{time.monotonic() - started:.2f}秒")
+        return store.commit(temp_path, sha.hexdigest(), artifact)
+    
+    def handle_clip(self, filename, query):
+        """处理片段提取请求：/api/clip/<name>?start=<秒>&end=<秒>&format=pcm|wav"""
+        try:
+            filepath = self.resolve_data_file(filename)
+            if filepath is None:
+                return
             
-            if not os.path.exists(filepath):
-                self.send_error(404, "文件不存在")
+            try:
+                start = float(query.get('start', ['0'])[0])
+                end = float(query['end'][0]) if 'end' in query else None
+                if not math.isfinite(start) or (end is not None and not math.isfinite(end)):
+                    raise ValueError
+            except ValueError:
+                self.send_error(400, "无效的时间参数")
+                return
+            out_format = query.get('format', ['pcm'])[0].lower()
+            if out_format not in ('pcm', 'wav'):
+                self.send_error(400, "format只支持pcm或wav")
                 return
             
-            # 设置PCM文件的MIME类型
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/octet-stream')
-            self.send_header('Content-Disposition', f'inline; filename="{filename}"')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
+            try:
+                audio_format = get_audio_format(filepath)
+            except ValueError as e:
+                self.send_error(415, str(e))
+                return
+            
+            # 把时间换算成按帧对齐的字节偏移
+            offset, length = self.clip_byte_range(audio_format, start, end)
+            if length is None:
+                self.send_error(416, "时间范围无效")
+                return
+            
+            header = b''
+            if out_format == 'wav':
+                header = make_wav_header(length, audio_format['sample_rate'],
+                                         audio_format['channels'], audio_format['sample_width'])
+            
+            name = os.path.splitext(os.path.basename(filepath))[0]
+            self.begin_transfer(len(header) + length)
+            try:
+                self.send_clip(filepath, name, out_format, header, offset, length)
+            finally:
+                self.end_transfer()
+                
+        except Exception as e:
+            self.send_error(500, f"提取片段失败: {str(e)}")
+    
+    def send_clip(self, filepath, name, out_format, header, offset, length):
+        """发送片段的响应头和数据"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'audio/wav' if out_format == 'wav' else 'application/octet-stream')
+        self.send_header('Content-Disposition', content_disposition(f'{name}_clip.{out_format}'))
+        self.send_header('Content-Length', str(len(header) + length))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        
+        if header:
+            self.wfile.write(header)
+        # 只发送这一段字节，由内核直接从文件拷贝到socket
+        with open(filepath, 'rb') as f:
+            self.send_file_range(f, offset, length)
+    
+    # 跟随模式：默认/最长空闲超时（秒），以及轮询间隔的上下限（秒）
+    FOLLOW_IDLE_TIMEOUT = 10
+    FOLLOW_MAX_IDLE_TIMEOUT = 300
+    FOLLOW_MIN_POLL = 0.01
+    FOLLOW_MAX_POLL = 0.25
+    
+    def handle_follow(self, filename, query):
+        """处理跟随请求：/api/follow/<name>?start=<秒>&idle=<秒>
+        
+        类似 tail -f：先发送从start开始的已有数据，之后文件每追加一段就发送一段，
+        文件超过idle秒没有增长（或被截断、删除）时结束。
+        响应使用分块传输编码，只发送完整的采样帧；音频格式放在 X-PCM-* 响应头中。
+        没有新数据时轮询间隔逐步加倍，有数据后立即恢复到最短间隔。
+        """
+        try:
+            filepath = self.resolve_data_file(filename)
+            if filepath is None:
+                return
+            try:
+                start = float(query.get('start', ['0'])[0])
+                idle = float(query.get('idle', [str(self.FOLLOW_IDLE_TIMEOUT)])[0])
+                if not (math.isfinite(start) and math.isfinite(idle)):
+                    raise ValueError("start和idle必须是有限的数值")
+                audio_format = get_audio_format(filepath)
+            except ValueError as e:
+                self.send_error(400, f"无效的参数: {e}")
+                return
+            idle = min(max(idle, 0), self.FOLLOW_MAX_IDLE_TIMEOUT)
+            frame_size = audio_format['channels'] * audio_format['sample_width']
+            offset = audio_format['data_offset'] + max(0, int(start * audio_format['sample_rate'])) * frame_size
             
-            # 读取并发送文件内容
             with open(filepath, 'rb') as f:
-                self.wfile.write(f.read())
+                # HTTP/1.0客户端不支持分块编码，直接发送原始数据，以关闭连接表示结束
+                chunked = self.request_version == 'HTTP/1.1'
+                if not chunked:
+                    self.close_connection = True
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/octet-stream')
+                if chunked:
+                    self.send_header('Transfer-Encoding', 'chunked')
+                self.send_header('Cache-Control', 'no-store')
+                self.send_header('X-PCM-Sample-Rate', str(audio_format['sample_rate']))
+                self.send_header('X-PCM-Channels', str(audio_format['channels']))
+                self.send_header('X-PCM-Sample-Width', str(audio_format['sample_width']))
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.end_headers()
                 
+                self.follow_file(f, filepath, offset, frame_size, idle, chunked)
+                if chunked:
+                    self.wfile.write(b'0\r\n\r\n')
+                    
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端已经断开
+            self.close_connection = True
         except Exception as e:
-            self.send_error(500, f"读取文件失败: {str(e)}")
+            self.send_error(500, f"跟随文件失败: {str(e)}")
+    
+    def follow_file(self, f, filepath, offset, frame_size, idle, chunked):
+        """从offset开始持续发送文件新增的完整帧，直到空闲超时"""
+        poll = self.FOLLOW_MIN_POLL
+        last_growth = time.monotonic()
+        last_size = 0
+        while True:
+            size = os.fstat(f.fileno()).st_size
+            if size < last_size:
+                break  # 文件被截断
+            last_size = size
+            # start超出当前文件末尾时length为负，等文件增长到offset再发送
+            length = (size - offset) // frame_size * frame_size
+            if length > 0:
+                if chunked:
+                    self.write_vectored([f'{length:X}\r\n'.encode('ascii')])
+                if self.connection.sendfile(f, offset, length) < length:
+                    # 文件在发送中被截断，已声明的分块无法补齐，只能断开连接
+                    raise ConnectionResetError
+                if chunked:
+                    self.write_vectored([b'\r\n'])
+                offset += length
+                last_growth = time.monotonic()
+                poll = self.FOLLOW_MIN_POLL
+                continue
+            
+            if time.monotonic() - last_growth >= idle:
+                break
+            if getattr(self.server, 'draining', False):
+                break  # 工作进程正在退出
+            if not os.path.exists(filepath):
+                break  # 文件已被删除
+            if self.client_disconnected(poll):
+                raise ConnectionResetError
+            poll = min(poll * 2, self.FOLLOW_MAX_POLL)
+    
+    def client_disconnected(self, timeout):
+        """等待timeout秒，期间客户端关闭连接则返回True"""
+        readable, _, _ = select.select([self.connection], [], [], timeout)
+        if not readable:
+            return False
+        try:
+            if self.connection.recv(1, socket.MSG_PEEK) == b'':
+                return True
+        except OSError:
+            return True
+        # 客户端发来了下一个请求，留到本次响应结束后再处理
+        time.sleep(timeout)
+        return False
+    
+    def handle_live_list(self):
+        """处理实时音频源列表请求"""
+        self.send_json([source.get_stats() for source in self.live_sources.values()])
+    
+    def handle_live(self, name, query):
+        """处理收听请求：/api/live/<name>?back=<秒>
+        
+        从最新位置（或往前back秒）开始，以分块传输编码持续发送实时音频，
+        音频源结束时发送结束块。收听者跟不上时跳到最新位置，
+        单次发送阻塞超过LIVE_SEND_TIMEOUT秒则断开。
+        """
+        source = self.live_sources.get(name)
+        if source is None:
+            self.send_error(404, "实时音频源不存在")
+            return
+        try:
+            back = float(query.get('back', ['0'])[0])
+        except ValueError:
+            self.send_error(400, "无效的时间参数")
+            return
+        
+        chunked = self.request_version == 'HTTP/1.1'
+        if not chunked:
+            self.close_connection = True
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('Cache-Control', 'no-store')
+        self.send_header('X-PCM-Sample-Rate', str(source.sample_rate))
+        self.send_header('X-PCM-Channels', str(source.channels))
+        self.send_header('X-PCM-Sample-Width', str(source.sample_width))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        
+        cursor = source.open_cursor(max(0.0, back))
+        dropped = False
+        self.connection.settimeout(self.LIVE_SEND_TIMEOUT)
+        try:
+            while True:
+                cursor, chunks = source.read(cursor, 1.0)
+                if chunks is None:
+                    if chunked:
+                        self.wfile.write(b'0\r\n\r\n')
+                    break
+                if chunks:
+                    length = sum(len(chunk) for chunk in chunks)
+                    if chunked:
+                        chunks = [f'{length:X}\r\n'.encode('ascii')] + chunks + [b'\r\n']
+                    self.write_vectored(chunks)
+                elif getattr(self.server, 'draining', False) or self.client_disconnected(0):
+                    self.close_connection = True
+                    break
+        except socket.timeout:
+            # 收听者太慢，不能让它拖住发送线程
+            dropped = True
+            self.close_connection = True
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        finally:
+            source.close_cursor(dropped)
+            self.connection.settimeout(self.timeout)
+    
+    # 上传时每次从socket读取并写入磁盘的字节数
+    UPLOAD_CHUNK_SIZE = 1024 * 1024
+    # 接收过程中每写入这么多字节检查一次剩余空间，剩余不足这么多时放弃上传
+    UPLOAD_SPACE_CHECK = 64 * 1024 * 1024
+    # 上传的WAV文件头攒到这么多字节仍不能解析时，按无效的WAV处理
+    UPLOAD_WAV_HEADER_LIMIT = 1024 * 1024
+    
+    def handle_upload(self, name, query):
+        """处理上传请求：PUT/POST /api/upload/<name>?overwrite=1&sha256=<十六进制>
+        
+        请求体按固定大小分块写入data目录中的临时文件，同一遍里计算SHA-256、
+        峰值和均方根，并检查数据长度是否为完整的采样帧。全部通过后原子地重命名到位，
+        校验失败时删除临时文件。请求体可以带Content-Length，也可以用分块传输编码。
+        """
+        # 出错时请求体可能没有读完，不能继续复用这个连接
+        keep_alive = not self.close_connection
+        self.close_connection = True
+        filepath = os.path.join(self.data_dir, name)
+        if not name or '..' in name or '/' in name or '\\' in name or name.startswith('.'):
+            self.send_error(400, "无效的文件名")
+            return
+        overwrite = query.get('overwrite', ['0'])[0] in ('1', 'true')
+        if os.path.exists(filepath) and not overwrite:
+            self.send_error(409, "文件已存在，覆盖请加 overwrite=1")
+            return
+        
+        chunked = 'chunked' in self.headers.get('Transfer-Encoding', '').lower()
+        try:
+            length = None if chunked else int(self.headers['Content-Length'])
+        except (TypeError, ValueError):
+            self.send_error(411, "需要Content-Length或分块传输编码")
+            return
+        os.makedirs(self.data_dir, exist_ok=True)
+        if length is not None and length > shutil.disk_usage(self.data_dir).free:
+            self.send_error(507, "磁盘空间不足")
+            return
+        expected = (query.get('sha256', [None])[0] or self.headers.get('X-Content-SHA256') or '').lower()
+        
+        fd, temp_path = tempfile.mkstemp(prefix='.upload-', dir=self.data_dir)
+        # mkstemp创建的文件只有所有者可读写，改成和普通文件一样的权限
+        os.chmod(temp_path, 0o644)
+        try:
+            # 分块上传的大小未知，按最小的大响应计入调度：占用传输名额，排队时不排在已知大小的传输后面
+            self.begin_transfer(length if length is not None else self.scheduler.LARGE_BODY)
+            try:
+                started = time.monotonic()
+                with os.fdopen(fd, 'wb', buffering=0) as f:
+                    result = self.receive_upload(f, name, length)
+                elapsed = time.monotonic() - started
+            finally:
+                self.end_transfer()
+            if result is None:
+                return
+            if expected and expected != result['sha256']:
+                self.send_error(422, "SHA-256校验不一致")
+                return
+            
+            existed = os.path.exists(filepath)
+            os.replace(temp_path, filepath)
+            temp_path = None
+            DirectoryTree.refresh_dir(self.data_dir, '')
+            # 哈希已经边接收边算出来了，记下来，之后查重和派生结果不必再读一遍
+            ContentHasher.for_root(self.data_dir).remember(filepath, result['sha256'])
+            
+            result.update(name=name, elapsed=round(elapsed, 3),
+                          mb_per_s=round(result['size'] / 1048576 / elapsed, 1) if elapsed else None)
+            response = json.dumps(result, ensure_ascii=False).encode('utf-8')
+            self.close_connection = not keep_alive
+            self.send_response(200 if existed else 201)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(response)))
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            self.wfile.write(response)
+        finally:
+            if temp_path is not None:
+                os.unlink(temp_path)
+    
+    def receive_upload(self, f, name, length):
+        """把请求体写入f并统计，返回结果字典；请求体不完整或格式无效时发送错误并返回None"""
+        digest = hashlib.sha256()
+        buffer = bytearray(self.UPLOAD_CHUNK_SIZE)
+        audio_format = {
+            'sample_rate': PCM_SAMPLE_RATE,
+            'channels': PCM_CHANNELS,
+            'sample_width': PCM_SAMPLE_WIDTH,
+            'data_offset': 0,
+        }
+        stats = None
+        # WAV文件从文件头解析格式；分块上传的第一块可能比文件头还短，先攒起来直到能解析
+        header = bytearray() if name.lower().endswith('.wav') else None
+        header_error = None
+        size = 0
+        next_space_check = self.UPLOAD_SPACE_CHECK
+        for view in self.iter_request_body(buffer, length):
+            if view is None:
+                self.send_error(400, "请求体不完整")
+                return None
+            try:
+                f.write(view)
+            except OSError as e:
+                if e.errno not in (errno.ENOSPC, errno.EDQUOT):
+                    raise
+                self.send_error(507, "磁盘空间不足")
+                return None
+            if size + len(view) >= next_space_check:
+                # 分块上传事先不知道大小，Content-Length也可能和其他写入者同时占用空间，边收边检查
+                next_space_check += self.UPLOAD_SPACE_CHECK
+                if shutil.disk_usage(self.data_dir).free < self.UPLOAD_SPACE_CHECK:
+                    self.send_error(507, "磁盘空间不足")
+                    return None
+            digest.update(view)
+            if stats is not None:
+                stats.update(view)
+            elif header is None:
+                # 其他文件按裸PCM处理
+                stats = PCMStats(audio_format['sample_width'])
+                stats.update(view)
+            else:
+                header += view
+                try:
+                    read_wav_format(io.BytesIO(header), length or len(header), audio_format)
+                except (ValueError, struct.error) as e:
+                    header_error = e
+                    if len(header) >= self.UPLOAD_WAV_HEADER_LIMIT:
+                        self.send_error(415, str(e))
+                        return None
+                else:
+                    stats = PCMStats(audio_format['sample_width'])
+                    stats.update(memoryview(header)[audio_format['data_offset']:])
+                    header = None
+            size += len(view)
+        
+        if stats is None:
+            if header:
+                # 请求体结束时文件头仍不完整
+                self.send_error(415, str(header_error))
+                return None
+            stats = PCMStats(audio_format['sample_width'])
+        frame_size = audio_format['channels'] * audio_format['sample_width']
+        data_size = max(0, size - audio_format['data_offset'])
+        if data_size % frame_size:
+            self.send_error(422, f"数据长度{data_size}字节不是完整的采样帧（每帧{frame_size}字节）")
+            return None
+        
+        result = {
+            'size': size,
+            'sha256': digest.hexdigest(),
+            'sample_rate': audio_format['sample_rate'],
+            'channels': audio_format['channels'],
+            'sample_width': audio_format['sample_width'],
+            'duration': round(data_size / frame_size / audio_format['sample_rate'], 3),
+        }
+        result.update(stats.result())
+        return result
+    
+    def iter_request_body(self, buffer, length):
+        """按块读取请求体，每次产生buffer的一个视图；连接提前断开时产生None
+        
+        length为None时按分块传输编码解析。产生的视图在下一次迭代时会被覆盖。
+        """
+        view = memoryview(buffer)
+        if length is not None:
+            remaining = length
+            while remaining:
+                count = self.rfile.readinto(view[:min(remaining, len(view))])
+                if not count:
+                    yield None
+                    return
+                remaining -= count
+                yield view[:count]
+            return
+        
+        while True:
+            line = self.rfile.readline(1024)
+            try:
+                remaining = int(line.split(b';', 1)[0].strip(), 16)
+            except ValueError:
+                yield None
+                return
+            if remaining == 0:
+                # 跳过尾部字段，直到空行
+                while self.rfile.readline(1024).strip():
+                    pass
+                return
+            while remaining:
+                count = self.rfile.readinto(view[:min(remaining, len(view))])
+                if not count:
+                    yield None
+                    return
+                remaining -= count
+                yield view[:count]
+            self.rfile.readline(1024)
+    
+    # 单次批量请求最多包含的条目数
+    MAX_BATCH_ITEMS = 1000
+    
+    def handle_batch(self):
+        """处理批量请求：POST /api/batch
+
+        请求体为JSON：
+            {"items": [{"name": "a.pcm", "start": 1.5, "end": 3.0,
+                        "data": true, "peaks": 200}, ...]}
+        start/end 省略时取整个文件，data 默认为 true，peaks 为峰值桶数（可选）。
+
+        响应体由若干帧顺序组成，每帧为：
+            4字节大端序头部长度 + UTF-8 JSON头部 + 负载
+        JSON头部包含 index, name, kind ("pcm" / "peaks" / "error"), length 以及
+        sample_rate / channels / sample_width；peaks 负载为小端序 int16 的
+        (最大值, 最小值) 对。
+        """
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length).decode('utf-8'))
+            items = request['items']
+            if not isinstance(items, list):
+                raise ValueError
+        except (ValueError, KeyError, TypeError):
+            self.send_error(400, "无效的批量请求")
+            return
+        if len(items) > self.MAX_BATCH_ITEMS:
+            self.send_error(413, "批量请求条目过多")
+            return
+        
+        # 先确定所有片段，算出总长度后再一次性发送
+        segments = []
+        open_files = {}
+        try:
+            for index, item in enumerate(items):
+                segments.extend(self.batch_item_segments(index, item, open_files))
+            
+            total = sum(len(seg[1]) if seg[0] == 'buf' else seg[3] for seg in segments)
+            self.begin_transfer(total)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-pcm-batch')
+            self.send_header('Content-Length', str(total))
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            self.send_segments(segments)
+        finally:
+            self.end_transfer()
+            for f in open_files.values():
+                f.close()
+    
+    def batch_item_segments(self, index, item, open_files):
+        """生成一个批量条目的输出片段：('buf', bytes) 或 ('file', 文件, 偏移, 长度)"""
+        def frame(header, payload_length):
+            header = dict(header, index=index, length=payload_length)
+            data = json.dumps(header, ensure_ascii=False).encode('utf-8')
+            return ('buf', struct.pack('>I', len(data)) + data)
+        
+        name = item.get('name') if isinstance(item, dict) else None
+        filepath, code, message = self.data_file_path(name if isinstance(name, str) else '')
+        if filepath is None:
+            return [frame({'name': name, 'kind': 'error', 'status': code, 'error': message}, 0)]
+        
+        try:
+            start = float(item.get('start', 0))
+            end = float(item['end']) if item.get('end') is not None else None
+            if not math.isfinite(start) or (end is not None and not math.isfinite(end)):
+                raise ValueError("无效的时间参数")
+            audio_format = get_audio_format(filepath)
+        except (ValueError, TypeError) as e:
+            return [frame({'name': name, 'kind': 'error', 'status': 400, 'error': str(e)}, 0)]
+        offset, length = self.clip_byte_range(audio_format, start, end)
+        if length is None:
+            return [frame({'name': name, 'kind': 'error', 'status': 416, 'error': "时间范围无效"}, 0)]
+        
+        info = {
+            'name': name,
+            'sample_rate': audio_format['sample_rate'],
+            'channels': audio_format['channels'],
+            'sample_width': audio_format['sample_width'],
+        }
+        segments = []
+        if item.get('peaks'):
+            try:
+                peaks = self.cached_peaks(filepath, offset, length, int(item['peaks']),
+                                          audio_format['sample_width'])
+            except ValueError as e:
+                segments.append(frame(dict(info, kind='error', status=415, error=str(e)), 0))
+            else:
+                segments.append(frame(dict(info, kind='peaks'), len(peaks)))
+                segments.append(('buf', peaks))
+        if item.get('data', True):
+            if filepath not in open_files:
+                open_files[filepath] = open(filepath, 'rb')
+            segments.append(frame(dict(info, kind='pcm'), length))
+            segments.append(('file', open_files[filepath], offset, length))
+        return segments
+    
+    def cached_peaks(self, filepath, offset, length, buckets, sample_width):
+        """计算峰值，重复的请求直接用内存中的结果"""
+        if sample_width != 2:
+            raise ValueError("峰值只支持16位PCM")
+        return peaks_cache.get(filepath, offset, length, buckets, sample_width)
+    
+    def send_segments(self, segments):
+        """发送片段列表：相邻的内存片段合并为一次分散写，文件片段用sendfile"""
+        pending = []
+        for segment in segments:
+            if segment[0] == 'buf':
+                pending.append(segment[1])
+                continue
+            self.write_vectored(pending)
+            pending = []
+            _, f, offset, length = segment
+            self.send_file_range(f, offset, length)
+        self.write_vectored(pending)
+    
+    def write_vectored(self, buffers):
+        """用一次sendmsg发送多个缓冲区，不先拼接成一个大缓冲区"""
+        views = [memoryview(b) for b in buffers if len(b)]
+        if not hasattr(self.connection, 'sendmsg'):
+            # Windows没有sendmsg，逐个发送
+            for view in views:
+                self.connection.sendall(view)
+            return
+        while views:
+            sent = self.connection.sendmsg(views[:1024])
+            while sent and views:
+                if sent >= len(views[0]):
+                    sent -= len(views[0])
+                    views.pop(0)
+                else:
+                    views[0] = views[0][sent:]
+                    sent = 0
+    
+    @staticmethod
+    def clip_byte_range(audio_format, start, end):
+        """把[start, end)秒换算成文件中的(偏移, 长度)，范围无效时长度为None"""
+        frame_size = audio_format['channels'] * audio_format['sample_width']
+        total_frames = audio_format['data_size'] // frame_size
+        sample_rate = audio_format['sample_rate']
+        if not math.isfinite(start) or (end is not None and not math.isfinite(end)):
+            return 0, None
+        
+        first = max(0, int(round(start * sample_rate)))
+        last = total_frames if end is None else min(total_frames, int(round(end * sample_rate)))
+        if start < 0 or first > total_frames or last < first:
+            return 0, None
+        return audio_format['data_offset'] + first * frame_size, (last - first) * frame_size
     
     def log_message(self, format, *args):
         """自定义日志格式"""
         timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
-        print(f"[{timestamp}] {format % args}")
+        if getattr(self.server, 'worker_mode', False):
+            print(f"[{timestamp}] [工作进程 {os.getpid()}] {format % args}")
+        else:
+            print(f"[{timestamp}] {format % args}")
+
+DEFAULT_PORT = 8000
 
-def find_free_port(start_port=8000, max_port=8100):
-    """查找可用端口"""
-    import socket
-    for port in range(start_port, max_port):
+
+def create_listen_socket(port=None, unix_path=None, listen_fd=None):
+    """创建监听套接字，绑定后直接交给服务器使用，不再先探测再重新绑定
+    
+    - listen_fd: 启动器已经绑定好的套接字文件描述符
+    - unix_path: Unix域套接字路径，供同一台机器上的前端和工具使用
+    - port: TCP端口，0表示由系统分配；不指定时优先使用8000，被占用则由系统分配
+    """
+    if listen_fd is not None:
+        sock = socket.socket(fileno=listen_fd)
+        sock.listen(128)
+        return sock
+    
+    if unix_path is not None:
+        if not hasattr(socket, 'AF_UNIX'):
+            raise OSError("当前系统不支持Unix域套接字")
+        if os.path.exists(unix_path) and stat.S_ISSOCK(os.stat(unix_path).st_mode):
+            # 清理上次没有正常退出时留下的套接字文件
+            os.unlink(unix_path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(unix_path)
+        sock.listen(128)
+        return sock
+    
+    if port is None:
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.bind(('localhost', port))
-                return port
+            return socket.create_server(('localhost', DEFAULT_PORT), backlog=128)
         except OSError:
-            continue
-    return None
+            port = 0
+    return socket.create_server(('localhost', port), backlog=128)
+
+
+def listen_address(sock):
+    """返回监听套接字的访问地址"""
+    if sock.family in (socket.AF_INET, socket.AF_INET6):
+        return f"http://localhost:{sock.getsockname()[1]}"
+    return f"unix:{sock.getsockname()}"
+
+
+def serve_on_socket(sock, handler_class):
+    """在已经绑定好的监听套接字上创建服务器（TCP或Unix域套接字）"""
+    server = PCMHTTPServer(('localhost', 0), handler_class, bind_and_activate=False)
+    server.socket.close()
+    server.socket = sock
+    server.address_family = sock.family
+    server.server_address = sock.getsockname()
+    if sock.family in (socket.AF_INET, socket.AF_INET6):
+        server.server_name, server.server_port = sock.getsockname()[:2]
+    else:
+        server.server_name, server.server_port = 'localhost', 0
+    return server
+
+class PCMHTTPServer(ThreadingHTTPServer):
+    """多线程HTTP服务器，记录进行中的请求数，支持平滑退出"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.draining = False
+        self.worker_mode = False
+        self.active_requests = 0
+        self.requests_lock = threading.Condition()
+    
+    def request_started(self):
+        with self.requests_lock:
+            self.active_requests += 1
+    
+    def request_finished(self):
+        with self.requests_lock:
+            self.active_requests -= 1
+            self.requests_lock.notify_all()
+    
+    def drain(self, timeout):
+        """停止接受新连接，等待进行中的请求完成；返回是否全部完成"""
+        self.draining = True
+        self.shutdown()
+        deadline = time.monotonic() + timeout
+        with self.requests_lock:
+            while self.active_requests > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.requests_lock.wait(remaining)
+        return True
+
+
+def run_worker(listen_fd):
+    """工作进程：在父进程传入的监听套接字上接受连接
+    
+    多个工作进程共享同一个监听套接字，由内核把新连接分给其中一个进程。
+    套接字设为非阻塞，没抢到连接的进程accept时直接返回，不会卡住。
+    收到SIGTERM或父进程退出后停止接受新连接，等进行中的请求完成再退出。
+    """
+    sock = socket.socket(fileno=listen_fd)
+    sock.setblocking(False)
+    
+    server = serve_on_socket(sock, PCMPlayerHandler)
+    server.worker_mode = True
+    
+    stop_event = threading.Event()
+    # Ctrl+C会发给整个进程组，由父进程统一处理
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+    
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    
+    parent_pid = os.getppid()
+    while not stop_event.wait(1.0):
+        if os.getppid() != parent_pid:
+            # 父进程已经不在了，不能留下无人管理的工作进程
+            break
+    
+    if not server.drain(WorkerSupervisor.GRACEFUL_TIMEOUT):
+        print(f"[工作进程 {os.getpid()}] 等待请求完成超时，强制退出")
+    sock.close()
+
+
+class WorkerSupervisor:
+    """预先启动多个工作进程共享一个监听套接字，并负责监控和重启
+    
+    - 工作进程异常退出时自动重启；短时间内反复崩溃则逐步拉长重启间隔
+    - 收到SIGHUP时平滑重启：先启动新的工作进程，再让旧进程处理完当前请求后退出。
+      新进程重新加载脚本，修改代码后无需中断服务
+    - 收到SIGTERM或Ctrl+C时通知所有工作进程平滑退出
+    """
+    
+    GRACEFUL_TIMEOUT = 10   # 工作进程等待进行中请求完成的最长时间（秒）
+    MIN_UPTIME = 2.0        # 运行不到这么久就退出视为启动即崩溃
+    MAX_BACKOFF = 30.0      # 崩溃重启的最长间隔（秒）
+    
+    def __init__(self, listen_sock, count, worker_args=()):
+        self.listen_sock = listen_sock
+        self.count = count
+        self.worker_args = list(worker_args)
+        self.workers = {}     # pid -> (Popen, 启动时间)
+        self.retiring = {}    # 平滑重启中等待退出的旧进程 pid -> Popen
+        self.backoff = 0.0
+        self.restart_at = 0.0
+        self.reload_requested = False
+        self.stop_requested = False
+    
+    def spawn(self):
+        """启动一个工作进程，监听套接字通过文件描述符继承"""
+        fd = self.listen_sock.fileno()
+        proc = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--worker-fd', str(fd)] + self.worker_args,
+            pass_fds=(fd,))
+        self.workers[proc.pid] = (proc, time.monotonic())
+        return proc
+    
+    def run(self):
+        """启动工作进程并进入监控循环，直到收到停止信号"""
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_reload)
+        
+        for _ in range(self.count):
+            self.spawn()
+        print(f"已启动 {self.count} 个工作进程: {', '.join(str(pid) for pid in self.workers)}")
+        print(f"平滑重启: kill -HUP {os.getpid()}")
+        
+        while not self.stop_requested:
+            if self.reload_requested:
+                self.reload_requested = False
+                self.reload()
+            self.reap()
+            time.sleep(0.2)
+        
+        self.stop()
+    
+    def _on_stop(self, signum, frame):
+        self.stop_requested = True
+    
+    def _on_reload(self, signum, frame):
+        self.reload_requested = True
+    
+    def reap(self):
+        """回收已退出的进程，补齐异常退出的工作进程"""
+        for pid, proc in list(self.retiring.items()):
+            if proc.poll() is not None:
+                del self.retiring[pid]
+        
+        now = time.monotonic()
+        for pid, (proc, started) in list(self.workers.items()):
+            code = proc.poll()
+            if code is None:
+                continue
+            del self.workers[pid]
+            print(f"工作进程 {pid} 异常退出 (返回码 {code})")
+            if now - started < self.MIN_UPTIME:
+                self.backoff = min(self.MAX_BACKOFF, max(1.0, self.backoff * 2))
+            else:
+                self.backoff = 0.0
+            self.restart_at = now + self.backoff
+        
+        if len(self.workers) < self.count and now >= self.restart_at:
+            while len(self.workers) < self.count:
+                proc = self.spawn()
+                print(f"已重启工作进程 {proc.pid}")
+            if self.backoff:
+                print(f"工作进程反复崩溃，下次重启前等待 {self.backoff:.0f} 秒")
+    
+    def reload(self):
+        """平滑重启：新进程先接管监听套接字，旧进程处理完当前请求后退出"""
+        old = {pid: proc for pid, (proc, _) in self.workers.items()}
+        self.workers = {}
+        self.backoff = 0.0
+        for _ in range(self.count):
+            self.spawn()
+        for proc in old.values():
+            proc.terminate()
+        self.retiring.update(old)
+        print(f"平滑重启: 新工作进程 {', '.join(str(pid) for pid in self.workers)}，"
+              f"旧工作进程 {', '.join(str(pid) for pid in old)} 处理完当前请求后退出")
+    
+    def stop(self):
+        """通知所有工作进程平滑退出，超时未退出的强制结束"""
+        procs = [proc for proc, _ in self.workers.values()] + list(self.retiring.values())
+        for proc in procs:
+            if proc.poll() is None:
+                proc.terminate()
+        deadline = time.monotonic() + self.GRACEFUL_TIMEOUT + 2
+        for proc in procs:
+            try:
+                proc.wait(max(0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+        self.workers.clear()
+        self.retiring.clear()
+
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="简单PCM播放器服务器")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="工作进程数，大于1时预先启动多个进程共享监听端口（仅Linux/macOS）")
+    parser.add_argument('--port', type=int,
+                        help=f"监听端口，0表示由系统分配（默认优先使用{DEFAULT_PORT}）")
+    parser.add_argument('--unix', metavar='PATH',
+                        help="改为监听Unix域套接字，供本机前端和工具使用")
+    parser.add_argument('--listen-fd', type=int, metavar='FD',
+                        help="使用启动器已经绑定好的监听套接字文件描述符")
+    parser.add_argument('--no-browser', action='store_true',
+                        help="启动后不自动打开浏览器")
+    parser.add_argument('--max-streams', type=int, default=4,
+                        help="每个进程同时进行的大文件传输数，超出的排队（默认4）")
+    parser.add_argument('--client-rate', type=float, default=0,
+                        help="每个客户端大文件传输的限速，单位MB/s，0表示不限速")
+    parser.add_argument('--live', action='append', default=[], metavar='NAME=SOURCE',
+                        help="添加实时音频源，SOURCE为 -（标准输入）、FIFO路径或 tcp:主机:端口，"
+                             "通过 /api/live/NAME 收听，可重复指定")
+    parser.add_argument('--live-buffer', type=float, default=30,
+                        help="实时音频源的缓冲时长，单位秒（默认30）")
+    # 内部参数：由主进程启动工作进程时传入继承的监听套接字
+    parser.add_argument('--worker-fd', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    PCMPlayerHandler.scheduler = TransferScheduler(
+        max(1, args.max_streams), int(args.client_rate * 1024 * 1024))
+    
+    if args.worker_fd is not None:
+        run_worker(args.worker_fd)
+        return
+    
+    workers = max(1, args.workers)
+    if workers > 1 and os.name != 'posix':
+        print("提示: 多进程模式仅支持Linux/macOS，已改为单进程运行")
+        workers = 1
+    if workers > 1 and args.live:
+        print("提示: 实时音频源只能在单进程模式下使用，已改为单进程运行")
+        workers = 1
+    
+    for spec in args.live:
+        name, sep, source = spec.partition('=')
+        if not sep or not name or not source:
+            parser.error(f"--live 参数格式应为 NAME=SOURCE: {spec}")
+        PCMPlayerHandler.live_sources[name] = LiveSource(name, source, args.live_buffer)
+    
     print("=" * 50)
     print("简单PCM播放器服务器")
     print("=" * 50)
     
-    # 查找可用端口
-    port = find_free_port()
-    if port is None:
-        print("错误: 无法找到可用端口")
-        input("按回车键退出...")
-        return
-    
     # 创建data目录
     data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
     if not os.path.exists(data_dir):
@@ -138,27 +3174,45 @@ def main():
     
     # 启动服务器
     try:
-        server = HTTPServer(('localhost', port), PCMPlayerHandler)
+        listen_sock = create_listen_socket(args.port, args.unix, args.listen_fd)
+        address = listen_address(listen_sock)
+        if workers > 1:
+            supervisor = WorkerSupervisor(listen_sock, workers, [
+                '--max-streams', str(args.max_streams), '--client-rate', str(args.client_rate)])
+        else:
+            server = serve_on_socket(listen_sock, PCMPlayerHandler)
         print(f"服务器启动成功!")
-        print(f"访问地址: http://localhost:{port}")
+        # 启动器（使用端口0时）从这一行读取实际监听的地址
+        print(f"访问地址: {address}", flush=True)
         print(f"PCM文件目录: {data_dir}")
+        for source in PCMPlayerHandler.live_sources.values():
+            source.start()
+            print(f"实时音频源: {address}/api/live/{quote(source.name)} <- {source.source}")
         print("\n按 Ctrl+C 停止服务器")
         
         # 自动打开浏览器
-        try:
-            webbrowser.open(f'http://localhost:{port}')
-            print("已自动打开浏览器")
-        except:
-            print("无法自动打开浏览器，请手动访问上述地址")
+        if not args.no_browser and address.startswith('http'):
+            try:
+                webbrowser.open(address)
+                print("已自动打开浏览器")
+            except:
+                print("无法自动打开浏览器，请手动访问上述地址")
         
         print("\n" + "=" * 50)
-        server.serve_forever()
+        if workers > 1:
+            supervisor.run()
+            print("\n\n服务器已停止")
+        else:
+            server.serve_forever()
         
     except KeyboardInterrupt:
         print("\n\n服务器已停止")
     except Exception as e:
         print(f"服务器启动失败: {e}")
         input("按回车键退出...")
+    finally:
+        if args.unix and args.listen_fd is None and os.path.exists(args.unix):
+            os.unlink(args.unix)
 
 if __name__ == '__main__':
     main()
@@ -10,12 +10,14 @@ import sys
 import webbrowser
 import threading
 import time
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
 from urllib.parse import urlparse
 import json
 import socket
 
-class TestPCMPlayerHandler(SimpleHTTPRequestHandler):
+from http_keepalive import KeepAliveMixin, content_disposition
+
+class TestPCMPlayerHandler(KeepAliveMixin, SimpleHTTPRequestHandler):
     def __init__(self, *args, **kwargs):
         self.base_dir = os.path.dirname(os.path.abspath(__file__))
         self.data_dir = os.path.join(self.base_dir, 'data')
@@ -268,10 +270,12 @@ class TestPCMPlayerHandler(SimpleHTTPRequestHandler):
 </body>
 </html>'''
         
+        body = html_content.encode('utf-8')
         self.send_response(200)
         self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
         self.end_headers()
-        self.wfile.write(html_content.encode('utf-8'))
+        self.wfile.write(body)
     
     def serve_static_file(self, path):
         self.send_error(404, "文件未找到")
@@ -295,13 +299,15 @@ class TestPCMPlayerHandler(SimpleHTTPRequestHandler):
             
             files.sort(key=lambda x: x['mtime'], reverse=True)
             
+            response = json.dumps(files, ensure_ascii=False).encode('utf-8')
+            
             self.send_response(200)
             self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(response)))
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
             
-            response = json.dumps(files, ensure_ascii=False)
-            self.wfile.write(response.encode('utf-8'))
+            self.wfile.write(response)
             
         except Exception as e:
             self.send_error(500, f"获取文件列表失败: {str(e)}")
@@ -318,14 +324,15 @@ class TestPCMPlayerHandler(SimpleHTTPRequestHandler):
                 self.send_error(404, "文件不存在")
                 return
             
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/octet-stream')
-            self.send_header('Content-Disposition', f'inline; filename="{filename}"')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            
             with open(filepath, 'rb') as f:
-                self.wfile.write(f.read())
+                size = os.fstat(f.fileno()).st_size
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/octet-stream')
+                self.send_header('Content-Disposition', content_disposition(filename))
+                self.send_header('Content-Length', str(size))
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.end_headers()
+                self.send_file_body(f, 0, size)
                 
         except Exception as e:
             self.send_error(500, f"读取文件失败: {str(e)}")
@@ -358,7 +365,7 @@ def main():
         print("请将PCM文件放入data目录中")
     
     try:
-        server = HTTPServer(('localhost', port), TestPCMPlayerHandler)
+        server = ThreadingHTTPServer(('localhost', port), TestPCMPlayerHandler)
         print(f"服务器启动成功!")
         print(f"访问地址: http://localhost:{port}")
         print(f"PCM文件目录: {data_dir}")
@@ -1,4 +1,4 @@
-// 通用工具集合：提供时间格式化、WAV 头生成、网格绘制、文件名推断与端序检测
+// 通用工具集合：提供时间格式化、WAV 头生成、网格绘制、文件名推断、端序检测与传输编码解码
 (function () {
     const Utils = {
         // 将秒格式化为 00:00 或 00:00:00
@@ -113,6 +113,88 @@
             const u8 = new Uint8Array(buf);
             u32[0] = 0x01020304;
             return u8[0] === 0x04 ? 'little' : 'big';
+        },
+
+        // G.711 解码表：字节 -> 16位样本（与服务器端的编码表对应）
+        _g711Tables: {},
+        g711Table(encoding) {
+            if (this._g711Tables[encoding]) return this._g711Tables[encoding];
+            const table = new Int16Array(256);
+            for (let i = 0; i < 256; i++) {
+                if (encoding === 'mulaw') {
+                    const u = ~i & 0xFF;
+                    let t = ((u & 0x0F) << 3) + 0x84;
+                    t <<= (u & 0x70) >> 4;
+                    table[i] = (u & 0x80) ? 0x84 - t : t - 0x84;
+                } else {
+                    const a = i ^ 0x55;
+                    const seg = (a & 0x70) >> 4;
+                    let t = (a & 0x0F) << 4;
+                    if (seg === 0) t += 8;
+                    else if (seg === 1) t += 0x108;
+                    else t = (t + 0x108) << (seg - 1);
+                    table[i] = (a & 0x80) ? t : -t;
+                }
+            }
+            this._g711Tables[encoding] = table;
+            return table;
+        },
+
+        // 解码 /api/play 的传输编码（mulaw/alaw/delta-zlib），返回与原始文件等价的 ArrayBuffer：
+        // 裸 PCM 为小端序16位数据，WAV 则补上44字节的文件头
+        async decodeTransport(arrayBuffer, headers) {
+            const encoding = headers.get('X-PCM-Encoding');
+            if (!encoding) return arrayBuffer;
+            const channels = parseInt(headers.get('X-PCM-Channels'), 10) || 1;
+            const sampleRate = parseInt(headers.get('X-PCM-Sample-Rate'), 10) || 16000;
+            const length = parseInt(headers.get('X-PCM-Length'), 10);
+            const pcm = new ArrayBuffer(length);
+            const view = new DataView(pcm);
+
+            if (encoding === 'mulaw' || encoding === 'alaw') {
+                const table = this.g711Table(encoding);
+                const src = new Uint8Array(arrayBuffer);
+                const count = Math.min(src.length, Math.floor(length / 2));
+                for (let i = 0; i < count; i++) view.setInt16(i * 2, table[src[i]], true);
+            } else if (encoding === 'delta-zlib') {
+                // 按块存放：每块先是全部差分的高字节，再是低字节；最后是不足一个样本的原始字节
+                const stream = new Blob([arrayBuffer]).stream().pipeThrough(new DecompressionStream('deflate'));
+                const raw = new Uint8Array(await new Response(stream).arrayBuffer());
+                const total = Math.floor(length / 2);
+                const previous = new Uint16Array(channels);
+                let pos = 0;
+                for (let start = 0; start < total; start += 65536) {
+                    const count = Math.min(65536, total - start);
+                    for (let k = 0; k < count; k++) {
+                        const i = start + k;
+                        const c = i % channels;
+                        const value = (previous[c] + ((raw[pos + k] << 8) | raw[pos + count + k])) & 0xFFFF;
+                        previous[c] = value;
+                        view.setUint16(i * 2, value, true);
+                    }
+                    pos += count * 2;
+                }
+                if (length % 2) view.setUint8(length - 1, raw[pos]);
+            } else {
+                throw new Error('不支持的传输编码: ' + encoding);
+            }
+
+            if (headers.get('X-PCM-Container') !== 'wav') return pcm;
+            const header = this.createWavHeader(length, channels, sampleRate, 16);
+            const wav = new Uint8Array(header.byteLength + length);
+            wav.set(new Uint8Array(header), 0);
+            wav.set(new Uint8Array(pcm), header.byteLength);
+            return wav.buffer;
+        },
+
+        // 从服务器获取音频文件，encoding 为 mulaw/alaw/delta-zlib 时压缩传输、在浏览器中解码
+        async fetchAudio(url, encoding) {
+            if (encoding && encoding !== 'identity') {
+                url += (url.includes('?') ? '&' : '?') + 'encoding=' + encodeURIComponent(encoding);
+            }
+            const response = await fetch(url);
+            if (!response.ok) throw new Error('无法加载文件');
+            return this.decodeTransport(await response.arrayBuffer(), response.headers);
         }
     };
 